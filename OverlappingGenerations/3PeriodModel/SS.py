@@ -3,40 +3,71 @@ import numpy as np
 import firm
 import households as hh
 import aggregates as agg
+import fixed_point as fp
 
 
-def solve_ss(r_init, params):
+def get_r_prime(r, params, e=None, pop_weights=None):
+    '''
+    Interest rate implied by household savings at the interest rate r
+
+    With e, an (S, J) array of ability profiles, and pop_weights, the
+    (S, J) population mass of each age and type, the savings of all J
+    types are solved in a single batched call and aggregated with the
+    population weights (unit mass per age split evenly across types
+    if pop_weights is None).
+    '''
+    beta, sigma, n, alpha, A, delta, xi = params
+    # get w
+    w = firm.get_w(r, alpha, A, delta)
+    # solve HH problem
+    if e is None:
+        foc_args = (beta, sigma, r, w, n, 0.0)
+        b_shape = (np.shape(n)[0] - 1,)
+    else:
+        foc_args = (beta, sigma, r, w, n, 0.0, e)
+        b_shape = (np.shape(e)[0] - 1,) + np.shape(e)[1:]
+        if pop_weights is None:
+            # unit mass at each age split evenly across ability types
+            pop_weights = np.ones(np.shape(e)) / np.shape(e)[1]
+    b_sp1_guess = np.full(b_shape, 0.05).ravel()
+    result = opt.root(hh.FOCs, b_sp1_guess, args=foc_args)
+    b_sp1 = result.x.reshape(b_shape)
+    euler_errors = result.fun.reshape(b_shape)
+    b_s = np.concatenate((np.zeros((1,) + b_shape[1:]), b_sp1))
+    # use market clearing
+    if e is None:
+        L = agg.get_L(n, pop_weights)
+    else:
+        n_sj = np.reshape(n, np.shape(n) + (1,) * (np.ndim(e) - np.ndim(n)))
+        L = agg.get_L(e * n_sj, pop_weights)
+    K = agg.get_K(b_s, pop_weights)
+    # find implied r
+    r_prime = firm.get_r(L, K, alpha, A, delta)
+
+    return r_prime, b_sp1, euler_errors
+
+
+def solve_ss(r_init, params, method='damped', anderson_m=5, e=None,
+             pop_weights=None):
     '''
     Solves for the steady-state equlibrium of the OG model
+
+    method='damped' updates r = xi * r_prime + (1 - xi) * r, while
+    method='anderson' uses Anderson mixing with memory anderson_m and
+    falls back to the damped update when its safeguard trips. e and
+    pop_weights give heterogeneous ability types (see get_r_prime).
     '''
     beta, sigma, n, alpha, A, delta, xi = params
-    ss_dist = 7.0
     ss_tol = 1e-8
-    ss_iter = 0
     ss_max_iter = 300
-    r = r_init
-    while (ss_dist > ss_tol) & (ss_iter < ss_max_iter):
-        # get w
-        w = firm.get_w(r, alpha, A, delta)
-        # solve HH problem
-        foc_args = (beta, sigma, r, w, n, 0.0)
-        b_sp1_guess = [0.05, 0.05]
-        result = opt.root(hh.FOCs, b_sp1_guess, args=foc_args)
-        b_sp1 = result.x
-        euler_errors = result.fun
-        b_s = np.append(0.0, b_sp1)
-        # use market clearing
-        L = agg.get_L(n)
-        K = agg.get_K(b_s)
-        # find implied r
-        r_prime = firm.get_r(L, K, alpha, A, delta)
-        # check distance
-        ss_dist = np.absolute(r - r_prime)
-        print('Iteration = ', ss_iter, ', Distance = ', ss_dist,
-              ', r = ', r)
-        # update r
-        r = xi * r_prime + (1 - xi) * r
-        # update iteration counter
-        ss_iter += 1
+
+    def G(r):
+        return get_r_prime(r, params, e, pop_weights)[0]
+
+    r, ss_iter, ss_dist, n_fallback = fp.solve_fp(
+        G, r_init, method=method, xi=xi, m=anderson_m, tol=ss_tol,
+        max_iter=ss_max_iter, verbose=True)
+    print('Iteration = ', ss_iter, ', Distance = ', ss_dist, ', r = ', r)
+    r_prime, b_sp1, euler_errors = get_r_prime(r, params, e, pop_weights)
 
     return r, b_sp1, euler_errors
@@ -1,21 +1,64 @@
 # market clearning conditions
+import numpy as np
 
 
-def get_L(n):
+def weighted_sum(x, pop_weights, method=None):
+    '''
+    Population-weighted sum over ages and ability types in a single
+    einsum pass
+
+    Args:
+        x (Numpy array): (S,) or (S, J) in the steady state, (T, S) or
+            (T, S, J) along the time path
+        pop_weights (Numpy array): population mass by age (and ability
+            type), with the cross-sectional shape of x or, for
+            time-varying weights, the full shape of x
+        method (str): 'SS' or 'TPI', inferred from the dimensions of x
+            and pop_weights if None
+
+    Returns:
+        agg (scalar or Numpy array): aggregate, scalar for 'SS' and
+            length T for 'TPI'
+    '''
+    x = np.asarray(x)
+    pop_weights = np.asarray(pop_weights)
+    if method is None:
+        if (x.ndim == 3) | (x.ndim > pop_weights.ndim):
+            method = 'TPI'
+        else:
+            method = 'SS'
+    if method == 'TPI':
+        x_sub = 'tsj'[:x.ndim]
+        out_sub = 't'
+    else:
+        x_sub = 'sj'[:x.ndim]
+        out_sub = ''
+    w_sub = x_sub[x.ndim - pop_weights.ndim:]
+    agg = np.einsum(x_sub + ',' + w_sub + '->' + out_sub, x, pop_weights)
+
+    return agg
+
+
+def get_L(n, pop_weights=None, method=None):
     '''
     Find aggregate labor supply
     '''
-    L = n.sum()
+    if pop_weights is None:
+        L = n.sum()
+    else:
+        L = weighted_sum(n, pop_weights, method)
 
     return L
 
 
-def get_K(b_s):
+def get_K(b_s, pop_weights=None, method=None):
     '''
     Find aggregate capital supply
     '''
-    if b_s.ndim == 1:
+    if pop_weights is not None:
+        K = weighted_sum(b_s, pop_weights, method)
+    elif b_s.ndim == 1:
         K = b_s.sum()
-    if b_s.ndim == 2:
+    elif b_s.ndim == 2:
         K = b_s.sum(axis=1)
     return K
@@ -0,0 +1,214 @@
+'''
+------------------------------------------------------------------------
+Stationary equilibrium of an Aiyagari-style model with idiosyncratic
+labor income risk.
+
+Households face a Markov income chain (e.g. from ar1_approx.rouwen or
+ar1_approx.tauchenhussey), solve their savings problem with the
+endogenous grid method, and the stationary wealth distribution is found
+by iterating a sparse lottery (non-stochastic simulation) transition
+operator. The interest rate clears the capital market through
+firm.get_r and aggregates.get_K with a bracketing root-finder.
+------------------------------------------------------------------------
+'''
+# Import packages
+import numpy as np
+import scipy.sparse as sp
+from scipy import optimize as opt
+import firm
+import aggregates as agg
+
+
+def income_chain(z_grid, pi, log_levels=True):
+    '''
+    Normalize a discretized income process to a row-stochastic
+    transition matrix, income levels with mean one under the stationary
+    distribution, and that stationary distribution.
+
+    Args:
+        z_grid (Numpy array): income states, any shape with N elements
+            (rouwen returns (N,), tauchenhussey returns (1, N))
+        pi (Numpy array): N x N transition matrix with either rows or
+            columns summing to one (rouwen returns the latter)
+        log_levels (bool): =True if z_grid is log income
+
+    Returns:
+        e (Numpy array): income levels, length N
+        pi (Numpy array): transition matrix with rows summing to one
+        pi_stat (Numpy array): stationary distribution, length N
+    '''
+    z_grid = np.asarray(z_grid, dtype=np.float64).ravel()
+    pi = np.asarray(pi, dtype=np.float64)
+    if not np.allclose(pi.sum(axis=1), 1.0):
+        pi = pi.T
+    eigvals, eigvecs = np.linalg.eig(pi.T)
+    pi_stat = np.absolute(eigvecs[:, np.argmax(eigvals.real)].real)
+    pi_stat = pi_stat / pi_stat.sum()
+    if log_levels:
+        e = np.exp(z_grid)
+    else:
+        e = z_grid.copy()
+    e = e / np.dot(pi_stat, e)
+
+    return e, pi, pi_stat
+
+
+def get_a_grid(a_max, num, curv=2.0):
+    '''
+    Asset grid on [0, a_max] with points clustered near the borrowing
+    limit
+    '''
+    a_grid = a_max * np.linspace(0.0, 1.0, num) ** curv
+
+    return a_grid
+
+
+def egm_step(c_next, a_grid, e, pi, r, w, beta, sigma):
+    '''
+    One endogenous grid method update of the consumption policy
+
+    Args:
+        c_next (Numpy array): next period consumption policy on the
+            (num_a, N) grid of assets and income states
+
+    Returns:
+        c (Numpy array): updated consumption policy, (num_a, N)
+        a_prime (Numpy array): savings policy, (num_a, N)
+    '''
+    # expected marginal utility next period for each (a', z)
+    Emu = np.dot(c_next ** (-sigma), pi.T)
+    c_endo = (beta * (1 + r) * Emu) ** (-1 / sigma)
+    a_endo = (c_endo + a_grid[:, None] - w * e[None, :]) / (1 + r)
+    a_prime = np.empty_like(c_next)
+    for iz in range(e.shape[0]):
+        a_prime[:, iz] = np.interp(a_grid, a_endo[:, iz], a_grid)
+    # borrowing constraint binds below the first endogenous grid point
+    a_prime = np.maximum(a_prime, a_grid[0])
+    c = (1 + r) * a_grid[:, None] + w * e[None, :] - a_prime
+
+    return c, a_prime
+
+
+def solve_household(r, w, a_grid, e, pi, beta, sigma, c_init=None,
+                    tol=1e-10, max_iter=5000):
+    '''
+    Iterate on the EGM update to the stationary household policies
+
+    Returns:
+        c (Numpy array): consumption policy, (num_a, N)
+        a_prime (Numpy array): savings policy, (num_a, N)
+    '''
+    if c_init is None:
+        c = (r * a_grid[:, None] + w * e[None, :]) + 0.1
+    else:
+        c = c_init
+    dist = 7.0
+    egm_iter = 0
+    while (dist > tol) & (egm_iter < max_iter):
+        c_new, a_prime = egm_step(c, a_grid, e, pi, r, w, beta, sigma)
+        dist = np.absolute(c_new - c).max()
+        c = c_new
+        egm_iter += 1
+
+    return c, a_prime
+
+
+def lottery_operator(a_prime, a_grid, pi):
+    '''
+    Sparse transition operator of the joint distribution over (a, z)
+    that splits each savings choice between its two neighboring grid
+    points so that expected assets are preserved
+
+    Returns:
+        Lambda_T (scipy.sparse.csr_matrix): transpose of the transition
+            matrix, so that D_next = Lambda_T.dot(D) for the flattened
+            (num_a * N) distribution D
+    '''
+    num_a, N = a_prime.shape
+    a_clip = np.clip(a_prime, a_grid[0], a_grid[-1])
+    ind = np.searchsorted(a_grid, a_clip, side='right') - 1
+    ind = np.clip(ind, 0, num_a - 2)
+    weight_lo = (a_grid[ind + 1] - a_clip) / (a_grid[ind + 1] - a_grid[ind])
+    # flattened state (a, z) -> (a', z') with probability
+    # weight(a') * pi[z, z']
+    src = np.arange(num_a * N).reshape(num_a, N)
+    rows = np.empty((2, num_a, N, N), dtype=np.int64)
+    cols = np.empty((2, num_a, N, N), dtype=np.int64)
+    vals = np.empty((2, num_a, N, N))
+    z_next = np.arange(N)[None, None, :]
+    for k, (a_ind, wgt) in enumerate(((ind, weight_lo),
+                                      (ind + 1, 1 - weight_lo))):
+        rows[k] = src[:, :, None]
+        cols[k] = a_ind[:, :, None] * N + z_next
+        vals[k] = wgt[:, :, None] * pi[None, :, :]
+    Lambda = sp.csr_matrix((vals.ravel(), (rows.ravel(), cols.ravel())),
+                           shape=(num_a * N, num_a * N))
+    Lambda_T = Lambda.T.tocsr()
+
+    return Lambda_T
+
+
+def stationary_dist(Lambda_T, D_init, tol=1e-12, max_iter=20000):
+    '''
+    Stationary distribution by repeated sparse matrix-vector products
+    '''
+    D = D_init.ravel() / D_init.sum()
+    dist = 7.0
+    dist_iter = 0
+    while (dist > tol) & (dist_iter < max_iter):
+        D_new = Lambda_T.dot(D)
+        dist = np.absolute(D_new - D).max()
+        D = D_new
+        dist_iter += 1
+
+    return D
+
+
+def solve_eq(params, a_grid, e, pi, r_bounds=None, tol=1e-10):
+    '''
+    Solve for the stationary equilibrium interest rate
+
+    Args:
+        params (tuple): (beta, sigma, alpha, A, delta)
+        a_grid (Numpy array): asset grid, length num_a
+        e, pi (Numpy arrays): income chain from income_chain()
+        r_bounds (tuple): bracket for the interest rate, defaults to
+            (-delta, 1 / beta - 1) shrunk slightly
+        tol (scalar): tolerance on the interest rate
+
+    Returns:
+        eq (dict): equilibrium 'r', 'w', 'K', 'L', policies 'c' and
+            'a_prime' and the stationary distribution 'D' over (a, z)
+    '''
+    beta, sigma, alpha, A, delta = params
+    num_a = a_grid.shape[0]
+    N = e.shape[0]
+    pi_stat = income_chain(e, pi, log_levels=False)[2]
+    L = agg.get_L(e, pi_stat)
+    a_mat = np.tile(a_grid[:, None], (1, N))
+    if r_bounds is None:
+        r_bounds = (-delta + 1e-4, 1 / beta - 1 - 1e-4)
+    # warm starts carried across root-finder evaluations
+    state = {'c': None, 'D': np.ones((num_a, N)) / (num_a * N)}
+
+    def household_block(r):
+        w = firm.get_w(r, alpha, A, delta)
+        c, a_prime = solve_household(r, w, a_grid, e, pi, beta, sigma,
+                                     state['c'])
+        Lambda_T = lottery_operator(a_prime, a_grid, pi)
+        D = stationary_dist(Lambda_T, state['D']).reshape(num_a, N)
+        state['c'], state['D'] = c, D
+        return w, c, a_prime, D
+
+    def excess_r(r):
+        w, c, a_prime, D = household_block(r)
+        K = agg.get_K(a_mat, D)
+        return r - firm.get_r(L, K, alpha, A, delta)
+
+    r = opt.brentq(excess_r, r_bounds[0], r_bounds[1], xtol=tol)
+    w, c, a_prime, D = household_block(r)
+    K = agg.get_K(a_mat, D)
+    eq = {'r': r, 'w': w, 'K': K, 'L': L, 'c': c, 'a_prime': a_prime,
+          'D': D}
+
+    return eq
@@ -0,0 +1,222 @@
+'''
+------------------------------------------------------------------------
+Benchmark and regression suite for the OG model kernels.
+
+Times firm.get_r/firm.get_w on large vectors, aggregates.get_K on 1-D
+and 2-D inputs and full steady-state solves over a fixed parameter set.
+Results are compared with the golden values and reference times in
+tests/golden/benchmarks.json, and every run is appended to a history
+file. The pytest run only checks the golden values unless
+OG_BENCH_TIMING=1 is set, since the reference times depend on the
+machine.
+
+Usage:
+    python benchmarks.py                  run and check against golden
+    python benchmarks.py --update-golden  record new golden outputs
+------------------------------------------------------------------------
+'''
+# Import packages
+import os
+import sys
+import io
+import json
+import time
+import platform
+import contextlib
+import numpy as np
+import firm
+import aggregates as agg
+import SS
+
+cur_path = os.path.split(os.path.abspath(__file__))[0]
+GOLDEN_FILE = os.path.join(cur_path, 'tests', 'golden', 'benchmarks.json')
+HISTORY_FILE = os.environ.get(
+    'OG_BENCH_HISTORY', os.path.join(cur_path, 'benchmark_history.jsonl'))
+# a kernel fails if it runs more than MAX_SLOWDOWN times slower than
+# its reference time
+MAX_SLOWDOWN = float(os.environ.get('OG_BENCH_MAX_SLOWDOWN', 5.0))
+# slack in seconds so timer noise on sub-millisecond kernels does not
+# count as a regression
+TIME_SLACK = 0.005
+RTOL = 1e-8
+# the steady-state solves only converge to ss_tol = 1e-8, so their results
+# move by more than RTOL with the iteration count or summation order
+CASE_RTOL = {'SS.solve_ss_damped': 1e-6, 'SS.solve_ss_anderson': 1e-6}
+
+# fixed parameter set for the steady-state solves
+SS_PARAMS = (0.96 ** 20, 3.0, np.array([1.0, 1.0, 0.2]), 0.35, 1.0,
+             1 - (1 - 0.05) ** 20, 0.5)
+
+
+def time_call(func, args=(), repeat=5, number=1):
+    '''
+    Best wall-clock time per call over several repeats
+
+    Returns:
+        best_time (scalar): seconds per call
+        output: value returned by the last call
+    '''
+    best_time = np.inf
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for _ in range(number):
+            output = func(*args)
+        best_time = min(best_time, (time.perf_counter() - start_time) /
+                        number)
+
+    return best_time, output
+
+
+def quiet_solve_ss(r_init, params, method):
+    '''
+    SS.solve_ss with its iteration printout suppressed
+    '''
+    with contextlib.redirect_stdout(io.StringIO()):
+        r, b_sp1, euler_errors = SS.solve_ss(r_init, params, method=method)
+
+    return np.append(r, b_sp1)
+
+
+def get_cases(size=1000000):
+    '''
+    Benchmark cases as (name, function, args, repeat)
+    '''
+    rng = np.random.default_rng(2019)
+    L = rng.uniform(0.5, 2.0, size)
+    K = rng.uniform(1.0, 10.0, size)
+    r = rng.uniform(0.01, 0.5, size)
+    b_1d = rng.uniform(size=size)
+    b_2d = rng.uniform(size=(1000, size // 1000))
+    alpha, A, delta = 0.35, 1.0, 0.05
+    r_init = 1 / SS_PARAMS[0] - 1
+    cases = [
+        ('firm.get_r', firm.get_r, (L, K, alpha, A, delta), 5),
+        ('firm.get_w', firm.get_w, (r, alpha, A, delta), 5),
+        ('aggregates.get_K_1d', agg.get_K, (b_1d,), 5),
+        ('aggregates.get_K_2d', agg.get_K, (b_2d,), 5),
+        ('SS.solve_ss_damped', quiet_solve_ss,
+         (r_init, SS_PARAMS, 'damped'), 3),
+        ('SS.solve_ss_anderson', quiet_solve_ss,
+         (r_init, SS_PARAMS, 'anderson'), 3)]
+
+    return cases
+
+
+def summarize(output):
+    '''
+    Compact fingerprint of a kernel output for regression checks: the
+    full output if it is small, otherwise its sum, min and max
+    '''
+    output = np.atleast_1d(np.asarray(output, dtype=np.float64))
+    if output.size <= 10:
+        summary = output.tolist()
+    else:
+        summary = [output.sum(), output.min(), output.max()]
+
+    return summary
+
+
+def run_benchmarks():
+    '''
+    Run all benchmark cases
+
+    Returns:
+        results (dict): for each case, the best 'time' in seconds and
+            the 'value' fingerprint of its output
+    '''
+    results = {}
+    for name, func, args, repeat in get_cases():
+        best_time, output = time_call(func, args, repeat)
+        results[name] = {'time': best_time, 'value': summarize(output)}
+
+    return results
+
+
+def check_results(results, golden, rtol=RTOL, max_slowdown=MAX_SLOWDOWN,
+                  case_rtol=None):
+    '''
+    Compare benchmark results with the golden outputs and reference
+    times
+
+    Args:
+        rtol (scalar): relative tolerance of the golden values
+        max_slowdown (scalar): allowed slowdown, 0 to skip the runtime
+            checks
+        case_rtol (dict): relative tolerances of particular cases,
+            CASE_RTOL if None
+
+    Returns:
+        failures (list): description of each drifted value or runtime
+            regression, empty if all checks pass
+    '''
+    if case_rtol is None:
+        case_rtol = CASE_RTOL
+    failures = []
+    for name, res in results.items():
+        if name not in golden:
+            failures.append(name + ': no golden output recorded')
+            continue
+        gold = golden[name]
+        if not np.allclose(res['value'], gold['value'],
+                           rtol=case_rtol.get(name, rtol), atol=0.0):
+            failures.append(
+                name + ': result ' + str(res['value']) + ' drifted from ' +
+                'golden ' + str(gold['value']))
+        if (max_slowdown > 0) & (res['time'] > max_slowdown * gold['time']
+                                 + TIME_SLACK):
+            failures.append(
+                name + ': time ' + '{:.3g}'.format(res['time']) +
+                ' s exceeds ' + str(max_slowdown) + ' x reference time ' +
+                '{:.3g}'.format(gold['time']) + ' s')
+
+    return failures
+
+
+def load_golden(golden_file=GOLDEN_FILE):
+    '''
+    Golden outputs and reference times
+    '''
+    with open(golden_file) as f:
+        golden = json.load(f)
+
+    return golden
+
+
+def save_golden(results, golden_file=GOLDEN_FILE):
+    '''
+    Record results as the new golden outputs and reference times
+    '''
+    golden_dir = os.path.split(golden_file)[0]
+    if os.access(golden_dir, os.F_OK) is False:
+        os.makedirs(golden_dir)
+    with open(golden_file, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def append_history(results, failures, history_file=HISTORY_FILE):
+    '''
+    Append one run to the benchmark history (one JSON record per line)
+    '''
+    record = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'python': platform.python_version(),
+              'numpy': np.__version__, 'machine': platform.machine(),
+              'results': results, 'failures': failures}
+    with open(history_file, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+if __name__ == '__main__':
+    results = run_benchmarks()
+    for name, res in results.items():
+        print('{:<24s} {:10.6f} s'.format(name, res['time']))
+    if '--update-golden' in sys.argv:
+        save_golden(results)
+        append_history(results, [])
+        print('Golden outputs written to ' + GOLDEN_FILE)
+    else:
+        failures = check_results(results, load_golden())
+        append_history(results, failures)
+        for failure in failures:
+            print('FAILURE: ' + failure)
+        sys.exit(1 if failures else 0)
@@ -0,0 +1,129 @@
+# fixed-point iteration routines
+import numpy as np
+
+
+def damped_update(x, x_prime, xi):
+    '''
+    Convex combination of the current guess and its image
+    '''
+    x_new = xi * x_prime + (1 - xi) * x
+
+    return x_new
+
+
+def anderson_update(x, f, dX, dF, beta=1.0):
+    '''
+    Anderson (type-II) mixing step from the stored iterate and residual
+    differences.
+
+    Args:
+        x (Numpy array): current iterate
+        f (Numpy array): current residual, G(x) - x
+        dX (list): past differences in iterates, each same shape as x
+        dF (list): past differences in residuals, each same shape as x
+        beta (scalar): mixing parameter, 1.0 gives undamped Anderson
+
+    Returns:
+        x_new (Numpy array): next iterate
+        cond (scalar): condition number of the least squares problem
+    '''
+    dX_mat = np.column_stack(dX)
+    dF_mat = np.column_stack(dF)
+    gamma, _, _, sing_vals = np.linalg.lstsq(dF_mat, f, rcond=None)
+    if sing_vals.size == 0 or sing_vals[-1] == 0.0:
+        cond = np.inf
+    else:
+        cond = sing_vals[0] / sing_vals[-1]
+    x_new = x + beta * f - np.dot(dX_mat + beta * dF_mat, gamma)
+
+    return x_new, cond
+
+
+def solve_fp(G, x_init, args=(), method='damped', xi=0.2, m=5, beta=1.0,
+             tol=1e-8, max_iter=300, max_cond=1e10, safeguard=2.0,
+             verbose=False):
+    '''
+    Solve x = G(x) by damped iteration or Anderson acceleration. Works
+    for scalar x (e.g. the SS interest rate) and for vectors (e.g. a
+    time path of interest rates in TPI).
+
+    Anderson steps fall back to a damped step, and the stored history
+    is cleared, when the least squares problem is ill-conditioned or
+    when the candidate step produces a non-finite residual or one that
+    is more than safeguard times the current residual.
+
+    Args:
+        G (callable): mapping G(x, *args) with output the shape of x
+        x_init (scalar or Numpy array): initial guess
+        args (tuple): extra arguments passed to G
+        method (str): 'damped' or 'anderson'
+        xi (scalar): damping parameter for damped steps, in (0, 1]
+        m (int): Anderson memory depth, >= 1
+        beta (scalar): Anderson mixing parameter
+        tol (scalar): convergence tolerance on max abs residual
+        max_iter (int): maximum number of iterations
+        max_cond (scalar): condition number above which the Anderson
+            step is replaced by a damped step
+        safeguard (scalar): residual growth factor that triggers a
+            fall back to damping
+        verbose (bool): =True to print the distance at each iteration
+
+    Returns:
+        x (scalar or Numpy array): approximate fixed point
+        fp_iter (int): number of iterations used
+        fp_dist (scalar): max abs residual at x
+        n_fallback (int): number of safeguarded Anderson steps
+    '''
+    if method not in ('damped', 'anderson'):
+        raise ValueError("method must be 'damped' or 'anderson'")
+    scalar_input = np.ndim(x_init) == 0
+    x = np.array(x_init, dtype=np.float64).ravel()
+
+    def G_flat(x_flat):
+        x_eval = x_flat[0] if scalar_input else x_flat.reshape(
+            np.shape(x_init))
+        return np.array(G(x_eval, *args), dtype=np.float64).ravel()
+
+    gx = G_flat(x)
+    f = gx - x
+    fp_dist = np.absolute(f).max()
+    fp_iter = 0
+    n_fallback = 0
+    dX, dF = [], []
+    while (fp_dist > tol) & (fp_iter < max_iter):
+        if verbose:
+            print('Iteration = ', fp_iter, ', Distance = ', fp_dist)
+        use_anderson = (method == 'anderson') & (len(dX) > 0)
+        if use_anderson:
+            x_new, cond = anderson_update(x, f, dX, dF, beta)
+            if (cond > max_cond) | (not np.all(np.isfinite(x_new))):
+                use_anderson = False
+        if not use_anderson:
+            x_new = damped_update(x, gx, xi)
+        with np.errstate(all='ignore'):
+            gx_new = G_flat(x_new)
+        f_new = gx_new - x_new
+        dist_new = np.absolute(f_new).max()
+        if use_anderson & ((not np.isfinite(dist_new)) |
+                           (dist_new > safeguard * fp_dist)):
+            # Safeguard: take a damped step and restart the memory
+            n_fallback += 1
+            dX, dF = [], []
+            x_new = damped_update(x, gx, xi)
+            gx_new = G_flat(x_new)
+            f_new = gx_new - x_new
+            dist_new = np.absolute(f_new).max()
+        if method == 'anderson':
+            dX.append(x_new - x)
+            dF.append(f_new - f)
+            if len(dX) > m:
+                dX.pop(0)
+                dF.pop(0)
+        x, gx, f, fp_dist = x_new, gx_new, f_new, dist_new
+        fp_iter += 1
+    if scalar_input:
+        x = x[0]
+    else:
+        x = x.reshape(np.shape(x_init))
+
+    return x, fp_iter, fp_dist, n_fallback
@@ -0,0 +1,55 @@
+'''
+Compare damped iteration and Anderson acceleration on the steady-state
+interest rate of the 3-period OG model.
+
+Usage: python fp_benchmark.py
+'''
+import time
+import numpy as np
+import SS
+import fixed_point as fp
+
+
+def run_benchmark(params, r_init, xi_list=(0.1, 0.3, 0.5, 0.8),
+                  anderson_m=5, tol=1e-8, max_iter=300):
+    '''
+    Solve the steady state with each method and damping parameter
+
+    Returns:
+        results (list): one dict per (method, xi) with the solution,
+            iterations, final distance, number of safeguard fall backs
+            and elapsed time in seconds
+    '''
+    def G(r):
+        return SS.get_r_prime(r, params)[0]
+
+    results = []
+    for xi in xi_list:
+        for method in ('damped', 'anderson'):
+            start_time = time.perf_counter()
+            r, fp_iter, fp_dist, n_fallback = fp.solve_fp(
+                G, r_init, method=method, xi=xi, m=anderson_m, tol=tol,
+                max_iter=max_iter)
+            elapsed = time.perf_counter() - start_time
+            results.append({'method': method, 'xi': xi, 'r': r,
+                            'iterations': fp_iter, 'distance': fp_dist,
+                            'fallbacks': n_fallback, 'time': elapsed})
+
+    return results
+
+
+if __name__ == '__main__':
+    # 3-period model calibrated to 20-year periods
+    beta = 0.96 ** 20
+    sigma = 3.0
+    n = np.array([1.0, 1.0, 0.2])
+    alpha = 0.35
+    A = 1.0
+    delta = 1 - (1 - 0.05) ** 20
+    xi = 0.1
+    params = (beta, sigma, n, alpha, A, delta, xi)
+    r_init = 1 / beta - 1
+    for res in run_benchmark(params, r_init):
+        print('{method:>8s} xi = {xi:.2f}: iterations = {iterations:4d}, '
+              'distance = {distance:.2e}, fall backs = {fallbacks}, '
+              'time = {time:.4f} s, r = {r:.10f}'.format(**res))
@@ -0,0 +1,53 @@
+# household functions
+import numpy as np
+
+
+def get_c(r, w, n, b_s, b_sp1, e=1.0):
+    '''
+    Consumption implied by the household budget constraint
+    '''
+    c = (1 + r) * b_s + w * e * n - b_sp1
+
+    return c
+
+
+def mu_c_func(c, sigma):
+    '''
+    Marginal utility of consumption with CRRA utility
+    '''
+    mu_c = c ** (-sigma)
+
+    return mu_c
+
+
+def FOCs(b_sp1, *args):
+    '''
+    Euler equation errors for the household's lifetime savings choices
+
+    With the optional seventh argument e, an (S, J) array of ability
+    profiles (n may then be (S,) or (S, J)), b_sp1 holds the stacked
+    (S-1, J) savings of all J types so they are solved in one call.
+    r and w may also be length-S vectors of the prices the household
+    faces over its remaining periods of life, as along a time path.
+    '''
+    beta, sigma, r, w, n, b_init = args[:6]
+    e = args[6] if len(args) > 6 else 1.0
+    S = np.shape(n)[0]
+    if np.ndim(n) < np.ndim(e):
+        # labor supply common to all types, align ages with e
+        n = np.reshape(n, (S,) + (1,) * (np.ndim(e) - 1))
+    type_shape = np.broadcast(n, e).shape[1:]
+    b_sp1 = np.reshape(b_sp1, (S - 1,) + type_shape)
+    b_s = np.concatenate((np.zeros((1,) + type_shape) + b_init, b_sp1))
+    b_sp1 = np.concatenate((b_sp1, np.zeros((1,) + type_shape)))
+    if np.ndim(r) > 0:
+        r = np.reshape(r, (S,) + (1,) * len(type_shape))
+        w = np.reshape(w, (S,) + (1,) * len(type_shape))
+        r_sp1 = r[1:]
+    else:
+        r_sp1 = r
+    c = get_c(r, w, n, b_s, b_sp1, e)
+    mu_c = mu_c_func(c, sigma)
+    euler_errors = mu_c[:-1] - beta * (1 + r_sp1) * mu_c[1:]
+
+    return euler_errors.ravel()
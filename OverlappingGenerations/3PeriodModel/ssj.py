@@ -0,0 +1,276 @@
+'''
+------------------------------------------------------------------------
+Sequence-space Jacobians and linearized impulse responses for the OG
+model.
+
+The household block maps the interest rate and wage paths into the
+aggregate capital path. Its Jacobians are built once per steady state
+from the savings responses of a single full-life cohort (and of the
+cohorts alive in the initial period), which is exact for the finitely
+lived households of the OG model. Any shock to A, delta or aggregate
+labor L then only needs one linear solve with a cached factorization of
+the general equilibrium Jacobian.
+------------------------------------------------------------------------
+'''
+# Import packages
+import os
+import hashlib
+import numpy as np
+import scipy.linalg as la
+from scipy import optimize as opt
+import firm
+import households as hh
+import aggregates as agg
+import SS
+
+SHOCKS = ('A', 'delta', 'L')
+
+
+def solve_cohort(r_life, w_life, n_life, b_init, beta, sigma, b_guess):
+    '''
+    Savings of a cohort over its remaining periods of life given the
+    prices it faces in those periods
+    '''
+    foc_args = (beta, sigma, r_life, w_life, n_life, b_init)
+    result = opt.root(hh.FOCs, b_guess, args=foc_args, tol=1e-13)
+    b_sp1 = result.x
+
+    return b_sp1
+
+
+def household_path(r_path, w_path, params, b_ss):
+    '''
+    Aggregate capital path implied by household savings along a path of
+    prices, starting from the steady-state distribution of savings.
+    Prices after period T-1 are held at their last value.
+
+    Args:
+        r_path (Numpy array): interest rates, length T
+        w_path (Numpy array): wages, length T
+        params (tuple): model parameters as in SS.solve_ss
+        b_ss (Numpy array): steady-state savings b_2, ..., b_S
+
+    Returns:
+        K_path (Numpy array): aggregate capital, length T
+    '''
+    beta, sigma, n, alpha, A, delta, xi = params
+    S = len(n)
+    T = len(r_path)
+    r_pad = np.append(r_path, np.full(S, r_path[-1]))
+    w_pad = np.append(w_path, np.full(S, w_path[-1]))
+    b_s_ss = np.append(0.0, b_ss)
+    b_path = np.zeros((T + S, S))
+    b_path[0, :] = b_s_ss
+    # cohorts alive in period 0 that still have savings choices to make
+    for age in range(2, S):
+        b_rem = solve_cohort(r_pad[:S - age + 1], w_pad[:S - age + 1],
+                             n[age - 1:], b_s_ss[age - 1], beta, sigma,
+                             b_s_ss[age:])
+        b_path[np.arange(1, S - age + 1), np.arange(age, S)] = b_rem
+    # cohorts born in periods 0 through T - 1
+    for c in range(T):
+        b_life = solve_cohort(r_pad[c:c + S], w_pad[c:c + S], n, 0.0, beta,
+                              sigma, b_ss)
+        b_path[np.arange(c + 1, c + S), np.arange(1, S)] = b_life
+    K_path = agg.get_K(b_path[:T, :])
+
+    return K_path
+
+
+def cohort_derivatives(r_ss, w_ss, params, b_ss, h=1e-6):
+    '''
+    Central-difference derivatives of cohort savings with respect to
+    the interest rate and wage in each period of remaining life
+
+    Returns:
+        derivs (dict): for each starting age a (1 for a newborn cohort,
+            2, ..., S-1 for cohorts alive in the initial period), a
+            tuple (dB_dr, dB_dw) of arrays of shape (S-a, S-a+1) with
+            the derivative of savings entering age a+1+i with respect
+            to the price i' periods ahead in entry [i, i']
+    '''
+    beta, sigma, n, alpha, A, delta, xi = params
+    S = len(n)
+    b_s_ss = np.append(0.0, b_ss)
+    derivs = {}
+    for age in range(1, S):
+        n_rem = S - age + 1
+        r_life = np.full(n_rem, r_ss)
+        w_life = np.full(n_rem, w_ss)
+        dB = []
+        for p_life, p_ss in ((r_life, r_ss), (w_life, w_ss)):
+            step = h * max(1.0, abs(p_ss))
+            dB_dp = np.zeros((n_rem - 1, n_rem))
+            for k in range(n_rem):
+                p_life[k] = p_ss + step
+                b_up = solve_cohort(r_life, w_life, n[age - 1:],
+                                    b_s_ss[age - 1], beta, sigma,
+                                    b_s_ss[age:])
+                p_life[k] = p_ss - step
+                b_dn = solve_cohort(r_life, w_life, n[age - 1:],
+                                    b_s_ss[age - 1], beta, sigma,
+                                    b_s_ss[age:])
+                p_life[k] = p_ss
+                dB_dp[:, k] = (b_up - b_dn) / (2 * step)
+            dB.append(dB_dp)
+        derivs[age] = tuple(dB)
+
+    return derivs
+
+
+def household_jacobians(r_ss, params, T, h=1e-6):
+    '''
+    Jacobians of the aggregate capital path with respect to the
+    interest rate and wage paths, both T x T. Entry [t, s] is the
+    response of K_t to a change in the price in period s. K_0 is
+    predetermined, so the first row is zero.
+    '''
+    beta, sigma, n, alpha, A, delta, xi = params
+    S = len(n)
+    w_ss = firm.get_w(r_ss, alpha, A, delta)
+    b_ss = SS.get_r_prime(r_ss, params)[1]
+    derivs = cohort_derivatives(r_ss, w_ss, params, b_ss, h)
+    J_Kr = np.zeros((T, T))
+    J_Kw = np.zeros((T, T))
+    # cohorts born in periods 0, ..., T-1 all have the same responses
+    cohorts = np.arange(T)
+    dB_dr, dB_dw = derivs[1]
+    for i in range(S - 1):
+        rows = cohorts + i + 1
+        for k in range(S):
+            cols = cohorts + k
+            keep = (rows < T) & (cols < T)
+            np.add.at(J_Kr, (rows[keep], cols[keep]), dB_dr[i, k])
+            np.add.at(J_Kw, (rows[keep], cols[keep]), dB_dw[i, k])
+    # cohorts already alive in period 0
+    for age in range(2, S):
+        dB_dr, dB_dw = derivs[age]
+        for i in range(S - age):
+            if i + 1 < T:
+                k_max = min(S - age + 1, T)
+                J_Kr[i + 1, :k_max] += dB_dr[i, :k_max]
+                J_Kw[i + 1, :k_max] += dB_dw[i, :k_max]
+
+    return J_Kr, J_Kw
+
+
+def firm_derivatives(r_ss, params, h=1e-6):
+    '''
+    Derivatives of firm.get_r with respect to K, L, A and delta and of
+    firm.get_w with respect to r, A and delta at the steady state. All
+    firm Jacobians along a path are these scalars times the identity.
+    '''
+    beta, sigma, n, alpha, A, delta, xi = params
+    b_ss = SS.get_r_prime(r_ss, params)[1]
+    L_ss = agg.get_L(n)
+    K_ss = agg.get_K(np.append(0.0, b_ss))
+    point = {'K': K_ss, 'L': L_ss, 'A': A, 'delta': delta}
+    derivs = {}
+    for var in ('K', 'L', 'A', 'delta'):
+        step = h * max(1.0, abs(point[var]))
+        up = dict(point)
+        dn = dict(point)
+        up[var] += step
+        dn[var] -= step
+        derivs['r_' + var] = (
+            firm.get_r(up['L'], up['K'], alpha, up['A'], up['delta']) -
+            firm.get_r(dn['L'], dn['K'], alpha, dn['A'], dn['delta'])) / (
+                2 * step)
+    point = {'r': r_ss, 'A': A, 'delta': delta}
+    for var in ('r', 'A', 'delta'):
+        step = h * max(1.0, abs(point[var]))
+        up = dict(point)
+        dn = dict(point)
+        up[var] += step
+        dn[var] -= step
+        derivs['w_' + var] = (
+            firm.get_w(up['r'], alpha, up['A'], up['delta']) -
+            firm.get_w(dn['r'], alpha, dn['A'], dn['delta'])) / (2 * step)
+    derivs['w_L'] = 0.0
+
+    return derivs
+
+
+def get_jacobians(r_ss, params, T, cache_dir=None):
+    '''
+    Household and firm Jacobians around the steady state r_ss, loaded
+    from cache_dir if they were computed before for the same steady
+    state and horizon, and saved there otherwise.
+
+    Returns:
+        jacs (dict): 'J_Kr' and 'J_Kw' (T x T household Jacobians) and
+            the scalar firm derivatives from firm_derivatives()
+    '''
+    beta, sigma, n, alpha, A, delta, xi = params
+    if cache_dir is not None:
+        key = hashlib.sha1(
+            np.array([beta, sigma, alpha, A, delta, T, r_ss],
+                     dtype=np.float64).tobytes() +
+            np.asarray(n, dtype=np.float64).tobytes()).hexdigest()
+        cache_file = os.path.join(cache_dir, 'ssj_' + key + '.npz')
+        if os.path.isfile(cache_file):
+            with np.load(cache_file) as cached:
+                jacs = {name: cached[name] for name in cached.files}
+            for name in jacs:
+                if jacs[name].ndim == 0:
+                    jacs[name] = float(jacs[name])
+            return jacs
+    J_Kr, J_Kw = household_jacobians(r_ss, params, T)
+    jacs = firm_derivatives(r_ss, params)
+    jacs['J_Kr'] = J_Kr
+    jacs['J_Kw'] = J_Kw
+    if cache_dir is not None:
+        if os.access(cache_dir, os.F_OK) is False:
+            os.makedirs(cache_dir)
+        # write to a temporary file first so readers never see a
+        # partially written cache
+        tmp_file = cache_file + '.tmp.npz'
+        np.savez(tmp_file, **jacs)
+        os.replace(tmp_file, cache_file)
+
+    return jacs
+
+
+def ge_factor(jacs):
+    '''
+    LU factorization of the Jacobian of the capital market clearing
+    condition K - K_hh(r(K), w(r(K))) = 0 with respect to the K path
+    '''
+    M = jacs['J_Kr'] + jacs['w_r'] * jacs['J_Kw']
+    H_K = np.eye(M.shape[0]) - jacs['r_K'] * M
+    lu = la.lu_factor(H_K)
+
+    return lu
+
+
+def impulse_response(jacs, shock, dZ, lu=None):
+    '''
+    Linearized general equilibrium responses to a path of deviations in
+    A, delta or aggregate labor L from their steady-state values
+
+    Args:
+        jacs (dict): Jacobians from get_jacobians()
+        shock (str): 'A', 'delta' or 'L'
+        dZ (Numpy array): shock path of length T, or a T x N array of N
+            shock paths that are all solved at once
+        lu (tuple): factorization from ge_factor(), computed if None
+
+    Returns:
+        irf (dict): deviations of 'K', 'r' and 'w' from steady state,
+            each the shape of dZ
+    '''
+    if shock not in SHOCKS:
+        raise ValueError('shock must be one of ' + str(SHOCKS))
+    if lu is None:
+        lu = ge_factor(jacs)
+    dZ = np.asarray(dZ, dtype=np.float64)
+    M = jacs['J_Kr'] + jacs['w_r'] * jacs['J_Kw']
+    w_Z = jacs['w_' + shock]
+    r_Z = jacs['r_' + shock]
+    rhs = r_Z * np.dot(M, dZ) + w_Z * np.dot(jacs['J_Kw'], dZ)
+    dK = la.lu_solve(lu, rhs)
+    dr = jacs['r_K'] * dK + r_Z * dZ
+    dw = jacs['w_r'] * dr + w_Z * dZ
+    irf = {'K': dK, 'r': dr, 'w': dw}
+
+    return irf
@@ -0,0 +1,49 @@
+import numpy as np
+import aggregates as agg
+import SS
+
+
+def test_get_K_weighted():
+    '''
+    Test that the einsum aggregation matches explicit loops over ability
+    types for steady-state and time path arrays
+    '''
+    rng = np.random.default_rng(0)
+    T, S, J = 5, 3, 4
+    b_ss = rng.uniform(size=(S, J))
+    b_path = rng.uniform(size=(T, S, J))
+    weights = rng.uniform(size=(S, J))
+    expected_ss = sum((b_ss[:, j] * weights[:, j]).sum() for j in range(J))
+    expected_path = np.array([
+        sum((b_path[t, :, j] * weights[:, j]).sum() for j in range(J))
+        for t in range(T)])
+
+    assert np.allclose(agg.get_K(b_ss, weights), expected_ss)
+    assert np.allclose(agg.get_K(b_path, weights), expected_path)
+    assert np.allclose(agg.get_L(b_path, np.tile(weights, (T, 1, 1)),
+                                 method='TPI'), expected_path)
+    # unweighted behavior is unchanged
+    assert np.allclose(agg.get_K(b_path[:, :, 0]), b_path[:, :, 0].sum(1))
+
+
+def test_solve_ss_ability_types():
+    '''
+    Test that J identical ability types reproduce the representative
+    household steady state
+    '''
+    beta = 0.96 ** 20
+    delta = 1 - (1 - 0.05) ** 20
+    n = np.array([1.0, 1.0, 0.2])
+    params = (beta, 3.0, n, 0.35, 1.0, delta, 0.5)
+    r_rep, b_rep, _ = SS.solve_ss(1 / beta - 1, params, method='anderson')
+    J = 3
+    e = np.ones((3, J))
+    pop_weights = np.ones((3, J)) / J
+    r_het, b_het, euler_errors = SS.solve_ss(
+        1 / beta - 1, params, method='anderson', e=e,
+        pop_weights=pop_weights)
+
+    assert b_het.shape == (2, J)
+    assert np.allclose(r_het, r_rep)
+    assert np.allclose(b_het, np.tile(b_rep.reshape(2, 1), (1, J)))
+    assert np.absolute(euler_errors).max() < 1e-8
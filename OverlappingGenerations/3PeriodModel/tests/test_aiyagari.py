@@ -0,0 +1,49 @@
+import os
+import sys
+import numpy as np
+import firm
+import aggregates as agg
+import aiyagari as ai
+cur_path = os.path.split(os.path.abspath(__file__))[0]
+sys.path.insert(0, os.path.join(cur_path, '..', '..', '..',
+                                'DynamicProgramming'))
+import ar1_approx as ar  # noqa: E402
+
+
+def test_lottery_operator():
+    '''
+    Test that the lottery transition preserves mass and expected assets
+    '''
+    a_grid = ai.get_a_grid(10.0, 20)
+    pi = np.array([[0.9, 0.1], [0.2, 0.8]])
+    a_prime = np.tile(np.linspace(0.0, 9.5, 20)[:, None], (1, 2))
+    Lambda_T = ai.lottery_operator(a_prime, a_grid, pi)
+    D = np.random.default_rng(0).uniform(size=(20, 2))
+    D = D / D.sum()
+    D_next = Lambda_T.dot(D.ravel()).reshape(20, 2)
+
+    assert np.allclose(D_next.sum(), 1.0)
+    assert np.allclose((D_next * a_grid[:, None]).sum(),
+                       (D * a_prime).sum())
+    assert np.allclose(D_next.sum(axis=0), np.dot(D.sum(axis=0), pi))
+
+
+def test_solve_eq():
+    '''
+    Test that the stationary equilibrium clears the capital market with
+    income risk from the Rouwenhorst discretization
+    '''
+    beta, sigma, alpha, A, delta = 0.96, 2.0, 0.36, 1.0, 0.08
+    rho, sigma_eps, N = 0.9, 0.2, 5
+    sigma_z = sigma_eps / np.sqrt(1 - rho ** 2)
+    P, z = ar.rouwen(rho, 0.0, 2 * sigma_z / np.sqrt(N - 1), N)
+    e, pi, pi_stat = ai.income_chain(z, P)
+    a_grid = ai.get_a_grid(100.0, 150)
+    eq = ai.solve_eq((beta, sigma, alpha, A, delta), a_grid, e, pi)
+    K = agg.get_K(np.tile(a_grid[:, None], (1, N)), eq['D'])
+
+    assert -delta < eq['r'] < 1 / beta - 1
+    assert np.allclose(eq['r'], firm.get_r(eq['L'], K, alpha, A, delta),
+                       atol=1e-8)
+    assert np.allclose(eq['D'].sum(axis=0), pi_stat)
+    assert np.allclose(K, (eq['D'] * eq['a_prime']).sum())
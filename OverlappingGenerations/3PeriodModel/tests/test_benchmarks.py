@@ -0,0 +1,46 @@
+import os
+import json
+import benchmarks
+
+
+def test_benchmarks(tmpdir):
+    '''
+    Test that the OG kernels reproduce their golden outputs. The
+    reference times come from one machine, so the runtime threshold is
+    only checked when OG_BENCH_TIMING=1 is set (python benchmarks.py
+    always checks it)
+    '''
+    results = benchmarks.run_benchmarks()
+    if os.environ.get('OG_BENCH_TIMING') == '1':
+        max_slowdown = benchmarks.MAX_SLOWDOWN
+    else:
+        max_slowdown = 0
+    failures = benchmarks.check_results(results, benchmarks.load_golden(),
+                                        max_slowdown=max_slowdown)
+    history_file = os.path.join(str(tmpdir), 'history.jsonl')
+    benchmarks.append_history(results, failures, history_file)
+    with open(history_file) as f:
+        record = json.loads(f.readline())
+
+    assert record['results'].keys() == results.keys()
+    assert failures == []
+
+
+def test_check_results():
+    '''
+    Test that drifted values and runtime regressions are reported
+    '''
+    golden = {'kernel': {'time': 1.0, 'value': [1.0, 2.0]}}
+    ok = {'kernel': {'time': 1.5, 'value': [1.0, 2.0]}}
+    drifted = {'kernel': {'time': 1.0, 'value': [1.0, 2.001]}}
+    slow = {'kernel': {'time': 10.0, 'value': [1.0, 2.0]}}
+
+    assert benchmarks.check_results(ok, golden, max_slowdown=2.0) == []
+    assert len(benchmarks.check_results(drifted, golden)) == 1
+    assert len(benchmarks.check_results(slow, golden, max_slowdown=2.0)) == 1
+    assert benchmarks.check_results(slow, golden, max_slowdown=0) == []
+    # per-case tolerances, e.g. for the steady-state solves
+    loose = {'kernel': 1e-3}
+    assert benchmarks.check_results(drifted, golden, case_rtol=loose) == []
+    assert len(benchmarks.check_results(drifted, golden,
+                                        case_rtol={'other': 1e-3})) == 1
@@ -0,0 +1,59 @@
+import numpy as np
+import fixed_point as fp
+import SS
+
+
+def test_anderson_vector():
+    '''
+    Test that Anderson acceleration solves a vector-valued linear fixed
+    point problem faster than damped iteration
+    '''
+    rng = np.random.default_rng(0)
+    M = 0.9 * np.diag(np.linspace(0.1, 0.95, 20))
+    c = rng.uniform(size=20)
+    expected_value = np.linalg.solve(np.eye(20) - M, c)
+
+    def G(x):
+        return np.dot(M, x) + c
+
+    x_damp, iter_damp, _, _ = fp.solve_fp(G, np.zeros(20), xi=0.5,
+                                          max_iter=1000)
+    x_and, iter_and, _, _ = fp.solve_fp(G, np.zeros(20), xi=0.5,
+                                        method='anderson', m=10)
+
+    assert np.allclose(x_damp, expected_value, atol=1e-6)
+    assert np.allclose(x_and, expected_value, atol=1e-6)
+    assert iter_and < iter_damp
+
+
+def test_anderson_safeguard():
+    '''
+    Test that the safeguard falls back to damping when the Anderson
+    step lands where the mapping is not defined
+    '''
+    def G(x):
+        return np.where(x > 1.5, np.nan, 1.0 + 0.5 * np.sin(4.0 * x))
+
+    x, fp_iter, fp_dist, n_fallback = fp.solve_fp(
+        G, 0.0, method='anderson', xi=0.1)
+
+    assert fp_dist < 1e-8
+    assert np.allclose(x, 1.0 + 0.5 * np.sin(4.0 * x))
+    assert n_fallback > 0
+
+
+def test_solve_ss_anderson():
+    '''
+    Test that both steady-state methods find the same interest rate
+    '''
+    beta = 0.96 ** 20
+    delta = 1 - (1 - 0.05) ** 20
+    params = (beta, 3.0, np.array([1.0, 1.0, 0.2]), 0.35, 1.0, delta,
+              0.5)
+    r_damp, b_damp, _ = SS.solve_ss(1 / beta - 1, params)
+    r_and, b_and, euler_errors = SS.solve_ss(1 / beta - 1, params,
+                                             method='anderson')
+
+    assert np.allclose(r_and, r_damp, atol=1e-6)
+    assert np.allclose(b_and, b_damp)
+    assert np.absolute(euler_errors).max() < 1e-8
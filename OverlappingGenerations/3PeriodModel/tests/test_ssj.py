@@ -0,0 +1,70 @@
+import os
+import numpy as np
+import firm
+import fixed_point as fp
+import SS
+import ssj
+
+beta = 0.96 ** 20
+delta = 1 - (1 - 0.05) ** 20
+n = np.array([1.0, 1.0, 0.2])
+params = (beta, 3.0, n, 0.35, 1.0, delta, 0.5)
+
+
+def get_ss(params):
+    '''
+    Steady-state interest rate and savings solved to high precision
+    '''
+    r_ss = fp.solve_fp(lambda r: SS.get_r_prime(r, params)[0],
+                       1 / beta - 1, method='anderson', tol=1e-13)[0]
+    b_ss = SS.get_r_prime(r_ss, params)[1]
+
+    return r_ss, b_ss
+
+
+def test_household_jacobians():
+    '''
+    Test the household Jacobians against finite differences of the full
+    nonlinear household solution along a price path
+    '''
+    T = 20
+    r_ss, b_ss = get_ss(params)
+    w_ss = firm.get_w(r_ss, 0.35, 1.0, delta)
+    J_Kr, J_Kw = ssj.household_jacobians(r_ss, params, T)
+    h = 1e-5
+    for s in (0, 1, 7):
+        dp = np.zeros(T)
+        dp[s] = h
+        r_path = np.full(T, r_ss)
+        w_path = np.full(T, w_ss)
+        col_r = (ssj.household_path(r_path + dp, w_path, params, b_ss) -
+                 ssj.household_path(r_path - dp, w_path, params, b_ss)) / (
+                     2 * h)
+        col_w = (ssj.household_path(r_path, w_path + dp, params, b_ss) -
+                 ssj.household_path(r_path, w_path - dp, params, b_ss)) / (
+                     2 * h)
+        assert np.allclose(col_r, J_Kr[:, s], atol=1e-8)
+        assert np.allclose(col_w, J_Kw[:, s], atol=1e-8)
+
+
+def test_permanent_shock(tmpdir):
+    '''
+    Test that the response to a small permanent TFP shock approaches
+    the change in the steady-state capital stock, and that the cached
+    Jacobians are reused
+    '''
+    T = 60
+    r_ss, b_ss = get_ss(params)
+    cache_dir = str(tmpdir)
+    jacs = ssj.get_jacobians(r_ss, params, T, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+    jacs_cached = ssj.get_jacobians(r_ss, params, T, cache_dir=cache_dir)
+    assert np.allclose(jacs_cached['J_Kr'], jacs['J_Kr'])
+    dA = 1e-4
+    irf = ssj.impulse_response(jacs_cached, 'A', np.full(T, dA))
+    params_new = (beta, 3.0, n, 0.35, 1.0 + dA, delta, 0.5)
+    r_new, b_new = get_ss(params_new)
+    expected_value = b_new.sum() - b_ss.sum()
+
+    assert irf['K'][0] == 0.0
+    assert np.allclose(irf['K'][T // 2], expected_value, rtol=1e-3)
@@ -0,0 +1,192 @@
+'''
+------------------------------------------------------------------------
+Parse-once data layer for the demographic data files used by
+demographics.py.
+
+Each CSV file is parsed at most once per process into typed NumPy
+arrays. The arrays are also kept in a compact binary cache
+(data/demographic/cache/*.npz) that is reused across processes until
+the source file's modification time and size change and its SHA-1 hash
+no longer matches.
+------------------------------------------------------------------------
+'''
+# Import packages
+import os
+import hashlib
+import numpy as np
+
+cur_path = os.path.split(os.path.abspath(__file__))[0]
+DATA_DIR = os.path.join(cur_path, 'data', 'demographic')
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+POP_FILE = os.path.join(DATA_DIR, 'pop_data.csv')
+MORT_FILE = os.path.join(DATA_DIR, 'mort_rates2011.csv')
+# =False to parse the CSV files without reading or writing the .npz cache
+USE_DISK_CACHE = True
+# in-process store: source file path -> (fingerprint, dict of arrays)
+_DATA = {}
+
+
+def file_fingerprint(path):
+    '''
+    Cheap fingerprint of a file: modification time (ns) and size
+    '''
+    stat = os.stat(path)
+
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def file_hash(path):
+    '''
+    SHA-1 hex digest of a file's contents
+    '''
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+
+    return sha.hexdigest()
+
+
+def data_fingerprint():
+    '''
+    Fingerprints of all demographic data files, for keying results
+    computed from them
+    '''
+    return (file_fingerprint(POP_FILE), file_fingerprint(MORT_FILE))
+
+
+def parse_pop(path):
+    '''
+    Parse the population by age and year file
+
+    Returns:
+        arrays (dict): 'age' (N,) int64, 'years' (Y,) int64 and 'pop'
+            (N, Y) float64 population counts
+    '''
+    # pandas is only imported when a file has to be parsed
+    import pandas as pd
+    pop_data = pd.read_csv(path, thousands=',')
+    arrays = {'age': pop_data['Age'].to_numpy(dtype=np.int64),
+              'years': np.array([int(col) for col in pop_data.columns[1:]],
+                                dtype=np.int64),
+              'pop': pop_data.iloc[:, 1:].to_numpy(dtype=np.float64)}
+
+    return arrays
+
+
+def parse_mort(path):
+    '''
+    Parse the actuarial life table
+
+    Returns:
+        arrays (dict): 'age' (N,) int64 and float64 'male_rate',
+            'male_lives', 'female_rate' and 'female_lives', each (N,)
+    '''
+    import pandas as pd
+    mort_data = pd.read_csv(path, thousands=',')
+    arrays = {
+        'age': mort_data['Age'].to_numpy(dtype=np.int64),
+        'male_rate': mort_data['Male Mort. Rate'].to_numpy(dtype=np.float64),
+        'male_lives': mort_data['Num. Male Lives'].to_numpy(
+            dtype=np.float64),
+        'female_rate': mort_data['Female Mort. Rate'].to_numpy(
+            dtype=np.float64),
+        'female_lives': mort_data['Num. Female Lives'].to_numpy(
+            dtype=np.float64)}
+
+    return arrays
+
+
+def load(path, parse_func):
+    '''
+    Arrays parsed from a data file, from the in-process store, the .npz
+    cache or, if neither is current, by parsing the file
+
+    Returns:
+        arrays (dict): read-only NumPy arrays
+    '''
+    fingerprint = file_fingerprint(path)
+    if path in _DATA and _DATA[path][0] == fingerprint:
+        return _DATA[path][1]
+    arrays = None
+    cache_file = os.path.join(
+        CACHE_DIR, os.path.splitext(os.path.basename(path))[0] + '.npz')
+    src_hash = None
+    if USE_DISK_CACHE and os.path.isfile(cache_file):
+        with np.load(cache_file) as cached:
+            cached_arrays = {name: cached[name] for name in cached.files}
+        meta = tuple(cached_arrays.pop('_meta').tolist())
+        cached_hash = str(cached_arrays.pop('_sha1'))
+        if meta == fingerprint:
+            arrays = cached_arrays
+        else:
+            # the file was touched or copied: only reparse if its
+            # contents changed
+            src_hash = file_hash(path)
+            if cached_hash == src_hash:
+                arrays = cached_arrays
+                save_cache(cache_file, arrays, fingerprint, src_hash)
+    if arrays is None:
+        arrays = parse_func(path)
+        if USE_DISK_CACHE:
+            if src_hash is None:
+                src_hash = file_hash(path)
+            save_cache(cache_file, arrays, fingerprint, src_hash)
+    for arr in arrays.values():
+        arr.setflags(write=False)
+    _DATA[path] = (fingerprint, arrays)
+
+    return arrays
+
+
+def save_cache(cache_file, arrays, fingerprint, src_hash):
+    '''
+    Atomically write arrays and the source file's fingerprint and hash
+    to the .npz cache. Failure to write (e.g. a read-only data folder)
+    is not an error.
+    '''
+    try:
+        if os.access(CACHE_DIR, os.F_OK) is False:
+            os.makedirs(CACHE_DIR)
+        tmp_file = cache_file + '.tmp.npz'
+        np.savez(tmp_file, _meta=np.array(fingerprint, dtype=np.int64),
+                 _sha1=np.array(src_hash), **arrays)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass
+
+
+def get_pop_data():
+    '''
+    Population by age and year from pop_data.csv, see parse_pop()
+    '''
+    return load(POP_FILE, parse_pop)
+
+
+def get_mort_data():
+    '''
+    Actuarial life table from mort_rates2011.csv, see parse_mort()
+    '''
+    return load(MORT_FILE, parse_mort)
+
+
+def get_pop_samp(min_yr, max_yr, years):
+    '''
+    Population counts for data ages min_yr - 1 through max_yr - 1
+
+    Args:
+        min_yr (int): age in years at which agents are born, >= 0
+        max_yr (int): age in years at which agents die with certainty
+        years (list): data years, e.g. [2010, 2013]
+
+    Returns:
+        pop_samp (Numpy array): population counts, (ages, len(years))
+    '''
+    pop_data = get_pop_data()
+    age_ind = ((pop_data['age'] >= min_yr - 1) &
+               (pop_data['age'] <= max_yr - 1))
+    year_ind = [int(np.flatnonzero(pop_data['years'] == int(year))[0])
+                for year in years]
+    pop_samp = pop_data['pop'][age_ind][:, year_ind]
+
+    return pop_samp
@@ -9,14 +9,18 @@ import os
 import numpy as np
 import scipy.optimize as opt
 import scipy.interpolate as si
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MultipleLocator
+import demographic_data as demog_data
+import plots
 '''
 ------------------------------------------------------------------------
 Define functions
 ------------------------------------------------------------------------
 '''
+# tolerance on the adjusted immigration rate residuals
+IMM_TOL = 1e-14
+# memoized get_pop_objs() outputs keyed by its arguments and the data
+# file fingerprints
+_POP_OBJS = {}
 
 
 def get_fert(totpers, min_yr, max_yr, graph=False):
@@ -37,13 +41,8 @@ def get_fert(totpers, min_yr, max_yr, graph=False):
             of life
     '''
     # Get current population data (2013) for weighting
-    cur_path = os.path.split(os.path.abspath(__file__))[0]
-    pop_file = os.path.join(
-        cur_path, 'data', 'demographic', 'pop_data.csv')
-    pop_data = pd.read_csv(pop_file, thousands=',')
-    pop_data_samp = pop_data[(pop_data['Age'] >= min_yr - 1) &
-                             (pop_data['Age'] <= max_yr - 1)]
-    curr_pop = np.array(pop_data_samp['2013'], dtype='f')
+    curr_pop = np.array(demog_data.get_pop_samp(min_yr, max_yr, [2013])[:, 0],
+                        dtype=np.float64)
     curr_pop_pct = curr_pop / curr_pop.sum()
     # Get fertility rate by age-bin data
     fert_data = (np.array([0.0, 0.0, 0.3, 12.3, 47.1, 80.7, 105.5, 98.0,
@@ -51,32 +50,47 @@ def get_fert(totpers, min_yr, max_yr, graph=False):
     # Mid points of age bins
     age_midp = np.array([9, 10, 12, 16, 18.5, 22, 27, 32, 37, 42, 47,
                          55, 56])
-    # Generate interpolation functions for fertility rates
-    fert_func = si.interp1d(age_midp, fert_data, kind='cubic')
-    # Calculate average fertility rate in each age bin using trapezoid
-    # method with a large number of points in each bin.
+    # Generate the cubic spline interpolating function for fertility
+    # rates (the not-a-knot spline of interp1d(kind='cubic')) and its
+    # antiderivative
+    fert_func = si.make_interp_spline(age_midp, fert_data, k=3)
+    fert_int = fert_func.antiderivative()
+    # Calculate the population-weighted average fertility rate in each
+    # age bin. Positions u are measured in sub-bins, num_sub_bins per
+    # year of age, and sub-bin k is centered at age age_0 + age_step * k
+    # as in the original sub-bin sums. Population is constant within a
+    # year of age, so each bin's weighted integral of the spline is
+    # exact from its antiderivative and cumulative sums over the ages.
     binsize = (max_yr - min_yr + 1) / totpers
     num_sub_bins = float(10000)
     len_subbins = (np.float64(100 * num_sub_bins)) / totpers
-    age_sub = (np.linspace(np.float64(binsize) / num_sub_bins,
-                           np.float64(max_yr),
-                           int(num_sub_bins*max_yr)) - 0.5 *
-               np.float64(binsize) / num_sub_bins)
-    curr_pop_sub = np.repeat(np.float64(curr_pop_pct) / num_sub_bins,
-                             num_sub_bins)
-    fert_rates_sub = np.zeros(curr_pop_sub.shape)
-    pred_ind = (age_sub > age_midp[0]) * (age_sub < age_midp[-1])
-    age_pred = age_sub[pred_ind]
-    fert_rates_sub[pred_ind] = np.float64(fert_func(age_pred))
-    fert_rates = np.zeros(totpers)
-    end_sub_bin = 0
-    for i in range(totpers):
-        beg_sub_bin = int(end_sub_bin)
-        end_sub_bin = int(np.rint((i + 1) * len_subbins))
-        fert_rates[i] = ((
-            curr_pop_sub[beg_sub_bin:end_sub_bin] *
-            fert_rates_sub[beg_sub_bin:end_sub_bin]).sum() /
-            curr_pop_sub[beg_sub_bin:end_sub_bin].sum())
+    age_step = ((np.float64(max_yr) - np.float64(binsize) / num_sub_bins) /
+                (num_sub_bins * max_yr - 1))
+    age_0 = 0.5 * np.float64(binsize) / num_sub_bins
+    num_ages = curr_pop_pct.shape[0]
+    pop_dens = np.float64(curr_pop_pct) / num_sub_bins
+
+    def fert_cum(u):
+        # integral of the fertility rate over positions 0 to u, zero
+        # outside the data ages
+        ages = np.clip(age_0 + age_step * (u - 0.5), age_midp[0],
+                       age_midp[-1])
+        return fert_int(ages) / age_step
+
+    u_ages = np.arange(num_ages + 1) * num_sub_bins
+    fert_cum_ages = fert_cum(u_ages)
+    wfert_cum_ages = np.append(0.0, np.cumsum(pop_dens * np.diff(
+        fert_cum_ages)))
+    pop_cum_ages = np.append(0.0, np.cumsum(pop_dens * num_sub_bins))
+    u_edges = np.minimum(np.rint(np.arange(totpers + 1) * len_subbins),
+                         u_ages[-1])
+    age_ind = np.minimum((u_edges // num_sub_bins).astype(int),
+                         num_ages - 1)
+    wfert_cum = (wfert_cum_ages[age_ind] + pop_dens[age_ind] *
+                 (fert_cum(u_edges) - fert_cum_ages[age_ind]))
+    pop_cum = (pop_cum_ages[age_ind] + pop_dens[age_ind] *
+               (u_edges - u_ages[age_ind]))
+    fert_rates = np.diff(wfert_cum) / np.diff(pop_cum)
     if graph:
         '''
         ----------------------------------------------------------------
@@ -91,9 +105,6 @@ def get_fert(totpers, min_yr, max_yr, graph=False):
                          leading and trailing zeros
         age_mid_new    = (totpers,) vector, midpoint age of each model
                          period age bin
-        output_fldr    = string, folder in current path to save files
-        output_dir     = string, total path of OUTPUT folder
-        output_path    = string, path of file name of figure to be saved
         ----------------------------------------------------------------
         '''
         # Generate finer age vector and fertility rate vector for
@@ -102,38 +113,30 @@ def get_fert(totpers, min_yr, max_yr, graph=False):
         fert_fine_pred = fert_func(age_fine_pred)
         age_fine = np.hstack((min_yr, age_fine_pred, max_yr))
         fert_fine = np.hstack((0, fert_fine_pred, 0))
-        age_mid_new = (np.linspace(np.float(max_yr) / totpers, max_yr,
-                                   totpers) - (0.5 * np.float(max_yr) /
+        age_mid_new = (np.linspace(float(max_yr) / totpers, max_yr,
+                                   totpers) - (0.5 * float(max_yr) /
                                                totpers))
-        fig, ax = plt.subplots()
-        plt.scatter(age_midp, fert_data, s=70, c='blue', marker='o',
-                    label='Data')
-        plt.scatter(age_mid_new, fert_rates, s=40, c='red', marker='d',
-                    label='Model period (integrated)')
-        plt.plot(age_fine, fert_fine, label='Cubic spline')
-        # for the minor ticks, use no labels; default NullFormatter
-        minorLocator = MultipleLocator(1)
-        ax.xaxis.set_minor_locator(minorLocator)
-        plt.grid(b=True, which='major', color='0.65', linestyle='-')
-        # plt.title('Fitted fertility rate function by age ($f_{s}$)',
-        #     fontsize=20)
-        plt.xlabel(r'Age $s$')
-        plt.ylabel(r'Fertility rate $f_{s}$')
-        plt.xlim((min_yr - 1, max_yr + 1))
-        plt.ylim((-0.15 * (fert_fine_pred.max()),
-                  1.15 * (fert_fine_pred.max())))
-        plt.legend(loc='upper right')
-        plt.text(-5, -0.018,
-                 'Source: National Vital Statistics Reports, ' +
-                 'Volume 64, Number 1, January 15, 2015.', fontsize=9)
-        plt.tight_layout(rect=(0, 0.03, 1, 1))
-        # Create directory if OUTPUT directory does not already exist
-        output_fldr = 'OUTPUT/Demographics'
-        output_dir = os.path.join(cur_path, output_fldr)
-        if os.access(output_dir, os.F_OK) is False:
-            os.makedirs(output_dir)
-        output_path = os.path.join(output_dir, 'fert_rates')
-        plt.savefig(output_path)
+        plots.emit({
+            'output_path': os.path.join(plots.OUTPUT_DIR, 'Demographics',
+                                        'fert_rates'),
+            'series': [
+                plots.series('scatter', age_midp, fert_data, s=70,
+                             c='blue', marker='o', label='Data'),
+                plots.series('scatter', age_mid_new, fert_rates, s=40,
+                             c='red', marker='d',
+                             label='Model period (integrated)'),
+                plots.series('plot', age_fine, fert_fine,
+                             label='Cubic spline')],
+            'minor_locator': 1, 'grid': True,
+            'xlabel': r'Age $s$', 'ylabel': r'Fertility rate $f_{s}$',
+            'xlim': (min_yr - 1, max_yr + 1),
+            'ylim': (-0.15 * (fert_fine_pred.max()),
+                     1.15 * (fert_fine_pred.max())),
+            'legend_loc': 'upper right',
+            'text': (-5, -0.018,
+                     'Source: National Vital Statistics Reports, ' +
+                     'Volume 64, Number 1, January 15, 2015.', 9),
+            'tight_layout_rect': (0, 0.03, 1, 1)})
     return fert_rates
 
 
@@ -158,124 +161,152 @@ def get_mort(totpers, min_yr, max_yr, graph=False):
     '''
     # Get mortality rate by age data
     infmort_rate = 0.00587  # taken from 2015 U.S. infant mortality rate
-    cur_path = os.path.split(os.path.abspath(__file__))[0]
-    mort_file = os.path.join(
-        cur_path, 'data', 'demographic', 'mort_rates2011.csv')
-    mort_data = pd.read_csv(mort_file, thousands=',')
-    age_year_all = mort_data['Age'] + 1
-    mort_rates_all = (
-        ((mort_data['Male Mort. Rate'] * mort_data['Num. Male Lives']) +
-         (mort_data['Female Mort. Rate'] *
-          mort_data['Num. Female Lives'])) /
-        (mort_data['Num. Male Lives'] + mort_data['Num. Female Lives']))
+    mort_data = demog_data.get_mort_data()
+    age_year_all = mort_data['age'] + 1
+    with np.errstate(invalid='ignore'):
+        mort_rates_all = (
+            ((mort_data['male_rate'] * mort_data['male_lives']) +
+             (mort_data['female_rate'] * mort_data['female_lives'])) /
+            (mort_data['male_lives'] + mort_data['female_lives']))
     age_year_all = age_year_all[np.isfinite(mort_rates_all)]
     mort_rates_all = mort_rates_all[np.isfinite(mort_rates_all)]
-    # Calculate implied mortality rates in sub-bins of mort_rates_all.
+    # Calculate mortality rates by model period age from cumulative
+    # log survival over the years of age in each bin. Bin edges are
+    # rounded to hundredths of a year as in the original sub-bin
+    # calculation.
     mort_rates_mxyr = mort_rates_all[0:max_yr]
     num_sub_bins = int(100)
     len_subbins = ((np.float64((max_yr - min_yr + 1) * num_sub_bins)) /
                    totpers)
-    mort_rates_sub = np.zeros(num_sub_bins * max_yr, dtype=float)
-    for i in range(max_yr):
-        mort_rates_sub[i * num_sub_bins:(i + 1) * num_sub_bins] =\
-            (1 - ((1 - mort_rates_mxyr[i]) ** (1.0 / num_sub_bins)))
-    mort_rates = np.zeros(totpers)
-    end_sub_bin = 0
-    for i in range(totpers):
-        beg_sub_bin = int(end_sub_bin)
-        end_sub_bin = int(np.rint((i + 1) * len_subbins))
-        mort_rates[i] = (
-            1 - (1 - (mort_rates_sub[beg_sub_bin:end_sub_bin])).prod())
+    edges = np.rint(np.arange(totpers + 1) * len_subbins) / num_sub_bins
+    mort_rates = mort_rebin(mort_rates_mxyr, edges)
     mort_rates[-1] = 1  # Mortality rate in last period is set to 1
     if graph:
         '''
         ----------------------------------------------------------------
         age_mid_new = (totpers,) vector, midpoint age of each model
                       period age bin
-        output_fldr = string, folder in current path to save files
-        output_dir  = string, total path of OUTPUT folder
-        output_path = string, path of file name of figure to be saved
         ----------------------------------------------------------------
         '''
-        age_mid_new = (np.linspace(np.float(max_yr) / totpers, max_yr,
-                                   totpers) - (0.5 * np.float(max_yr) /
+        age_mid_new = (np.linspace(float(max_yr) / totpers, max_yr,
+                                   totpers) - (0.5 * float(max_yr) /
                                                totpers))
-        fig, ax = plt.subplots()
-        plt.scatter(np.hstack([0, age_year_all]),
-                    np.hstack([infmort_rate, mort_rates_all]),
-                    s=20, c='blue', marker='o', label='Data')
-        plt.scatter(np.hstack([0, age_mid_new]),
-                    np.hstack([infmort_rate, mort_rates]),
-                    s=40, c='red', marker='d',
-                    label='Model period (cumulative)')
-        plt.plot(np.hstack([0, age_year_all[min_yr - 1:max_yr]]),
-                 np.hstack([infmort_rate,
-                            mort_rates_all[min_yr - 1:max_yr]]))
-        plt.axvline(x=max_yr, color='red', linestyle='-', linewidth=1)
-        # for the minor ticks, use no labels; default NullFormatter
-        minorLocator = MultipleLocator(1)
-        ax.xaxis.set_minor_locator(minorLocator)
-        plt.grid(b=True, which='major', color='0.65', linestyle='-')
-        # plt.title('Fitted mortality rate function by age ($rho_{s}$)',
-        #     fontsize=20)
-        plt.xlabel(r'Age $s$')
-        plt.ylabel(r'Mortality rate $\rho_{s}$')
-        plt.xlim((min_yr-2, age_year_all.max()+2))
-        plt.ylim((-0.05, 1.05))
-        plt.legend(loc='upper left')
-        plt.text(-5, -0.2,
-                 'Source: Actuarial Life table, 2011 Social Security ' +
-                 'Administration.', fontsize=9)
-        plt.tight_layout(rect=(0, 0.03, 1, 1))
-        # Create directory if OUTPUT directory does not already exist
-        output_fldr = 'OUTPUT/Demographics'
-        output_dir = os.path.join(cur_path, output_fldr)
-        if os.access(output_dir, os.F_OK) is False:
-            os.makedirs(output_dir)
-        output_path = os.path.join(output_dir, 'mort_rates')
-        plt.savefig(output_path)
-        # plt.show()
+        plots.emit({
+            'output_path': os.path.join(plots.OUTPUT_DIR, 'Demographics',
+                                        'mort_rates'),
+            'series': [
+                plots.series('scatter', np.hstack([0, age_year_all]),
+                             np.hstack([infmort_rate, mort_rates_all]),
+                             s=20, c='blue', marker='o', label='Data'),
+                plots.series('scatter', np.hstack([0, age_mid_new]),
+                             np.hstack([infmort_rate, mort_rates]),
+                             s=40, c='red', marker='d',
+                             label='Model period (cumulative)'),
+                plots.series('plot',
+                             np.hstack([0, age_year_all[min_yr - 1:max_yr]]),
+                             np.hstack([infmort_rate,
+                                        mort_rates_all[min_yr - 1:max_yr]]))],
+            'vlines': [(max_yr, {'color': 'red', 'linestyle': '-',
+                                 'linewidth': 1})],
+            'minor_locator': 1, 'grid': True,
+            'xlabel': r'Age $s$', 'ylabel': r'Mortality rate $\rho_{s}$',
+            'xlim': (min_yr-2, age_year_all.max()+2),
+            'ylim': (-0.05, 1.05),
+            'legend_loc': 'upper left',
+            'text': (-5, -0.2,
+                     'Source: Actuarial Life table, 2011 Social Security ' +
+                     'Administration.', 9),
+            'tight_layout_rect': (0, 0.03, 1, 1)})
     return mort_rates, infmort_rate
 
 
-def pop_rebin(curr_pop_dist, totpers_new):
+def mort_rebin(mort_rates_yr, edges):
+    '''
+    Mortality rates over age bins with arbitrary (fractional) edges,
+    given annual mortality rates. Survival within a year of age is
+    spread evenly in logs, so the survival probability over a bin is
+    exp of the difference in cumulative log survival at its edges.
+    Years with a mortality rate of 1 have no finite log survival, so
+    they are left out of the cumulative sum and every bin that covers
+    one gets a mortality rate of 1.
+    Args:
+        mort_rates_yr (Numpy array): mortality rates by year of age,
+            (num_yrs,) or (num_yrs, K) for a batch of K mortality
+            tables (e.g. male/female or scenarios)
+        edges (Numpy array): increasing bin edges in years of age
+            from the start of mort_rates_yr, length num_bins + 1.
+            Edges past num_yrs are treated as num_yrs.
+    Returns:
+        mort_rates (Numpy array): mortality rates for each bin,
+            (num_bins,) or (num_bins, K)
+    '''
+    mort_rates_yr = np.asarray(mort_rates_yr, dtype=np.float64)
+    num_yrs = mort_rates_yr.shape[0]
+    edges = np.clip(np.asarray(edges, dtype=np.float64), 0, num_yrs)
+    certain_death = mort_rates_yr >= 1
+    log_surv = np.log1p(-np.where(certain_death, 0.0, mort_rates_yr))
+    zeros = np.zeros((1,) + mort_rates_yr.shape[1:])
+    log_surv_cum = np.concatenate((zeros, np.cumsum(log_surv, axis=0)))
+    yr_ind = np.minimum(np.floor(edges).astype(int), num_yrs - 1)
+    frac = (edges - yr_ind).reshape(
+        edges.shape + (1,) * (mort_rates_yr.ndim - 1))
+    log_surv_edges = log_surv_cum[yr_ind] + frac * log_surv[yr_ind]
+    mort_rates = -np.expm1(np.diff(log_surv_edges, axis=0))
+    # a bin [lo, hi) with lo < hi covers years floor(lo) to ceil(hi) - 1
+    death_cum = np.concatenate((zeros, np.cumsum(certain_death, axis=0)))
+    lo_yr = np.floor(edges[:-1]).astype(int)
+    hi_yr = np.ceil(edges[1:]).astype(int)
+    nonempty = (edges[1:] > edges[:-1]).reshape(
+        (-1,) + (1,) * (mort_rates_yr.ndim - 1))
+    covers_death = (death_cum[hi_yr] > death_cum[lo_yr]) & nonempty
+    mort_rates = np.where(covers_death, 1.0, mort_rates)
+
+    return mort_rates
+
+
+def pop_rebin(curr_pop_dist, totpers_new, dtype=np.float64):
     '''
-    For cases in which totpers (E+S) is less than the number of periods
+    For cases in which totpers (E+S) differs from the number of periods
     in the population distribution data, this function calculates a new
-    population distribution vector with totpers (E+S) elements.
+    population distribution vector with totpers (E+S) elements by
+    linear interpolation of the cumulative population at the new bin
+    edges (population is spread evenly within each data period).
     Args:
          curr_pop_dist (Numpy array): population distribution over N
-             periods
+             periods, (N,) or (N, K) to rebin K distributions (e.g. all
+             years of data) at once
          totpers_new (int): number of periods to which we are
-             transforming the population distribution, >= 4
              transforming the population distribution, >= 3
+         dtype (data-type): data type of the output
 
      Returns:
          curr_pop_new (Numpy array): new population distribution over
-             totpers (E+S) periods that approximates curr_pop_dist
+             totpers (E+S) periods that approximates curr_pop_dist,
+             (totpers_new,) or (totpers_new, K)
 
      '''
     # Number of periods in original data
     assert totpers_new >= 3
-    totpers_orig = len(curr_pop_dist)
+    curr_pop_dist = np.asarray(curr_pop_dist)
+    totpers_orig = curr_pop_dist.shape[0]
     if int(totpers_new) == totpers_orig:
-        curr_pop_new = curr_pop_dist
-    elif int(totpers_new) < totpers_orig:
+        curr_pop_new = np.array(curr_pop_dist, dtype=dtype)
+    else:
+        # Bin edges in data periods, rounded to 1/num_sub_bins of a
+        # period as in the original sub-bin sums
         num_sub_bins = float(10000)
-        curr_pop_sub = np.repeat(np.float64(curr_pop_dist) /
-                                 num_sub_bins, num_sub_bins)
         len_subbins = ((np.float64(totpers_orig*num_sub_bins)) /
                        totpers_new)
-        curr_pop_new = np.zeros(totpers_new, dtype=np.float64)
-        end_sub_bin = 0
-        for i in range(totpers_new):
-            beg_sub_bin = int(end_sub_bin)
-            end_sub_bin = int(np.rint((i + 1) * len_subbins))
-            curr_pop_new[i] = \
-                curr_pop_sub[beg_sub_bin:end_sub_bin].sum()
-        # Return curr_pop_new to single precision float (float32)
-        # datatype
-        curr_pop_new = np.float32(curr_pop_new)
+        edges = (np.rint(np.arange(totpers_new + 1) * len_subbins) /
+                 num_sub_bins)
+        pop_dist = np.float64(curr_pop_dist)
+        pop_cum = np.concatenate((np.zeros((1,) + pop_dist.shape[1:]),
+                                  np.cumsum(pop_dist, axis=0)))
+        per_ind = np.minimum(np.floor(edges).astype(int), totpers_orig - 1)
+        frac = (edges - per_ind).reshape(
+            edges.shape + (1,) * (pop_dist.ndim - 1))
+        pop_cum_edges = pop_cum[per_ind] + frac * pop_dist[per_ind]
+        curr_pop_new = np.diff(pop_cum_edges, axis=0).astype(dtype)
     return curr_pop_new
 
 
@@ -300,21 +331,10 @@ def get_imm_resid(totpers, min_yr, max_yr, graph=True):
         imm_rates (Numpy array):immigration rates that correspond to
             each period of life, length E+S
     '''
-    cur_path = os.path.split(os.path.abspath(__file__))[0]
-    pop_file = os.path.join(
-        cur_path, 'data', 'demographic', 'pop_data.csv')
-    pop_data = pd.read_csv(pop_file, thousands=',')
-    pop_data_samp = pop_data[(pop_data['Age'] >= min_yr - 1) &
-                             (pop_data['Age'] <= max_yr - 1)]
-    pop_2010, pop_2011, pop_2012, pop_2013 = (
-        np.array(pop_data_samp['2010'], dtype='f'),
-        np.array(pop_data_samp['2011'], dtype='f'),
-        np.array(pop_data_samp['2012'], dtype='f'),
-        np.array(pop_data_samp['2013'], dtype='f'))
-    pop_2010_EpS = pop_rebin(pop_2010, totpers)
-    pop_2011_EpS = pop_rebin(pop_2011, totpers)
-    pop_2012_EpS = pop_rebin(pop_2012, totpers)
-    pop_2013_EpS = pop_rebin(pop_2013, totpers)
+    pop_samp = np.array(demog_data.get_pop_samp(
+        min_yr, max_yr, [2010, 2011, 2012, 2013]), dtype=np.float64)
+    pop_2010_EpS, pop_2011_EpS, pop_2012_EpS, pop_2013_EpS = \
+        pop_rebin(pop_samp, totpers).T
     # Create three years of estimated immigration rates for youngest age
     # individuals
     imm_mat = np.zeros((3, totpers))
@@ -343,36 +363,195 @@ def get_imm_resid(totpers, min_yr, max_yr, graph=True):
     imm_rates = imm_mat.mean(axis=0)
     age_per = np.linspace(1, totpers, totpers)
     if graph:
-        '''
-        ----------------------------------------------------------------
-        output_fldr = string, path of the OUTPUT folder from cur_path
-        output_dir  = string, total path of OUTPUT folder
-        output_path = string, path of file name of figure to be saved
-        ----------------------------------------------------------------
-        '''
-        fig, ax = plt.subplots()
-        plt.scatter(age_per, imm_rates, s=40, c='red', marker='d')
-        plt.plot(age_per, imm_rates)
-        # for the minor ticks, use no labels; default NullFormatter
-        minorLocator = MultipleLocator(1)
-        ax.xaxis.set_minor_locator(minorLocator)
-        plt.grid(b=True, which='major', color='0.65', linestyle='-')
-        # plt.title('Fitted immigration rates by age ($i_{s}$), residual',
-        #     fontsize=20)
-        plt.xlabel(r'Age $s$ (model periods)')
-        plt.ylabel(r'Imm. rate $i_{s}$')
-        plt.xlim((0, totpers + 1))
-        # Create directory if OUTPUT directory does not already exist
-        output_fldr = 'OUTPUT/Demographics'
-        output_dir = os.path.join(cur_path, output_fldr)
-        if os.access(output_dir, os.F_OK) is False:
-            os.makedirs(output_dir)
-        output_path = os.path.join(output_dir, 'imm_rates_orig')
-        plt.savefig(output_path)
-        # plt.show()
+        plots.emit({
+            'output_path': os.path.join(plots.OUTPUT_DIR, 'Demographics',
+                                        'imm_rates_orig'),
+            'series': [
+                plots.series('scatter', age_per, imm_rates, s=40, c='red',
+                             marker='d'),
+                plots.series('plot', age_per, imm_rates)],
+            'minor_locator': 1, 'grid': True,
+            'xlabel': r'Age $s$ (model periods)',
+            'ylabel': r'Imm. rate $i_{s}$',
+            'xlim': (0, totpers + 1)})
     return imm_rates
 
 
+def leslie_operator(fert_rates, mort_rates, infmort_rate, imm_rates):
+    '''
+    Structured form of the population transition (Leslie) matrix OMEGA,
+    whose first row holds births plus newborn immigration, sub-diagonal
+    the survival rates and diagonal (after the first row) the
+    immigration rates
+    Args:
+        fert_rates (Numpy array): fertility rates, length E+S
+        mort_rates (Numpy array): mortality rates, length E+S
+        infmort_rate (scalar): infant mortality rate
+        imm_rates (Numpy array): immigration rates, length E+S
+    Returns:
+        leslie_ops (tuple): (first_row, surv_rates, imm_diag), the first
+            row of OMEGA (length E+S), its sub-diagonal (length E+S-1)
+            and the rest of its diagonal (length E+S-1)
+    '''
+    first_row = (1 - infmort_rate) * np.asarray(fert_rates, dtype=np.float64)
+    first_row[0] += imm_rates[0]
+    surv_rates = 1 - np.asarray(mort_rates[:-1], dtype=np.float64)
+    imm_diag = np.array(imm_rates[1:], dtype=np.float64)
+    leslie_ops = (first_row, surv_rates, imm_diag)
+
+    return leslie_ops
+
+
+def leslie_matrix(leslie_ops):
+    '''
+    Dense OMEGA matrix from the structured form of leslie_operator()
+    '''
+    first_row, surv_rates, imm_diag = leslie_ops
+    totpers = first_row.shape[0]
+    OMEGA = np.zeros((totpers, totpers))
+    OMEGA[0, :] = first_row
+    OMEGA[1:, :-1] += np.diag(surv_rates)
+    OMEGA[1:, 1:] += np.diag(imm_diag)
+
+    return OMEGA
+
+
+def leslie_apply(leslie_ops, pop, out=None):
+    '''
+    Population next period, np.dot(OMEGA, pop), in O(E+S) operations
+    Args:
+        leslie_ops (tuple): structured OMEGA from leslie_operator().
+            With K populations, each of its arrays can also be (len, K)
+            to give each population its own rates
+        pop (Numpy array): population by age, (E+S,) or (E+S, K) for K
+            populations at once
+        out (Numpy array): array the result is written to, the shape of
+            pop and not overlapping it, allocated if None
+    Returns:
+        out (Numpy array): population next period, the shape of pop
+    '''
+    first_row, surv_rates, imm_diag = leslie_ops
+    if out is None:
+        out = np.empty(np.shape(pop))
+    if np.ndim(pop) == 1:
+        out[0] = np.dot(first_row, pop)
+        np.multiply(surv_rates, pop[:-1], out=out[1:])
+        out[1:] += imm_diag * pop[1:]
+    else:
+        if np.ndim(first_row) == 1:
+            out[0] = np.dot(first_row, pop)
+        else:
+            out[0] = np.einsum('ik,ik->k', first_row, pop)
+        np.multiply(np.reshape(surv_rates, (surv_rates.shape[0], -1)),
+                    pop[:-1], out=out[1:])
+        out[1:] += np.reshape(imm_diag, (imm_diag.shape[0], -1)) * pop[1:]
+
+    return out
+
+
+def leslie_power(leslie_ops, pop, num_per):
+    '''
+    Population num_per periods ahead, np.dot(OMEGA ** num_per, pop).
+    Steps one period at a time with leslie_apply() unless repeated
+    squaring of the dense OMEGA takes fewer operations.
+    '''
+    totpers = leslie_ops[0].shape[0]
+    pop = np.array(pop, dtype=np.float64)
+    if num_per <= 0:
+        return pop
+    if totpers ** 3 * np.log2(num_per) < totpers * num_per:
+        OMEGA_pow = np.linalg.matrix_power(leslie_matrix(leslie_ops),
+                                           num_per)
+        pop = np.dot(OMEGA_pow, pop)
+    else:
+        pop_next = np.empty_like(pop)
+        for per in range(num_per):
+            leslie_apply(leslie_ops, pop, out=pop_next)
+            pop, pop_next = pop_next, pop
+
+    return pop
+
+
+def get_ss_pop(leslie_ops, omega_init=None, tol=1e-14, max_iter=100000):
+    '''
+    Steady-state population growth rate and stable population
+    distribution, the dominant eigenvalue and eigenvector of OMEGA,
+    in O(E+S) operations per iteration.
+
+    With v_0 = 1, the eigenvector of OMEGA for eigenvalue lam has
+    v_s = v_{s-1} * surv_rates[s-1] / (lam - imm_diag[s-1]), and lam
+    solves the Euler-Lotka equation sum_s first_row[s] * v_s / lam = 1.
+    Above max(imm_diag, 0) the eigenvector is positive, and the
+    dominant root is the largest root there. It is bracketed by
+    stepping down from a point where the left-hand side is below one
+    and solved with brentq. If no bracket is found (e.g. with negative
+    fertility entries), a power iteration on (OMEGA + I) / 2 warm
+    started at omega_init is used instead.
+    Args:
+        leslie_ops (tuple): structured OMEGA from leslie_operator()
+        omega_init (Numpy array): starting distribution for the power
+            iteration, uniform if None
+        tol (scalar): tolerance on the growth rate
+        max_iter (int): maximum number of power iterations
+    Returns:
+        g_n_SS (scalar): steady-state population growth rate
+        omega_SS (Numpy array): stable population distribution,
+            sums to one, length E+S
+    '''
+    first_row, surv_rates, imm_diag = leslie_ops
+    totpers = first_row.shape[0]
+
+    def eigvec(lam):
+        return np.append(1.0, np.cumprod(surv_rates / (lam - imm_diag)))
+
+    def lotka_resid(lam):
+        return np.dot(first_row, eigvec(lam)) / lam - 1
+
+    # Bracket the largest root above lam_min by stepping down
+    # geometrically from a point where the residual is negative.
+    # Negative fertility entries can make the residual non-monotone,
+    # so the first sign change from above is used.
+    lam_min = max(imm_diag.max(), 0.0)
+    lam_hi = lam_min + 2.0
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        for step in range(60):
+            if lotka_resid(lam_hi) < 0:
+                break
+            lam_hi = lam_min + 2 * (lam_hi - lam_min)
+        lam_lo = lam_hi
+        for step in range(300):
+            if lotka_resid(lam_lo) >= 0:
+                break
+            lam_hi = lam_lo
+            lam_lo = lam_min + 0.9 * (lam_lo - lam_min)
+        bracket = (np.isfinite(lotka_resid(lam_lo)) &
+                   (lotka_resid(lam_lo) >= 0) & (lotka_resid(lam_hi) < 0))
+    if bracket:
+        lam = opt.brentq(lotka_resid, lam_lo, lam_hi, xtol=tol,
+                         rtol=4 * np.finfo(float).eps)
+        omega_SS = eigvec(lam)
+    else:
+        if omega_init is None:
+            omega_SS = np.ones(totpers) / totpers
+        else:
+            omega_SS = np.array(omega_init, dtype=np.float64)
+        omega_next = np.empty(totpers)
+        lam = 0.0
+        for pow_iter in range(max_iter):
+            leslie_apply(leslie_ops, omega_SS, out=omega_next)
+            omega_next += omega_SS
+            lam_new = omega_next.sum() / omega_SS.sum() - 1
+            omega_SS, omega_next = omega_next / omega_next.sum(), omega_SS
+            if np.absolute(lam_new - lam) < tol:
+                lam = lam_new
+                break
+            lam = lam_new
+    g_n_SS = lam - 1
+    omega_SS = omega_SS / omega_SS.sum()
+
+    return g_n_SS, omega_SS
+
+
 def immsolve(imm_rates, *args):
     '''
     This function generates a vector of errors representing the
@@ -393,18 +572,187 @@ def immsolve(imm_rates, *args):
     '''
     fert_rates, mort_rates, infmort_rate, omega_cur_lev, g_n_SS = args
     omega_cur_pct = omega_cur_lev / omega_cur_lev.sum()
-    totpers = len(fert_rates)
-    OMEGA = np.zeros((totpers, totpers))
-    OMEGA[0, :] = ((1 - infmort_rate) * fert_rates +
-                   np.hstack((imm_rates[0], np.zeros(totpers-1))))
-    OMEGA[1:, :-1] += np.diag(1 - mort_rates[:-1])
-    OMEGA[1:, 1:] += np.diag(imm_rates[1:])
-    omega_new = np.dot(OMEGA, omega_cur_pct) / (1 + g_n_SS)
+    leslie_ops = leslie_operator(fert_rates, mort_rates, infmort_rate,
+                                 imm_rates)
+    omega_new = leslie_apply(leslie_ops, omega_cur_pct) / (1 + g_n_SS)
     omega_errs = omega_new - omega_cur_pct
     return omega_errs
 
 
-def get_pop_objs(E, S, T, min_yr, max_yr, curr_year, GraphDiag=True):
+def get_imm_adj(fert_rates, mort_rates, infmort_rate, omega_cur_lev,
+                g_n_SS):
+    '''
+    Immigration rates that make omega_cur the steady-state population
+    distribution, the zero of immsolve(). Each immigration rate
+    multiplies only its own age's population share in the residual,
+    so the rates are solved directly age by age.
+    Args:
+        fert_rates (Numpy array): fertility rates, length E+S
+        mort_rates (Numpy array): mortality rates, length E+S
+        infmort_rate (scalar): infant mortality rate
+        omega_cur_lev (Numpy array): population by age, length E+S
+        g_n_SS (scalar): steady-state population growth rate
+    Returns:
+        imm_rates (Numpy array): adjusted immigration rates, length E+S
+    '''
+    omega_cur_pct = omega_cur_lev / omega_cur_lev.sum()
+    imm_rates = np.empty(omega_cur_pct.shape[0])
+    imm_rates[0] = (((1 + g_n_SS) * omega_cur_pct[0] -
+                     (1 - infmort_rate) * np.dot(fert_rates,
+                                                 omega_cur_pct)) /
+                    omega_cur_pct[0])
+    imm_rates[1:] = (((1 + g_n_SS) * omega_cur_pct[1:] -
+                      (1 - mort_rates[:-1]) * omega_cur_pct[:-1]) /
+                     omega_cur_pct[1:])
+    return imm_rates
+
+
+def age_pop_data(leslie_ops, pop_data, S, curr_year, data_year=2013):
+    '''
+    Age population data to the current year(s) of analysis
+    Args:
+        leslie_ops (tuple): structured OMEGA from leslie_operator()
+        pop_data (Numpy array): population by age in data_year,
+            length E+S
+        S (int): number of model periods in which agent is economically
+            active
+        curr_year (int or Numpy array): current year(s) of analysis. For
+            an array of K years the data are aged once, in order of the
+            years.
+        data_year (int): year of pop_data
+    Returns:
+        pop_past (Numpy array): population the year before curr_year,
+            (E+S,) or (E+S, K) (the data year population if curr_year
+            is at most data_year)
+        pop_curr (Numpy array): population in curr_year, the shape of
+            pop_past
+        g_n_curr (scalar or Numpy array): growth rate of the
+            economically active population from pop_past
+    '''
+    curr_years = np.atleast_1d(curr_year)
+    pop_past = np.empty((pop_data.shape[0], curr_years.shape[0]))
+    pop_curr = np.empty_like(pop_past)
+    pop = pop_data
+    year = data_year
+    for ind in np.argsort(curr_years):
+        past_year = max(curr_years[ind] - 1, data_year)
+        pop = leslie_power(leslie_ops, pop, past_year - year)
+        year = past_year
+        pop_past[:, ind] = pop
+    leslie_apply(leslie_ops, pop_past, out=pop_curr)
+    g_n_curr = ((pop_curr[-S:].sum(axis=0) - pop_past[-S:].sum(axis=0)) /
+                pop_past[-S:].sum(axis=0))
+    # assume 2012-2013 pop if curr_year is at most data_year
+    pop_curr[:, curr_years <= data_year] = \
+        pop_past[:, curr_years <= data_year]
+    if np.ndim(curr_year) == 0:
+        pop_past, pop_curr, g_n_curr = \
+            pop_past[:, 0], pop_curr[:, 0], g_n_curr[0]
+    return pop_past, pop_curr, g_n_curr
+
+
+def project_pop(leslie_ops, pop_curr, num_per):
+    '''
+    Time path of the nonstationary population distribution. The last
+    axis is time and the array is Fortran ordered, so each period is
+    contiguous and written in place.
+    Args:
+        leslie_ops (tuple): structured OMEGA from leslie_operator()
+        pop_curr (Numpy array): population in the first period, (E+S,)
+            or (E+S, K)
+        num_per (int): number of periods
+    Returns:
+        omega_path_lev (Numpy array): population path, (E+S, num_per)
+            or (E+S, K, num_per)
+    '''
+    omega_path_lev = np.empty(np.shape(pop_curr) + (num_per,), order='F')
+    omega_path_lev[..., 0] = pop_curr
+    for per in range(1, num_per):
+        leslie_apply(leslie_ops, omega_path_lev[..., per - 1],
+                     out=omega_path_lev[..., per])
+    return omega_path_lev
+
+
+def get_pop_path_objs(omega_path_lev, pop_past, g_n_curr, g_n_SS,
+                      fert_rates, mort_rates, infmort_rate, imm_rates_orig,
+                      E, S, imm_method='direct'):
+    '''
+    Force the population distribution after 1.5*S periods to be the
+    steady-state distribution by adjusting immigration rates, holding
+    constant mortality, fertility, and SS growth rates, and compute the
+    outputs of get_pop_objs() from the population path
+    Args:
+        omega_path_lev (Numpy array): population path from
+            project_pop(), (E+S, T+S)
+        pop_past, g_n_curr: from age_pop_data()
+        g_n_SS (scalar): steady-state population growth rate
+        fert_rates, mort_rates, infmort_rate, imm_rates_orig: rates
+            used to build the Leslie operator
+        E, S (int): model periods not and economically active
+        imm_method (str): see get_pop_objs()
+    Returns:
+        pop_objs (tuple): outputs of get_pop_objs()
+        imm_rates_adj (Numpy array): adjusted immigration rates,
+            length E+S
+        imm_maxerr (scalar): maximum absolute immsolve() residual of the
+            adjusted immigration rates
+    '''
+    num_per = omega_path_lev.shape[1]
+    mort_rates_S = mort_rates[-S:]
+    fixper = int(1.5 * S)
+    omega_SSfx = (omega_path_lev[:, fixper] /
+                  omega_path_lev[:, fixper].sum())
+    imm_objs = (fert_rates, mort_rates, infmort_rate,
+                omega_path_lev[:, fixper], g_n_SS)
+    if imm_method == 'direct':
+        imm_rates_adj = get_imm_adj(*imm_objs)
+    elif imm_method == 'fsolve':
+        imm_rates_adj = opt.fsolve(immsolve, imm_rates_orig,
+                                   args=(imm_objs), xtol=IMM_TOL)
+    else:
+        raise ValueError("imm_method must be 'direct' or 'fsolve'")
+    imm_maxerr = np.absolute(immsolve(imm_rates_adj, *imm_objs)).max()
+    if imm_maxerr >= IMM_TOL:
+        print('POP. WARNING: Adjusted immigration rates did not ' +
+              'solve. Maximum absolute error of ' + str(imm_maxerr) +
+              ' is greater than the tolerance of ' + str(IMM_TOL))
+    omega_path_S = (omega_path_lev[-S:, :] /
+                    np.tile(omega_path_lev[-S:, :].sum(axis=0), (S, 1)))
+    omega_path_S[:, fixper:] = \
+        np.tile(omega_path_S[:, fixper].reshape((S, 1)),
+                (1, num_per - fixper))
+    g_n_path = np.zeros(num_per)
+    g_n_path[0] = g_n_curr
+    g_n_path[1:] = ((omega_path_lev[-S:, 1:].sum(axis=0) -
+                    omega_path_lev[-S:, :-1].sum(axis=0)) /
+                    omega_path_lev[-S:, :-1].sum(axis=0))
+    g_n_path[fixper + 1:] = g_n_SS
+    omega_S_preTP = pop_past[-S:] / pop_past[-S:].sum()
+    imm_rates_mat = np.hstack((
+        np.tile(np.reshape(imm_rates_orig[E:], (S, 1)), (1, fixper)),
+        np.tile(np.reshape(imm_rates_adj[E:], (S, 1)),
+                (1, num_per - fixper))))
+    pop_objs = (omega_path_S.T, g_n_SS, omega_SSfx[-S:] /
+                omega_SSfx[-S:].sum(), 1-mort_rates_S, mort_rates_S,
+                g_n_path, imm_rates_mat.T, omega_S_preTP)
+    return pop_objs, imm_rates_adj, imm_maxerr
+
+
+def freeze_pop_objs(pop_objs):
+    '''
+    Read-only copies of the arrays in the outputs of get_pop_objs()
+    '''
+    frozen = []
+    for obj in pop_objs:
+        if isinstance(obj, np.ndarray):
+            obj = np.array(obj)
+            obj.setflags(write=False)
+        frozen.append(obj)
+    return tuple(frozen)
+
+
+def get_pop_objs(E, S, T, min_yr, max_yr, curr_year, GraphDiag=True,
+                 imm_method='direct'):
     '''
     This function produces the demographics objects to be used in the
     OG-USA model package.
@@ -421,6 +769,9 @@ def get_pop_objs(E, S, T, min_yr, max_yr, curr_year, GraphDiag=True):
             >= 2016
         GraphDiag (bool): =True if want graphical output and printed
                 diagnostics
+        imm_method (str): 'direct' to solve the adjusted immigration
+            rates with get_imm_adj() or 'fsolve' to solve immsolve()
+            iteratively
     Returns:
         omega_path_S (Numpy array), time path of the population
             distribution from the current state to the steady-state,
@@ -434,91 +785,51 @@ def get_pop_objs(E, S, T, min_yr, max_yr, curr_year, GraphDiag=True):
             each model period of life, length S
         g_n_path (Numpy array): population growth rates over the time
             path, length T + S
+        imm_rates_mat (Numpy array): immigration rates over the time
+            path, size T+S x S
+        omega_S_preTP (Numpy array): population distribution the
+            period before the time path, length S
+        With GraphDiag=False the outputs are memoized and the arrays are
+        read-only.
     '''
+    # Reuse the outputs of an earlier call with the same arguments and
+    # data files (not when graphs and diagnostics are requested)
+    cache_key = None
+    if not GraphDiag:
+        cache_key = (E, S, T, min_yr, max_yr, curr_year, imm_method,
+                     demog_data.data_fingerprint())
+        if cache_key in _POP_OBJS:
+            return _POP_OBJS[cache_key]
     # age_per = np.linspace(min_yr, max_yr, E+S)
     fert_rates = get_fert(E + S, min_yr, max_yr, graph=False)
     mort_rates, infmort_rate = get_mort(E + S, min_yr, max_yr,
                                         graph=False)
-    mort_rates_S = mort_rates[-S:]
     imm_rates_orig = get_imm_resid(E + S, min_yr, max_yr, graph=False)
-    OMEGA_orig = np.zeros((E + S, E + S))
-    OMEGA_orig[0, :] = ((1 - infmort_rate) * fert_rates +
-                        np.hstack((imm_rates_orig[0], np.zeros(E+S-1))))
-    OMEGA_orig[1:, :-1] += np.diag(1 - mort_rates[:-1])
-    OMEGA_orig[1:, 1:] += np.diag(imm_rates_orig[1:])
+    leslie_orig = leslie_operator(fert_rates, mort_rates, infmort_rate,
+                                  imm_rates_orig)
     # Solve for steady-state population growth rate and steady-state
-    # population distribution by age using eigenvalue and eigenvector
-    # decomposition
-    eigvalues, eigvectors = np.linalg.eig(OMEGA_orig)
-    g_n_SS = (eigvalues[np.isreal(eigvalues)].real).max() - 1
-    eigvec_raw =\
-        eigvectors[:,
-                   (eigvalues[np.isreal(eigvalues)].real).argmax()].real
-    omega_SS_orig = eigvec_raw / eigvec_raw.sum()
-    # Generate time path of the nonstationary population distribution
-    omega_path_lev = np.zeros((E + S, T + S))
-    cur_path = os.path.split(os.path.abspath(__file__))[0]
-    pop_file = os.path.join(
-        cur_path, 'data', 'demographic', 'pop_data.csv')
-    pop_data = pd.read_csv(pop_file, thousands=',')
-    pop_data_samp = pop_data[(pop_data['Age'] >= min_yr - 1) &
-                             (pop_data['Age'] <= max_yr - 1)]
-    pop_2013 = np.array(pop_data_samp['2013'], dtype='f')
+    # population distribution by age from the dominant eigenpair
+    g_n_SS, omega_SS_orig = get_ss_pop(leslie_orig)
     # Generate the current population distribution given that E+S might
     # be less than max_yr-min_yr+1
     age_per_EpS = np.arange(1, E + S + 1)
+    pop_2013 = np.array(demog_data.get_pop_samp(min_yr, max_yr, [2013])[:, 0],
+                        dtype=np.float64)
     pop_2013_EpS = pop_rebin(pop_2013, E + S)
     pop_2013_pct = pop_2013_EpS / pop_2013_EpS.sum()
     # Age most recent population data to the current year of analysis
-    pop_curr = pop_2013_EpS.copy()
-    data_year = 2013
-    pop_next = np.dot(OMEGA_orig, pop_curr)
-    g_n_curr = ((pop_next[-S:].sum() - pop_curr[-S:].sum()) /
-                pop_curr[-S:].sum())  # g_n in 2013
-    pop_past = pop_curr  # assume 2012-2013 pop
-    # Age the data to the current year
-    for per in range(curr_year - data_year):
-        pop_next = np.dot(OMEGA_orig, pop_curr)
-        g_n_curr = ((pop_next[-S:].sum() - pop_curr[-S:].sum()) /
-                    pop_curr[-S:].sum())
-        pop_past = pop_curr
-        pop_curr = pop_next
+    pop_past, pop_curr, g_n_curr = age_pop_data(leslie_orig, pop_2013_EpS,
+                                                S, curr_year)
     # Generate time path of the population distribution
-    omega_path_lev[:, 0] = pop_curr.copy()
-    for per in range(1, T + S):
-        pop_next = np.dot(OMEGA_orig, pop_curr)
-        omega_path_lev[:, per] = pop_next.copy()
-        pop_curr = pop_next.copy()
-    # Force the population distribution after 1.5*S periods to be the
-    # steady-state distribution by adjusting immigration rates, holding
-    # constant mortality, fertility, and SS growth rates
-    imm_tol = 1e-14
-    fixper = int(1.5 * S)
-    omega_SSfx = (omega_path_lev[:, fixper] /
-                  omega_path_lev[:, fixper].sum())
-    imm_objs = (fert_rates, mort_rates, infmort_rate,
-                omega_path_lev[:, fixper], g_n_SS)
-    imm_fulloutput = opt.fsolve(immsolve, imm_rates_orig,
-                                args=(imm_objs), full_output=True,
-                                xtol=imm_tol)
-    imm_rates_adj = imm_fulloutput[0]
-    imm_diagdict = imm_fulloutput[1]
-    omega_path_S = (omega_path_lev[-S:, :] /
-                    np.tile(omega_path_lev[-S:, :].sum(axis=0), (S, 1)))
-    omega_path_S[:, fixper:] = \
-        np.tile(omega_path_S[:, fixper].reshape((S, 1)),
-                (1, T + S - fixper))
-    g_n_path = np.zeros(T + S)
-    g_n_path[0] = g_n_curr.copy()
-    g_n_path[1:] = ((omega_path_lev[-S:, 1:].sum(axis=0) -
-                    omega_path_lev[-S:, :-1].sum(axis=0)) /
-                    omega_path_lev[-S:, :-1].sum(axis=0))
-    g_n_path[fixper + 1:] = g_n_SS
-    omega_S_preTP = (pop_past.copy()[-S:]) / (pop_past.copy()[-S:].sum())
-    imm_rates_mat = np.hstack((
-        np.tile(np.reshape(imm_rates_orig[E:], (S, 1)), (1, fixper)),
-        np.tile(np.reshape(imm_rates_adj[E:], (S, 1)), (1, T + S - fixper))))
+    omega_path_lev = project_pop(leslie_orig, pop_curr, T + S)
+    pop_objs, imm_rates_adj, imm_maxerr = get_pop_path_objs(
+        omega_path_lev, pop_past, g_n_curr, g_n_SS, fert_rates, mort_rates,
+        infmort_rate, imm_rates_orig, E, S, imm_method)
     if GraphDiag:
+        imm_tol = IMM_TOL
+        fixper = int(1.5 * S)
+        omega_SSfx = (omega_path_lev[:, fixper] /
+                      omega_path_lev[:, fixper].sum())
         # Check whether original SS population distribution is close to
         # the period-T population distribution
         omegaSSmaxdif = np.absolute(omega_SS_orig -
@@ -547,61 +858,32 @@ def get_pop_objs(E, S, T, min_yr, max_yr, curr_year, GraphDiag=True):
                   'between any two corresponding points in the original'
                   + ' and adjusted steady-state population ' +
                   'distributions is ' + str(omegaSSvTmaxdiff))
-        fig, ax = plt.subplots()
-        plt.plot(age_per_EpS, omega_SS_orig, label="Original Dist'n")
-        plt.plot(age_per_EpS, omega_SSfx, label="Fixed Dist'n")
-        # for the minor ticks, use no labels; default NullFormatter
-        minorLocator = MultipleLocator(1)
-        ax.xaxis.set_minor_locator(minorLocator)
-        plt.grid(b=True, which='major', color='0.65', linestyle='-')
-        plt.title(
-            'Original steady-state population distribution vs. fixed',
-            fontsize=20)
-        plt.xlabel(r'Age $s$')
-        plt.ylabel(r"Pop. dist'n $\omega_{s}$")
-        plt.xlim((0, E + S + 1))
-        plt.legend(loc='upper right')
-        # Create directory if OUTPUT directory does not already exist
-        '''
-        ----------------------------------------------------------------
-        output_fldr = string, path of the OUTPUT folder from cur_path
-        output_dir  = string, total path of OUTPUT folder
-        output_path = string, path of file name of figure to be saved
-        ----------------------------------------------------------------
-        '''
-        cur_path = os.path.split(os.path.abspath(__file__))[0]
-        output_fldr = 'OUTPUT/Demographics'
-        output_dir = os.path.join(cur_path, output_fldr)
-        if os.access(output_dir, os.F_OK) is False:
-            os.makedirs(output_dir)
-        output_path = os.path.join(output_dir, 'OrigVsFixSSpop')
-        plt.savefig(output_path)
-        plt.show()
+        output_dir = os.path.join(plots.OUTPUT_DIR, 'Demographics')
+        plots.emit({
+            'output_path': os.path.join(output_dir, 'OrigVsFixSSpop'),
+            'series': [
+                plots.series('plot', age_per_EpS, omega_SS_orig,
+                             label="Original Dist'n"),
+                plots.series('plot', age_per_EpS, omega_SSfx,
+                             label="Fixed Dist'n")],
+            'minor_locator': 1, 'grid': True,
+            'title': ('Original steady-state population distribution ' +
+                      'vs. fixed', 20),
+            'xlabel': r'Age $s$', 'ylabel': r"Pop. dist'n $\omega_{s}$",
+            'xlim': (0, E + S + 1), 'legend_loc': 'upper right'})
         # Print whether or not the adjusted immigration rates solved the
         # zero condition
-        immtol_solved = \
-            np.absolute(imm_diagdict['fvec'].max()) < imm_tol
-        if immtol_solved:
+        if imm_maxerr < imm_tol:
             print('POP. SUCCESS: Adjusted immigration rates solved ' +
-                  'with maximum absolute error of ' +
-                  str(np.absolute(imm_diagdict['fvec'].max())) +
+                  'with maximum absolute error of ' + str(imm_maxerr) +
                   ', which is less than the tolerance of ' +
                   str(imm_tol))
-        else:
-            print('POP. WARNING: Adjusted immigration rates did not ' +
-                  'solve. Maximum absolute error of ' +
-                  str(np.absolute(imm_diagdict['fvec'].max())) +
-                  ' is greater than the tolerance of ' + str(imm_tol))
         # Test whether the steady-state growth rates implied by the
         # adjusted OMEGA matrix equals the steady-state growth rate of
         # the original OMEGA matrix
-        OMEGA2 = np.zeros((E + S, E + S))
-        OMEGA2[0, :] = ((1 - infmort_rate) * fert_rates +
-                        np.hstack((imm_rates_adj[0], np.zeros(E+S-1))))
-        OMEGA2[1:, :-1] += np.diag(1 - mort_rates[:-1])
-        OMEGA2[1:, 1:] += np.diag(imm_rates_adj[1:])
-        eigvalues2, eigvectors2 = np.linalg.eig(OMEGA2)
-        g_n_SS_adj = (eigvalues[np.isreal(eigvalues2)].real).max() - 1
+        leslie_adj = leslie_operator(fert_rates, mort_rates, infmort_rate,
+                                     imm_rates_adj)
+        g_n_SS_adj = get_ss_pop(leslie_adj, omega_SSfx)[0]
         if np.max(np.absolute(g_n_SS_adj - g_n_SS)) > 10 ** (-8):
             print('FAILURE: The steady-state population growth rate' +
                   ' from adjusted OMEGA is different (diff is ' +
@@ -619,7 +901,7 @@ def get_pop_objs(E, S, T, min_yr, max_yr, curr_year, GraphDiag=True):
         # the adjusted steady-state population distribution. Hit is with
         # the new OMEGA transition matrix and it should return the new
         # steady-state population distribution
-        omega_new = np.dot(OMEGA2, omega_SSfx)
+        omega_new = leslie_apply(leslie_adj, omega_SSfx)
         omega_errs = np.absolute(omega_new - omega_SSfx)
         print('The maximum absolute difference between the adjusted ' +
               'steady-state population distribution and the ' +
@@ -632,55 +914,99 @@ def get_pop_objs(E, S, T, min_yr, max_yr, curr_year, GraphDiag=True):
         print('The maximum absolute distance between any two points ' +
               'of the original immigration rates and adjusted ' +
               'immigration rates is ' + str(immratesmaxdiff))
-        fig, ax = plt.subplots()
-        plt.plot(age_per_EpS, imm_rates_orig, label='Original Imm. Rates')
-        plt.plot(age_per_EpS, imm_rates_adj, label='Adj. Imm. Rates')
-        # for the minor ticks, use no labels; default NullFormatter
-        minorLocator = MultipleLocator(1)
-        ax.xaxis.set_minor_locator(minorLocator)
-        plt.grid(b=True, which='major', color='0.65', linestyle='-')
-        plt.title(
-            'Original immigration rates vs. adjusted',
-            fontsize=20)
-        plt.xlabel(r'Age $s$')
-        plt.ylabel(r'Imm. rates $i_{s}$')
-        plt.xlim((0, E + S + 1))
-        plt.legend(loc='upper center')
-        # Create directory if OUTPUT directory does not already exist
-        output_path = os.path.join(output_dir, 'OrigVsAdjImm')
-        plt.savefig(output_path)
-        plt.show()
+        plots.emit({
+            'output_path': os.path.join(output_dir, 'OrigVsAdjImm'),
+            'series': [
+                plots.series('plot', age_per_EpS, imm_rates_orig,
+                             label='Original Imm. Rates'),
+                plots.series('plot', age_per_EpS, imm_rates_adj,
+                             label='Adj. Imm. Rates')],
+            'minor_locator': 1, 'grid': True,
+            'title': ('Original immigration rates vs. adjusted', 20),
+            'xlabel': r'Age $s$', 'ylabel': r'Imm. rates $i_{s}$',
+            'xlim': (0, E + S + 1), 'legend_loc': 'upper center'})
         # Plot population distributions for data_year, curr_year,
         # curr_year+20, omega_SSfx, and omega_SS_orig
-        fig, ax = plt.subplots()
-        plt.plot(age_per_EpS, pop_2013_pct, label='2013 pop.')
-        plt.plot(age_per_EpS, (omega_path_lev[:, 0] /
-                               omega_path_lev[:, 0].sum()),
-                 label=str(curr_year) + ' pop.')
-        plt.plot(age_per_EpS, (omega_path_lev[:, int(0.5 * S)] /
-                               omega_path_lev[:, int(0.5 * S)].sum()),
-                 label='T=' + str(int(0.5 * S)) + ' pop.')
-        plt.plot(age_per_EpS, (omega_path_lev[:, int(S)] /
-                               omega_path_lev[:, int(S)].sum()),
-                 label='T=' + str(int(S)) + ' pop.')
-        plt.plot(age_per_EpS, omega_SSfx, label='Adj. SS pop.')
-        # for the minor ticks, use no labels; default NullFormatter
-        minorLocator = MultipleLocator(1)
-        ax.xaxis.set_minor_locator(minorLocator)
-        plt.grid(b=True, which='major', color='0.65', linestyle='-')
-        plt.title(
-            'Population distribution at points in time path',
-            fontsize=20)
-        plt.xlabel(r'Age $s$')
-        plt.ylabel(r"Pop. dist'n $\omega_{s}$")
-        plt.xlim((0, E+S+1))
-        plt.legend(loc='lower left')
-        # Create directory if OUTPUT directory does not already exist
-        output_path = os.path.join(output_dir, 'PopDistPath')
-        plt.savefig(output_path)
-        plt.show()
+        plots.emit({
+            'output_path': os.path.join(output_dir, 'PopDistPath'),
+            'series': [
+                plots.series('plot', age_per_EpS, pop_2013_pct,
+                             label='2013 pop.'),
+                plots.series('plot', age_per_EpS,
+                             (omega_path_lev[:, 0] /
+                              omega_path_lev[:, 0].sum()),
+                             label=str(curr_year) + ' pop.'),
+                plots.series('plot', age_per_EpS,
+                             (omega_path_lev[:, int(0.5 * S)] /
+                              omega_path_lev[:, int(0.5 * S)].sum()),
+                             label='T=' + str(int(0.5 * S)) + ' pop.'),
+                plots.series('plot', age_per_EpS,
+                             (omega_path_lev[:, int(S)] /
+                              omega_path_lev[:, int(S)].sum()),
+                             label='T=' + str(int(S)) + ' pop.'),
+                plots.series('plot', age_per_EpS, omega_SSfx,
+                             label='Adj. SS pop.')],
+            'minor_locator': 1, 'grid': True,
+            'title': ('Population distribution at points in time path',
+                      20),
+            'xlabel': r'Age $s$', 'ylabel': r"Pop. dist'n $\omega_{s}$",
+            'xlim': (0, E+S+1), 'legend_loc': 'lower left'})
     # return omega_path_S, g_n_SS, omega_SSfx, survival rates,
     # mort_rates_S, and g_n_path
-    return (omega_path_S.T, g_n_SS, omega_SSfx[-S:] /
-            omega_SSfx[-S:].sum(), 1-mort_rates_S, mort_rates_S,
-            g_n_path, imm_rates_mat.T, omega_S_preTP)
+    if cache_key is not None:
+        pop_objs = freeze_pop_objs(pop_objs)
+        _POP_OBJS[cache_key] = pop_objs
+    return pop_objs
+
+
+def get_pop_objs_batch(E, S, T, min_yr, max_yr, scenarios,
+                       imm_method='direct'):
+    '''
+    Outputs of get_pop_objs() for several scenarios at once. The data
+    are read and rebinned once, and scenarios with the same fertility
+    and mortality share their Leslie operator, steady state, aging of
+    the data and population projection (batched across their current
+    years).
+    Args:
+        E, S, T, min_yr, max_yr: as in get_pop_objs()
+        scenarios (list): one dict per scenario with 'curr_year' and
+            optionally 'fert_scale' and 'mort_scale', factors applied to
+            the fertility and mortality rates (default 1, mortality
+            rates are capped at 1)
+        imm_method (str): as in get_pop_objs()
+    Returns:
+        pop_objs (tuple): the eight outputs of get_pop_objs(), each
+            stacked along a new first axis of length len(scenarios)
+    '''
+    fert_rates = get_fert(E + S, min_yr, max_yr, graph=False)
+    mort_rates, infmort_rate = get_mort(E + S, min_yr, max_yr,
+                                        graph=False)
+    imm_rates_orig = get_imm_resid(E + S, min_yr, max_yr, graph=False)
+    pop_2013 = np.array(demog_data.get_pop_samp(min_yr, max_yr, [2013])[:, 0],
+                        dtype=np.float64)
+    pop_2013_EpS = pop_rebin(pop_2013, E + S)
+    groups = {}
+    for ind, scenario in enumerate(scenarios):
+        rates_key = (scenario.get('fert_scale', 1.0),
+                     scenario.get('mort_scale', 1.0))
+        groups.setdefault(rates_key, []).append(ind)
+    results = [None] * len(scenarios)
+    for (fert_scale, mort_scale), inds in groups.items():
+        fert_sc = fert_scale * fert_rates
+        mort_sc = np.minimum(mort_scale * mort_rates, 1.0)
+        leslie_sc = leslie_operator(fert_sc, mort_sc, infmort_rate,
+                                    imm_rates_orig)
+        g_n_SS = get_ss_pop(leslie_sc)[0]
+        curr_years = np.array([scenarios[ind]['curr_year']
+                               for ind in inds])
+        pop_past, pop_curr, g_n_curr = age_pop_data(
+            leslie_sc, pop_2013_EpS, S, curr_years)
+        omega_path_lev = project_pop(leslie_sc, pop_curr, T + S)
+        for k, ind in enumerate(inds):
+            results[ind] = get_pop_path_objs(
+                omega_path_lev[:, k, :], pop_past[:, k], g_n_curr[k],
+                g_n_SS, fert_sc, mort_sc, infmort_rate, imm_rates_orig, E,
+                S, imm_method)[0]
+    pop_objs = tuple(np.stack([res[obj_ind] for res in results])
+                     for obj_ind in range(len(results[0])))
+    return pop_objs
@@ -0,0 +1,45 @@
+'''
+Compare the number of objective evaluations L-BFGS-B spends fitting the
+elliptical utility marginal utility with finite difference gradients
+and with the analytic gradient of sumsq_MU_val_grad.
+
+Usage: python ellip_benchmark.py
+'''
+import time
+import numpy as np
+import elliptical_u_est as ellip
+
+
+def run_benchmark(frisch_list=(0.2, 0.4, 0.9, 1.5), l_tilde=1.0):
+    '''
+    Fit (b, upsilon) for each Frisch elasticity with and without the
+    analytic gradient
+
+    Returns:
+        results (list): one dict per (frisch, jac) with the estimates,
+            final sum of squares, objective evaluations, iterations and
+            elapsed time in seconds
+    '''
+    n_grid = np.linspace(0.01, 0.8, num=101)
+    params_init = np.array([.6701, 2.3499])
+    results = []
+    for frisch in frisch_list:
+        for jac in (False, True):
+            start_time = time.perf_counter()
+            result = ellip.fit_MU(1 / frisch, l_tilde, n_grid, params_init,
+                                  jac=jac)
+            elapsed = time.perf_counter() - start_time
+            results.append({'frisch': frisch, 'jac': jac,
+                            'b': result.x[0], 'upsilon': result.x[1],
+                            'ssqdev': result.fun, 'nfev': result.nfev,
+                            'iterations': result.nit, 'time': elapsed})
+
+    return results
+
+
+if __name__ == '__main__':
+    for res in run_benchmark():
+        print('frisch = {frisch:.2f}, jac = {jac!s:>5s}: nfev = {nfev:4d}, '
+              'iterations = {iterations:3d}, time = {time:.4f} s, '
+              'b = {b:.8f}, upsilon = {upsilon:.8f}, '
+              'ssqdev = {ssqdev:.3e}'.format(**res))
@@ -13,9 +13,29 @@ This Python script outputs the following:
 ------------------------------------------------------------------------
 '''
 # Import packages
+import os
+import hashlib
 import numpy as np
 import scipy.optimize as opt
-import matplotlib.pyplot as plt
+from scipy.interpolate import CubicSpline
+import plots
+
+cur_path = os.path.split(os.path.abspath(__file__))[0]
+# persisted (b, upsilon) lookup tables, one .npz file per l_tilde
+TABLE_DIR = os.path.join(cur_path, 'data', 'elliptical')
+# Frisch elasticities of the lookup tables, evenly spaced in logs
+FRISCH_GRID = np.exp(np.linspace(np.log(0.05), np.log(5.0), 100))
+# initial (b, upsilon) guess and the Frisch elasticity from which a
+# batch of fits starts before warm-starting its neighbours
+PARAMS_INIT = np.array([.6701, 2.3499])
+FRISCH_INIT = 1.0
+N_GRID = np.linspace(0.01, 0.8, num=101)
+# part of the key of the persisted tables, to be increased when the way
+# they are estimated changes
+TABLE_VERSION = '1'
+# in-process store: (l_tilde, table_key) -> (CubicSpline in log Frisch,
+# min, max)
+_TABLES = {}
 
 
 def sumsq(params, *objs):
@@ -69,7 +89,108 @@ def sumsq_MU(params, *objs):
     return ssqdev
 
 
-def estimation(frisch, l_tilde):
+def sumsq_val_grad(params, *objs):
+    '''
+    Sum of squared deviations of sumsq() and its gradient with respect
+    to (b, k, upsilon) in one pass. The powers of n_grid / l_tilde are
+    computed once in logs and shared by the value and the derivatives.
+
+    Args:
+        params (tuple): parameters to estimate, (b, k, upsilon)
+        objs (tuple): other parameters of utility function,
+            (theta, l_tilde, n_grid)
+
+    Returns:
+        ssqdev (scalar): sum of squared errors
+        grad (Numpy array): gradient of ssqdev, length 3
+
+    '''
+    theta, l_tilde, n_grid = objs
+    b, k, upsilon = params
+    log_n = np.log(n_grid / l_tilde)
+    n_ups = np.exp(upsilon * log_n)
+    log_1mn = np.log1p(-n_ups)
+    CFE = np.exp((1 + theta) * log_n) / (1 + theta)
+    root = np.exp(log_1mn / upsilon)
+    errors = CFE - (b * root + k)
+    # derivative of (1 - n_ups) ** (1 / upsilon) with respect to upsilon
+    droot_dups = root * (-log_1mn / upsilon ** 2 -
+                         n_ups * log_n / (upsilon * (1 - n_ups)))
+    ssqdev = (errors ** 2).sum()
+    grad = -2 * np.array([(errors * root).sum(), errors.sum(),
+                          (errors * b * droot_dups).sum()])
+    return ssqdev, grad
+
+
+def sumsq_MU_val_grad(params, *objs):
+    '''
+    Sum of squared deviations of sumsq_MU() and its gradient with
+    respect to (b, upsilon) in one pass. The powers of n_grid / l_tilde
+    are computed once in logs and shared by the value and the
+    derivatives.
+
+    Args:
+        params (tuple): parameters to estimate, (b, upsilon)
+        objs (tuple): other parameters of utility function,
+            (theta, l_tilde, n_grid)
+
+    Returns:
+        ssqdev (scalar): sum of squared errors
+        grad (Numpy array): gradient of ssqdev, length 2
+
+    '''
+    theta, l_tilde, n_grid = objs
+    b, upsilon = params
+    log_n = np.log(n_grid / l_tilde)
+    n_ups = np.exp(upsilon * log_n)
+    log_1mn = np.log1p(-n_ups)
+    CFE_MU = (1.0 / l_tilde) * np.exp(theta * log_n)
+    # ellipse_MU = b * shape / l_tilde
+    shape = np.exp(((1.0 / upsilon) - 1.0) * log_1mn +
+                   (upsilon - 1.0) * log_n)
+    errors = CFE_MU - b * shape / l_tilde
+    dlogshape_dups = (-log_1mn / upsilon ** 2 -
+                      ((1.0 / upsilon) - 1.0) * n_ups * log_n /
+                      (1 - n_ups) + log_n)
+    ssqdev = (errors ** 2).sum()
+    grad = (-2 / l_tilde) * np.array(
+        [(errors * shape).sum(),
+         (errors * b * shape * dlogshape_dups).sum()])
+    return ssqdev, grad
+
+
+def fit_MU(theta, l_tilde, n_grid, params_init, jac=True):
+    '''
+    Fit (b, upsilon) of the elliptical utility function to the marginal
+    utility of the constant Frisch elasticity function
+
+    Args:
+        theta (scalar): inverse of the Frisch elasticity
+        l_tilde (scalar): maximum amount of labor supply
+        n_grid (Numpy array): labor supply grid
+        params_init (Numpy array): initial (b, upsilon)
+        jac (bool): =True to use the analytic gradient from
+            sumsq_MU_val_grad(), =False for finite differences of
+            sumsq_MU()
+
+    Returns:
+        result (scipy OptimizeResult): result of opt.minimize
+
+    '''
+    ellipse_MU_objs = (theta, l_tilde, n_grid)
+    bnds_MU = ((None, None), (None, None))
+    if jac:
+        result = opt.minimize(sumsq_MU_val_grad, params_init,
+                              args=(ellipse_MU_objs), jac=True,
+                              method="L-BFGS-B", bounds=bnds_MU, tol=1e-15)
+    else:
+        result = opt.minimize(sumsq_MU, params_init,
+                              args=(ellipse_MU_objs), method="L-BFGS-B",
+                              bounds=bnds_MU, tol=1e-15)
+    return result
+
+
+def estimation(frisch, l_tilde, graph=True, params_init=None):
     '''
     This function estimates the parameters of an elliptical utility
     funcion that fits a constant frisch elasticty function.
@@ -77,6 +198,9 @@ def estimation(frisch, l_tilde):
     Args:
         frisch (scalar):  Frisch elasticity of labor supply
         l_tilde (scalar): maximum amount of labor supply
+        graph (bool): =True to plot the fitted marginal utilities
+        params_init (Numpy array): initial (b, upsilon), PARAMS_INIT if
+            None
 
     Returns:
         b_MU_til (scalar): estimated b from ellipitical utility function
@@ -91,19 +215,17 @@ def estimation(frisch, l_tilde):
     ------------------------------------------------------------------------
     '''
     theta = 1 / frisch
-    N = 101
-    graph = True
     '''
     ------------------------------------------------------------------------
     Estimate parameters of ellipitical utility function
     ------------------------------------------------------------------------
     '''
     # Initial guesses
-    b_init = .6701
+    if params_init is None:
+        params_init = PARAMS_INIT
     # k_init = -.6548
-    upsilon_init = 2.3499
     # don't estimate near edge of range of labor supply
-    n_grid = np.linspace(0.01, 0.8, num=N)
+    n_grid = N_GRID
 
     # Estimating using levels of utility function
     # ellipse_params_init = np.array([b_init, k_init, upsilon_init])
@@ -117,14 +239,9 @@ def estimation(frisch, l_tilde):
     # elapsed_time = time.clock() - start_time
 
     # Estimate params using marginal utilities
-    ellipse_MU_params_init = np.array([b_init, upsilon_init])
-    ellipse_MU_objs = (theta, l_tilde, n_grid)
-    bnds_MU = ((None, None), (None, None))
-    ellipse_MU_params_til = opt.minimize(sumsq_MU,
-                                         ellipse_MU_params_init,
-                                         args=(ellipse_MU_objs),
-                                         method="L-BFGS-B",
-                                         bounds=bnds_MU, tol=1e-15)
+    ellipse_MU_params_init = np.array(params_init, dtype=np.float64)
+    ellipse_MU_params_til = fit_MU(theta, l_tilde, n_grid,
+                                   ellipse_MU_params_init)
     (b_MU_til, upsilon_MU_til) = ellipse_MU_params_til.x
 
     # Print tax function computation time
@@ -168,16 +285,175 @@ def estimation(frisch, l_tilde):
                       ((1.0 - (n_grid / l_tilde) ** upsilon_MU_til) **
                        ((1.0 / upsilon_MU_til) - 1.0)) *
                       (n_grid / l_tilde) ** (upsilon_MU_til - 1.0))
-        fig, ax = plt.subplots()
-        plt.plot(n_grid, CFE_MU, 'r--', label='CFE')
-        plt.plot(n_grid, ellipse_MU, 'b', label='Elliptical U')
-        # for the minor ticks, use no labels; default NullFormatter
-        # ax.xaxis.set_minor_locator(MinorLocator)
-        # plt.grid(b=True, which='major', color='0.65',linestyle='-')
-        plt.legend(loc='center right')
-        plt.title('Marginal Utility of CFE and Elliptical')
-        plt.xlabel(r'Labor Supply')
-        plt.ylabel(r'Utility')
-        plt.show()
+        plots.emit({
+            'output_path': os.path.join(plots.OUTPUT_DIR, 'Elliptical',
+                                        'MU_CFE_vs_ellipse'),
+            'series': [
+                plots.series('plot', n_grid, CFE_MU, 'r--', label='CFE'),
+                plots.series('plot', n_grid, ellipse_MU, 'b',
+                             label='Elliptical U')],
+            'legend_loc': 'center right',
+            'title': ('Marginal Utility of CFE and Elliptical', None),
+            'xlabel': r'Labor Supply', 'ylabel': r'Utility'})
+
+    return b_MU_til, upsilon_MU_til
+
+
+def estimation_batch(frisch_vec, l_tilde):
+    '''
+    Estimate the elliptical utility parameters for a vector of Frisch
+    elasticities in one pass. The fits sweep outward from the elasticity
+    closest to FRISCH_INIT, each one warm-started from the estimates of
+    its neighbour.
+
+    Args:
+        frisch_vec (Numpy array): Frisch elasticities of labor supply
+        l_tilde (scalar): maximum amount of labor supply
+
+    Returns:
+        b_vec (Numpy array): estimated b for each Frisch elasticity
+        upsilon_vec (Numpy array): estimated upsilon for each Frisch
+            elasticity
+
+    '''
+    frisch_vec = np.asarray(frisch_vec, dtype=np.float64)
+    order = np.argsort(frisch_vec)
+    frisch_sort = frisch_vec[order]
+    params_sort = np.empty((frisch_sort.shape[0], 2))
+    start = int(np.argmin(np.absolute(np.log(frisch_sort) -
+                                      np.log(FRISCH_INIT))))
+    params_sort[start] = fit_MU(1 / frisch_sort[start], l_tilde, N_GRID,
+                                PARAMS_INIT).x
+    for ind_range, step in ((range(start + 1, frisch_sort.shape[0]), -1),
+                            (range(start - 1, -1, -1), 1)):
+        for ind in ind_range:
+            params_sort[ind] = fit_MU(1 / frisch_sort[ind], l_tilde, N_GRID,
+                                      params_sort[ind + step]).x
+    params = np.empty_like(params_sort)
+    params[order] = params_sort
+
+    return params[:, 0], params[:, 1]
+
+
+def table_key(frisch_grid):
+    '''
+    Key of a lookup table built on frisch_grid with the current N_GRID,
+    PARAMS_INIT, FRISCH_INIT and TABLE_VERSION
+    '''
+    sha = hashlib.sha1(TABLE_VERSION.encode())
+    for arr in (frisch_grid, N_GRID, PARAMS_INIT, FRISCH_INIT):
+        sha.update(np.ascontiguousarray(arr, dtype=np.float64).tobytes())
+
+    return sha.hexdigest()[:16]
+
+
+def table_file(l_tilde, frisch_grid=None):
+    '''
+    Path of the persisted lookup table for l_tilde. Tables on a grid other
+    than FRISCH_GRID get their own file, named after their table_key, so
+    they never replace the default table.
+    '''
+    name = 'frisch_table_' + repr(float(l_tilde))
+    if frisch_grid is not None and not np.array_equal(frisch_grid,
+                                                      FRISCH_GRID):
+        name += '_' + table_key(frisch_grid)
+
+    return os.path.join(TABLE_DIR, name + '.npz')
+
+
+def build_table(l_tilde, frisch_grid=None, save=True):
+    '''
+    Estimate the elliptical utility parameters on a grid of Frisch
+    elasticities and persist them as a lookup table, with its table_key.
+    Failure to write the table (e.g. a read-only data folder) is not an
+    error.
+
+    Args:
+        l_tilde (scalar): maximum amount of labor supply
+        frisch_grid (Numpy array): increasing Frisch elasticities,
+            FRISCH_GRID if None
+        save (bool): =True to write the table to
+            table_file(l_tilde, frisch_grid)
+
+    Returns:
+        table (dict): 'frisch', 'b', 'upsilon' and 'key' arrays
+
+    '''
+    if frisch_grid is None:
+        frisch_grid = FRISCH_GRID
+    frisch_grid = np.asarray(frisch_grid, dtype=np.float64)
+    b_vec, upsilon_vec = estimation_batch(frisch_grid, l_tilde)
+    table = {'frisch': frisch_grid, 'b': b_vec, 'upsilon': upsilon_vec,
+             'key': np.array(table_key(frisch_grid))}
+    if save:
+        try:
+            os.makedirs(TABLE_DIR, exist_ok=True)
+            out_file = table_file(l_tilde, frisch_grid)
+            tmp_file = out_file + '.tmp.npz'
+            np.savez(tmp_file, **table)
+            os.replace(tmp_file, out_file)
+        except OSError:
+            pass
+
+    return table
+
+
+def get_table(l_tilde):
+    '''
+    Interpolant of the lookup table for l_tilde on FRISCH_GRID, from the
+    in-process store, the persisted table or, if neither exists or the
+    persisted table was built with other settings, by building the table
+
+    Returns:
+        spline (CubicSpline): (b, upsilon) as a function of log Frisch
+            elasticity
+        frisch_min (scalar): smallest Frisch elasticity in the table
+        frisch_max (scalar): largest Frisch elasticity in the table
+
+    '''
+    l_tilde = float(l_tilde)
+    key = table_key(FRISCH_GRID)
+    if (l_tilde, key) not in _TABLES:
+        table = None
+        if os.path.isfile(table_file(l_tilde)):
+            with np.load(table_file(l_tilde)) as saved:
+                if 'key' in saved.files and str(saved['key']) == key:
+                    table = {name: saved[name] for name in saved.files}
+        if table is None:
+            table = build_table(l_tilde)
+        spline = CubicSpline(np.log(table['frisch']),
+                             np.column_stack((table['b'],
+                                              table['upsilon'])))
+        _TABLES[(l_tilde, key)] = (spline, table['frisch'][0],
+                                   table['frisch'][-1])
+
+    return _TABLES[(l_tilde, key)]
+
+
+def lookup(frisch, l_tilde):
+    '''
+    Elliptical utility parameters for a Frisch elasticity, interpolated
+    from the lookup table for l_tilde. Outside the range of the table,
+    the parameters are estimated, starting from the nearest end of the
+    table.
+
+    Args:
+        frisch (scalar):  Frisch elasticity of labor supply
+        l_tilde (scalar): maximum amount of labor supply
+
+    Returns:
+        b_MU_til (scalar): b from ellipitical utility function
+        upsilon_MU_til (scalar): upsilon from ellipitical utility
+            function
+
+    '''
+    spline, frisch_min, frisch_max = get_table(l_tilde)
+    if frisch_min <= frisch <= frisch_max:
+        b_MU_til, upsilon_MU_til = spline(np.log(frisch))
+    else:
+        params_init = spline(np.log(min(max(frisch, frisch_min),
+                                        frisch_max)))
+        b_MU_til, upsilon_MU_til = estimation(frisch, l_tilde, graph=False,
+                                              params_init=params_init)
 
     return b_MU_til, upsilon_MU_til
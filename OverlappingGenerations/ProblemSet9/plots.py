@@ -0,0 +1,142 @@
+'''
+------------------------------------------------------------------------
+Deferred rendering of the demographics and elliptical utility figures.
+
+The numerical functions only build plot specs, plain dicts of arrays
+and labels, and hand them to emit(). Depending on MODE, specs are
+rendered in a background thread ('background', the default), collected
+for a later call to render_pending() ('batch') or rendered right away
+('sync'). matplotlib is imported only when a figure is rendered, and
+figures are drawn with the object-oriented API so that rendering off
+the main thread is safe.
+
+A plot spec has the keys:
+    output_path (str): path of the figure file to be saved
+    series (list): dicts from series() with 'kind' ('plot' or
+        'scatter'), 'x', 'y' and matplotlib 'args' and 'kwargs'
+and optionally 'vlines' (list of (x, kwargs)), 'title' ((text,
+fontsize)), 'xlabel', 'ylabel', 'xlim', 'ylim', 'legend_loc', 'text'
+((x, y, text, fontsize)), 'minor_locator' (minor tick spacing on the
+x-axis), 'grid' (bool) and 'tight_layout_rect'.
+------------------------------------------------------------------------
+'''
+# Import packages
+import os
+import concurrent.futures
+
+cur_path = os.path.split(os.path.abspath(__file__))[0]
+OUTPUT_DIR = os.path.join(cur_path, 'OUTPUT')
+# 'background', 'batch' or 'sync'
+MODE = 'background'
+# specs waiting for render_pending() in 'batch' mode
+PENDING = []
+_EXECUTOR = None
+_FUTURES = []
+
+
+def series(kind, x, y, *args, **kwargs):
+    '''
+    One plotted series of a plot spec, drawn with
+    getattr(ax, kind)(x, y, *args, **kwargs)
+    '''
+    return {'kind': kind, 'x': x, 'y': y, 'args': args, 'kwargs': kwargs}
+
+
+def render(spec):
+    '''
+    Draw a plot spec and save it to spec['output_path']
+
+    Returns:
+        output_path (str): path of the saved figure
+    '''
+    from matplotlib.figure import Figure
+    from matplotlib.ticker import MultipleLocator
+    fig = Figure()
+    ax = fig.subplots()
+    for ser in spec['series']:
+        getattr(ax, ser['kind'])(ser['x'], ser['y'], *ser['args'],
+                                 **ser['kwargs'])
+    for x, kwargs in spec.get('vlines', []):
+        ax.axvline(x=x, **kwargs)
+    if spec.get('minor_locator') is not None:
+        # for the minor ticks, use no labels; default NullFormatter
+        ax.xaxis.set_minor_locator(MultipleLocator(spec['minor_locator']))
+    if spec.get('grid', False):
+        ax.grid(visible=True, which='major', color='0.65', linestyle='-')
+    if 'title' in spec:
+        ax.set_title(spec['title'][0], fontsize=spec['title'][1])
+    if 'xlabel' in spec:
+        ax.set_xlabel(spec['xlabel'])
+    if 'ylabel' in spec:
+        ax.set_ylabel(spec['ylabel'])
+    if 'xlim' in spec:
+        ax.set_xlim(spec['xlim'])
+    if 'ylim' in spec:
+        ax.set_ylim(spec['ylim'])
+    if 'legend_loc' in spec:
+        ax.legend(loc=spec['legend_loc'])
+    if 'text' in spec:
+        x, y, text, fontsize = spec['text']
+        ax.text(x, y, text, fontsize=fontsize)
+    if 'tight_layout_rect' in spec:
+        fig.tight_layout(rect=spec['tight_layout_rect'])
+    # Create directory if OUTPUT directory does not already exist
+    output_dir = os.path.split(spec['output_path'])[0]
+    os.makedirs(output_dir, exist_ok=True)
+    fig.savefig(spec['output_path'])
+
+    return spec['output_path']
+
+
+def emit(spec):
+    '''
+    Hand a plot spec to the renderer according to MODE
+
+    Returns:
+        future (concurrent.futures.Future): the pending rendering in
+            'background' mode, None otherwise
+    '''
+    global _EXECUTOR
+    if MODE == 'sync':
+        render(spec)
+        return None
+    elif MODE == 'batch':
+        PENDING.append(spec)
+        return None
+    elif MODE == 'background':
+        if _EXECUTOR is None:
+            _EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        future = _EXECUTOR.submit(render, spec)
+        _FUTURES.append(future)
+        return future
+    else:
+        raise ValueError("MODE must be 'background', 'batch' or 'sync'")
+
+
+def render_pending():
+    '''
+    Render the specs collected in 'batch' mode
+
+    Returns:
+        output_paths (list): paths of the saved figures
+    '''
+    output_paths = []
+    while PENDING:
+        output_paths.append(render(PENDING.pop(0)))
+
+    return output_paths
+
+
+def wait():
+    '''
+    Wait for the figures being rendered in the background, raising any
+    error from rendering
+
+    Returns:
+        output_paths (list): paths of the saved figures
+    '''
+    output_paths = []
+    while _FUTURES:
+        output_paths.append(_FUTURES.pop(0).result())
+
+    return output_paths
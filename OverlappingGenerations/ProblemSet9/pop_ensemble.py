@@ -0,0 +1,135 @@
+'''
+------------------------------------------------------------------------
+Stochastic population projection ensembles.
+
+Projects n_sims population paths from the current population with
+fertility, mortality and immigration rates hit by aggregate shocks
+each period. The shocks are mean-one lognormal multipliers on each
+rate schedule, with persistence rho in logs. All simulations are
+advanced at once through the structured Leslie operator on an
+(n_sims, E+S) state. The (n_sims, T+S, S) population distribution
+paths are written to a memory-mapped .npy file as they are produced,
+and the quantile bands of each period are computed as that period is
+simulated.
+------------------------------------------------------------------------
+'''
+# Import packages
+import tempfile
+import numpy as np
+import demographic_data as demog_data
+import demographics as demog
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def shocked_apply(births_row, surv_rates, imm_rates, pop, fert_mult,
+                  mort_mult, imm_mult, out):
+    '''
+    Population next period for each simulation, given the shock
+    multipliers on its rates this period
+    Args:
+        births_row (Numpy array): (1 - infmort_rate) * fert_rates,
+            length E+S
+        surv_rates (Numpy array): 1 - mort_rates[:-1], length E+S-1
+        imm_rates (Numpy array): immigration rates, length E+S
+        pop (Numpy array): population by age, (n_sims, E+S)
+        fert_mult, mort_mult, imm_mult (Numpy arrays): multipliers on
+            fertility, mortality and immigration rates, length n_sims
+        out (Numpy array): (n_sims, E+S) array the result is written
+            to, not overlapping pop
+    Returns:
+        out (Numpy array): population next period, (n_sims, E+S)
+    '''
+    first_row = births_row[:, None] * fert_mult[None, :]
+    first_row[0] += imm_rates[0] * imm_mult
+    surv_sim = 1 - np.minimum((1 - surv_rates)[:, None] *
+                              mort_mult[None, :], 1.0)
+    imm_diag = imm_rates[1:, None] * imm_mult[None, :]
+    # one structured Leslie operator per simulation, applied to the
+    # (E+S, n_sims) view of the state
+    demog.leslie_apply((first_row, surv_sim, imm_diag), pop.T, out=out.T)
+
+    return out
+
+
+def simulate_pop(E, S, T, min_yr, max_yr, curr_year, n_sims,
+                 sd=(0.05, 0.05, 0.2), rho=0.0, seed=None, out_file=None,
+                 quantiles=QUANTILES):
+    '''
+    Simulate an ensemble of population paths
+    Args:
+        E, S, T, min_yr, max_yr, curr_year: as in
+            demographics.get_pop_objs()
+        n_sims (int): number of simulated paths
+        sd (tuple): standard deviations of the log shocks to the
+            fertility, mortality and immigration rates
+        rho (scalar): persistence of the log shocks, in [0, 1)
+        seed (int or None): seed for numpy.random.default_rng
+        out_file (str): path of the .npy file for the population
+            distribution paths. If None, the paths are kept in an
+            anonymous temporary file that is deleted with the array
+        quantiles (tuple): quantiles of the bands
+    Returns:
+        ensemble (dict):
+            'omega_path_S' (numpy.memmap): population distribution
+                paths, (n_sims, T+S, S)
+            'g_n_path' (Numpy array): population growth rate paths,
+                (n_sims, T+S)
+            'omega_bands' (Numpy array): quantiles of the population
+                distribution, (len(quantiles), T+S, S)
+            'g_n_bands' (Numpy array): quantiles of the growth rate,
+                (len(quantiles), T+S)
+            'quantiles' (Numpy array): the quantiles
+            'out_file' (str): path of the memory-mapped file, None
+                for the temporary file
+    '''
+    fert_rates = demog.get_fert(E + S, min_yr, max_yr, graph=False)
+    mort_rates, infmort_rate = demog.get_mort(E + S, min_yr, max_yr,
+                                              graph=False)
+    imm_rates = demog.get_imm_resid(E + S, min_yr, max_yr, graph=False)
+    leslie_ops = demog.leslie_operator(fert_rates, mort_rates,
+                                       infmort_rate, imm_rates)
+    pop_2013 = np.array(demog_data.get_pop_samp(min_yr, max_yr, [2013])[:, 0],
+                        dtype=np.float64)
+    pop_past, pop_curr, g_n_curr = demog.age_pop_data(
+        leslie_ops, demog.pop_rebin(pop_2013, E + S), S, curr_year)
+    births_row = (1 - infmort_rate) * fert_rates
+    surv_rates = 1 - mort_rates[:-1]
+    sd = np.asarray(sd, dtype=np.float64)
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    if out_file is None:
+        omega_path_S = np.memmap(tempfile.TemporaryFile(), mode='w+',
+                                 dtype=np.float64, shape=(n_sims, T + S, S))
+    else:
+        omega_path_S = np.lib.format.open_memmap(
+            out_file, mode='w+', dtype=np.float64, shape=(n_sims, T + S, S))
+    g_n_path = np.empty((n_sims, T + S))
+    omega_bands = np.empty((quantiles.shape[0], T + S, S))
+    g_n_bands = np.empty((quantiles.shape[0], T + S))
+    pop = np.tile(pop_curr, (n_sims, 1))
+    pop_next = np.empty_like(pop)
+    log_shocks = np.zeros((3, n_sims))
+    for per in range(T + S):
+        if per > 0:
+            log_shocks = (rho * log_shocks + np.sqrt(1 - rho ** 2) *
+                          sd[:, None] * rng.standard_normal((3, n_sims)))
+            fert_mult, mort_mult, imm_mult = np.exp(
+                log_shocks - 0.5 * sd[:, None] ** 2)
+            shocked_apply(births_row, surv_rates, imm_rates, pop, fert_mult,
+                          mort_mult, imm_mult, pop_next)
+            g_n_path[:, per] = (pop_next[:, -S:].sum(axis=1) /
+                                pop[:, -S:].sum(axis=1) - 1)
+            pop, pop_next = pop_next, pop
+        else:
+            g_n_path[:, per] = g_n_curr
+        omega = pop[:, -S:] / pop[:, -S:].sum(axis=1, keepdims=True)
+        omega_path_S[:, per, :] = omega
+        omega_bands[:, per, :] = np.quantile(omega, quantiles, axis=0)
+        g_n_bands[:, per] = np.quantile(g_n_path[:, per], quantiles)
+    omega_path_S.flush()
+    ensemble = {'omega_path_S': omega_path_S, 'g_n_path': g_n_path,
+                'omega_bands': omega_bands, 'g_n_bands': g_n_bands,
+                'quantiles': quantiles, 'out_file': out_file}
+
+    return ensemble
@@ -0,0 +1,46 @@
+import os
+import numpy as np
+import pandas as pd
+import demographic_data as demog_data
+
+
+def test_pop_samp_matches_csv():
+    """
+    Test that the parsed population data match a direct read of the
+    CSV file.
+    """
+    pop_data = pd.read_csv(demog_data.POP_FILE, thousands=',')
+    pop_data_samp = pop_data[(pop_data['Age'] >= 0) &
+                             (pop_data['Age'] <= 99)]
+    pop_samp = demog_data.get_pop_samp(1, 100, [2010, 2013])
+
+    assert np.array_equal(pop_samp[:, 0], pop_data_samp['2010'])
+    assert np.array_equal(pop_samp[:, 1], pop_data_samp['2013'])
+    assert not demog_data.get_pop_data()['pop'].flags.writeable
+
+
+def test_disk_cache(tmpdir, monkeypatch):
+    """
+    Test that the .npz cache is written, reused after the source file is
+    touched, and gives the same arrays as parsing.
+    """
+    monkeypatch.setattr(demog_data, 'CACHE_DIR', str(tmpdir))
+    monkeypatch.setattr(demog_data, '_DATA', {})
+    parsed = demog_data.get_mort_data()
+    cache_file = os.path.join(str(tmpdir), 'mort_rates2011.npz')
+    assert os.path.isfile(cache_file)
+    assert demog_data.get_mort_data() is parsed
+
+    # a new process only reads the cache
+    monkeypatch.setattr(demog_data, '_DATA', {})
+    monkeypatch.setattr(demog_data, 'parse_mort', None)
+    cached = demog_data.get_mort_data()
+    for name in parsed:
+        assert np.array_equal(cached[name], parsed[name], equal_nan=True)
+
+    # a changed fingerprint with unchanged contents is still a cache hit
+    monkeypatch.setattr(demog_data, '_DATA', {})
+    monkeypatch.setattr(demog_data, 'file_fingerprint',
+                        lambda path: (0, 0))
+    rehashed = demog_data.get_mort_data()
+    assert np.array_equal(rehashed['age'], parsed['age'])
@@ -1,4 +1,5 @@
 import numpy as np
+import scipy.interpolate as si
 import demographics
 
 
@@ -62,6 +63,40 @@ def test_get_fert():
     assert (fert_rates.shape[0] == S)
 
 
+def test_get_fert_sub_bins():
+    '''
+    Test that the exact fertility rate bin averages match the 10,000
+    point sub-bin sums they replace
+    '''
+    min_yr, max_yr = 1, 100
+    curr_pop = np.array(
+        demographics.demog_data.get_pop_samp(min_yr, max_yr, [2013])[:, 0],
+        dtype='f')
+    curr_pop_pct = curr_pop / curr_pop.sum()
+    fert_data = (np.array([0.0, 0.0, 0.3, 12.3, 47.1, 80.7, 105.5, 98.0,
+                           49.3, 10.4, 0.8, 0.0, 0.0]) / 2000)
+    age_midp = np.array([9, 10, 12, 16, 18.5, 22, 27, 32, 37, 42, 47,
+                         55, 56])
+    fert_func = si.interp1d(age_midp, fert_data, kind='cubic')
+    num_sub_bins = 10000
+    for totpers in (100, 80, 37):
+        binsize = (max_yr - min_yr + 1) / totpers
+        age_sub = (np.linspace(binsize / num_sub_bins, max_yr,
+                               num_sub_bins * max_yr) -
+                   0.5 * binsize / num_sub_bins)
+        pop_sub = np.repeat(np.float64(curr_pop_pct) / num_sub_bins,
+                            num_sub_bins)
+        fert_sub = np.zeros(pop_sub.shape)
+        pred_ind = (age_sub > age_midp[0]) * (age_sub < age_midp[-1])
+        fert_sub[pred_ind] = fert_func(age_sub[pred_ind])
+        edges = np.rint(np.arange(totpers + 1) * 100.0 * num_sub_bins /
+                        totpers).astype(int)
+        fert_expected = (np.add.reduceat(pop_sub * fert_sub, edges[:-1]) /
+                         np.add.reduceat(pop_sub, edges[:-1]))
+        fert_rates = demographics.get_fert(totpers, min_yr, max_yr)
+        assert np.allclose(fert_rates, fert_expected, rtol=0.0, atol=1e-10)
+
+
 def test_get_mort():
     '''
     Test of function to get mortality rates from data
@@ -72,6 +107,44 @@ def test_get_mort():
     assert (mort_rates.shape[0] == S)
 
 
+def test_mort_rebin():
+    '''
+    Test batched mortality rebinning with fractional bin edges against
+    products of survival over a fine grid
+    '''
+    mort_data = demographics.demog_data.get_mort_data()
+    mort_yr = np.column_stack((mort_data['male_rate'][:100],
+                               mort_data['female_rate'][:100]))
+    edges = np.linspace(0.0, 100.0, 38)
+    mort_rates = demographics.mort_rebin(mort_yr, edges)
+    assert mort_rates.shape == (37, 2)
+    assert np.allclose(mort_rates[:, 1],
+                       demographics.mort_rebin(mort_yr[:, 1], edges))
+    num_fine = 740
+    surv_fine = np.repeat((1 - mort_yr) ** (1.0 / num_fine), num_fine,
+                          axis=0)
+    fine_edges = np.rint(edges * num_fine).astype(int)
+    mort_expected = 1 - np.multiply.reduceat(surv_fine, fine_edges[:-1])
+    assert np.allclose(mort_rates, mort_expected, rtol=1e-8, atol=0.0)
+
+
+def test_mort_rebin_certain_death():
+    '''
+    Test that bins covering a year with a mortality rate of 1 get a rate
+    of 1 and the other bins are not affected, for one table and a batch
+    '''
+    mort_yr = np.array([0.1, 0.2, 1.0])
+    assert np.allclose(demographics.mort_rebin(mort_yr, [0, 1, 2, 3]),
+                       [0.1, 0.2, 1.0])
+    assert np.allclose(demographics.mort_rebin(mort_yr, [0, 1.5, 2.5, 3]),
+                       [1 - 0.9 * np.sqrt(0.8), 1.0, 1.0])
+    mort_batch = np.column_stack((mort_yr, [0.1, 0.3, 1.0]))
+    mort_rates = demographics.mort_rebin(mort_batch, [0, 1.5, 2.5, 3])
+    assert not np.isnan(mort_rates).any()
+    assert np.allclose(mort_rates[:, 1],
+                       [1 - 0.9 * np.sqrt(0.7), 1.0, 1.0])
+
+
 def test_infant_mort():
     '''
     Test of function to get mortality rates from data
@@ -93,6 +166,157 @@ def test_pop_rebin():
     assert (rebinned_data.shape[0] == totpers_new)
 
 
+def test_pop_rebin_batch():
+    '''
+    Test that rebinning all years of population data at once matches
+    rebinning each year, preserves total population, and can split
+    periods as well as combine them
+    '''
+    pop_samp = demographics.demog_data.get_pop_samp(
+        1, 100, [2010, 2011, 2012, 2013])
+    for totpers_new in (37, 80, 100, 150):
+        pop_new = demographics.pop_rebin(pop_samp, totpers_new)
+        assert pop_new.shape == (totpers_new, 4)
+        assert pop_new.dtype == np.float64
+        assert np.allclose(pop_new.sum(axis=0), pop_samp.sum(axis=0),
+                           rtol=1e-12)
+        for year_ind in range(4):
+            assert np.allclose(pop_new[:, year_ind], demographics.pop_rebin(
+                pop_samp[:, year_ind], totpers_new), rtol=1e-12)
+    pop_dist = np.array([0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8])
+    assert np.allclose(demographics.pop_rebin(pop_dist, 4),
+                       pop_dist[0::2] + pop_dist[1::2])
+    assert np.allclose(demographics.pop_rebin(pop_dist, 16),
+                       np.repeat(pop_dist / 2, 2))
+
+
+def test_leslie_operator():
+    '''
+    Test that the structured Leslie operator matches the dense OMEGA
+    matrix for single and batched populations and for multi-period
+    projections
+    '''
+    totpers = 60
+    fert_rates = demographics.get_fert(totpers, 1, 100)
+    mort_rates, infmort_rate = demographics.get_mort(totpers, 1, 100)
+    imm_rates = demographics.get_imm_resid(totpers, 1, 100, graph=False)
+    leslie_ops = demographics.leslie_operator(fert_rates, mort_rates,
+                                              infmort_rate, imm_rates)
+    OMEGA = demographics.leslie_matrix(leslie_ops)
+    assert np.allclose(OMEGA[0, 1:], (1 - infmort_rate) * fert_rates[1:])
+    assert np.allclose(np.diag(OMEGA, -1), 1 - mort_rates[:-1])
+    pop = np.random.default_rng(0).uniform(size=(totpers, 3))
+    assert np.allclose(demographics.leslie_apply(leslie_ops, pop),
+                       np.dot(OMEGA, pop), rtol=1e-14)
+    assert np.allclose(demographics.leslie_apply(leslie_ops, pop[:, 0]),
+                       np.dot(OMEGA, pop[:, 0]), rtol=1e-14)
+    # rates given for each population
+    scale = np.array([1.0, 0.5, 2.0])
+    ops_each = tuple(np.outer(rates, scale) for rates in leslie_ops)
+    assert np.allclose(demographics.leslie_apply(ops_each, pop),
+                       np.dot(OMEGA, pop) * scale, rtol=1e-14)
+    assert np.allclose(demographics.leslie_power(leslie_ops, pop[:, 0], 25),
+                       np.dot(np.linalg.matrix_power(OMEGA, 25), pop[:, 0]),
+                       rtol=1e-12)
+    # a small operator projected far ahead uses repeated squaring
+    small_ops = demographics.leslie_operator(
+        np.array([0.0, 0.9, 0.4]), np.array([0.01, 0.2, 1.0]), 0.0,
+        np.zeros(3))
+    assert np.allclose(
+        demographics.leslie_power(small_ops, np.ones(3), 1000),
+        np.dot(np.linalg.matrix_power(demographics.leslie_matrix(small_ops),
+                                      1000), np.ones(3)), rtol=1e-10)
+
+
+def test_get_ss_pop():
+    '''
+    Test that the Euler-Lotka steady-state population matches the
+    dominant eigenpair of the dense OMEGA matrix, including with
+    several hundred age groups, and that the power iteration fallback
+    does too
+    '''
+    for totpers in (80, 400):
+        fert_rates = demographics.get_fert(totpers, 1, 100)
+        mort_rates, infmort_rate = demographics.get_mort(totpers, 1, 100)
+        imm_rates = demographics.get_imm_resid(totpers, 1, 100, graph=False)
+        leslie_ops = demographics.leslie_operator(
+            fert_rates, mort_rates, infmort_rate, imm_rates)
+        g_n_SS, omega_SS = demographics.get_ss_pop(leslie_ops)
+        eigvalues, eigvectors = np.linalg.eig(
+            demographics.leslie_matrix(leslie_ops))
+        max_ind = np.argmax(np.where(np.isreal(eigvalues), eigvalues.real,
+                                     -np.inf))
+        eigvec = eigvectors[:, max_ind].real
+        assert np.isclose(g_n_SS, eigvalues[max_ind].real - 1, rtol=0.0,
+                          atol=1e-12)
+        assert np.allclose(omega_SS, eigvec / eigvec.sum(), rtol=0.0,
+                           atol=1e-12)
+    # without fertility there is no Euler-Lotka root
+    leslie_ops = demographics.leslie_operator(
+        np.zeros(4), np.array([0.1, 0.1, 0.2, 1.0]), 0.0,
+        np.array([0.0, 0.02, 0.05, 0.3]))
+    g_n_SS, omega_SS = demographics.get_ss_pop(leslie_ops)
+    assert np.isclose(g_n_SS, 0.3 - 1)
+    assert np.allclose(omega_SS, [0.0, 0.0, 0.0, 1.0], atol=1e-8)
+
+
+def test_imm_adj_direct():
+    '''
+    Test that the directly solved adjusted immigration rates zero the
+    immsolve residual and match the fsolve solution
+    '''
+    totpers = 100
+    fert_rates = demographics.get_fert(totpers, 1, 100)
+    mort_rates, infmort_rate = demographics.get_mort(totpers, 1, 100)
+    imm_rates = demographics.get_imm_resid(totpers, 1, 100, graph=False)
+    leslie_ops = demographics.leslie_operator(fert_rates, mort_rates,
+                                              infmort_rate, imm_rates)
+    g_n_SS = demographics.get_ss_pop(leslie_ops)[0]
+    omega_lev = demographics.leslie_power(
+        leslie_ops, np.ones(totpers), 50)
+    imm_objs = (fert_rates, mort_rates, infmort_rate, omega_lev, g_n_SS)
+    imm_adj = demographics.get_imm_adj(*imm_objs)
+    assert np.absolute(demographics.immsolve(imm_adj, *imm_objs)).max() < \
+        1e-14
+    imm_omegas = demographics.get_pop_objs(20, 80, 320, 1, 100, 2018,
+                                           False)[6]
+    imm_omegas_fsolve = demographics.get_pop_objs(
+        20, 80, 320, 1, 100, 2018, False, imm_method='fsolve')[6]
+    assert np.allclose(imm_omegas, imm_omegas_fsolve, rtol=0.0, atol=1e-10)
+
+
+def test_get_pop_objs_memo():
+    '''
+    Test that repeated calls return the memoized read-only outputs
+    '''
+    pop_objs = demographics.get_pop_objs(20, 80, 320, 1, 100, 2018, False)
+    pop_objs2 = demographics.get_pop_objs(20, 80, 320, 1, 100, 2018, False)
+    assert pop_objs2 is pop_objs
+    assert not pop_objs[0].flags.writeable
+    assert demographics.get_pop_objs(20, 80, 320, 1, 100, 2019,
+                                     False) is not pop_objs
+
+
+def test_get_pop_objs_batch():
+    '''
+    Test that batched scenarios match separate get_pop_objs calls and
+    that higher fertility raises steady-state population growth
+    '''
+    E, S, T = 10, 50, 200
+    scenarios = [{'curr_year': 2030}, {'curr_year': 2018},
+                 {'curr_year': 2030, 'fert_scale': 1.1},
+                 {'curr_year': 2013, 'mort_scale': 1.0}]
+    pop_objs = demographics.get_pop_objs_batch(E, S, T, 1, 100, scenarios)
+    assert pop_objs[0].shape == (4, T + S, S)
+    for ind in (0, 1, 3):
+        single = demographics.get_pop_objs(
+            E, S, T, 1, 100, scenarios[ind]['curr_year'], False)
+        for obj_ind in range(8):
+            assert np.allclose(pop_objs[obj_ind][ind], single[obj_ind],
+                               rtol=1e-12, atol=1e-15)
+    assert pop_objs[1][2] > pop_objs[1][0]
+
+
 def test_get_imm_resid():
     '''
     Test of function to solve for immigration rates from population data
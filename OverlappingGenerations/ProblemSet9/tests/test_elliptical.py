@@ -0,0 +1,105 @@
+import numpy as np
+import scipy.optimize as opt
+import elliptical_u_est as ellip
+import ellip_benchmark
+
+
+def test_val_grad():
+    """
+    Test that the fused value and gradient functions match sumsq and
+    sumsq_MU and that their gradients match finite differences.
+    """
+    n_grid = np.linspace(0.01, 0.8, num=101)
+    for theta, l_tilde in ((1 / 0.9, 1.0), (1 / 0.4, 1.3)):
+        objs = (theta, l_tilde, n_grid)
+        for val_grad, func, params in (
+                (ellip.sumsq_val_grad, ellip.sumsq,
+                 np.array([0.7, -0.6, 2.1])),
+                (ellip.sumsq_MU_val_grad, ellip.sumsq_MU,
+                 np.array([0.7, 2.1]))):
+            val, grad = val_grad(params, *objs)
+            assert np.allclose(val, func(params, *objs), rtol=1e-12)
+            err = opt.check_grad(lambda x: val_grad(x, *objs)[0],
+                                 lambda x: val_grad(x, *objs)[1], params)
+            assert err < 1e-5 * max(1.0, np.absolute(grad).max())
+
+
+def test_benchmark_nfev():
+    """
+    Test that the analytic gradient reaches the same estimates with
+    fewer objective evaluations.
+    """
+    results = ellip_benchmark.run_benchmark()
+    for res_fd, res_an in zip(results[::2], results[1::2]):
+        assert res_an['nfev'] < res_fd['nfev']
+        assert np.allclose([res_an['b'], res_an['upsilon']],
+                           [res_fd['b'], res_fd['upsilon']], rtol=1e-5)
+        assert res_an['ssqdev'] <= res_fd['ssqdev'] * (1 + 1e-10)
+
+
+def test_estimation_batch():
+    """
+    Test that the warm-started batch matches single fits where those
+    converge and also converges for large Frisch elasticities.
+    """
+    frisch_vec = np.array([0.9, 0.2, 3.0, 0.5, 2.5])
+    b_vec, upsilon_vec = ellip.estimation_batch(frisch_vec, 1.0)
+    n_grid = ellip.N_GRID
+    for frisch, b, upsilon in zip(frisch_vec, b_vec, upsilon_vec):
+        theta = 1 / frisch
+        assert np.isfinite(ellip.sumsq_MU((b, upsilon), theta, 1.0, n_grid))
+        if frisch < 1.0:
+            assert np.allclose((b, upsilon), ellip.estimation(
+                frisch, 1.0, graph=False), rtol=1e-6)
+
+
+def test_lookup(tmpdir, monkeypatch):
+    """
+    Test that the lookup table is persisted, interpolates the fitted
+    parameters and falls back to a fit outside its range.
+    """
+    monkeypatch.setattr(ellip, 'TABLE_DIR', str(tmpdir))
+    monkeypatch.setattr(ellip, 'FRISCH_GRID',
+                        np.exp(np.linspace(np.log(0.2), np.log(2.0), 60)))
+    monkeypatch.setattr(ellip, '_TABLES', {})
+    ellip.build_table(1.2)
+    assert tmpdir.join('frisch_table_1.2.npz').check()
+    b_vec, upsilon_vec = ellip.estimation_batch([0.37, 0.81, 1.7], 1.2)
+    for frisch, b, upsilon in zip((0.37, 0.81, 1.7), b_vec, upsilon_vec):
+        assert np.allclose(ellip.lookup(frisch, 1.2), (b, upsilon),
+                           rtol=1e-5)
+    b, upsilon = ellip.lookup(0.1, 1.2)
+    assert np.allclose((b, upsilon), ellip.estimation(0.1, 1.2, graph=False),
+                       rtol=1e-6)
+
+
+def test_table_key(tmpdir, monkeypatch):
+    """
+    Test that a table on another grid does not replace the default table
+    and that a persisted table built with other settings is rebuilt.
+    """
+    monkeypatch.setattr(ellip, 'TABLE_DIR', str(tmpdir))
+    monkeypatch.setattr(ellip, 'FRISCH_GRID',
+                        np.exp(np.linspace(np.log(0.5), np.log(1.5), 8)))
+    monkeypatch.setattr(ellip, '_TABLES', {})
+    ellip.build_table(1.2, frisch_grid=np.linspace(0.6, 1.4, 5))
+    assert not tmpdir.join('frisch_table_1.2.npz').check()
+    assert len(tmpdir.listdir()) == 1
+    ellip.get_table(1.2)
+    with np.load(ellip.table_file(1.2)) as saved:
+        assert np.array_equal(saved['frisch'], ellip.FRISCH_GRID)
+
+    # a table saved with another N_GRID is not used
+    monkeypatch.setattr(ellip, 'N_GRID', np.linspace(0.01, 0.8, num=51))
+    monkeypatch.setattr(ellip, '_TABLES', {})
+    calls = []
+    build_table = ellip.build_table
+    monkeypatch.setattr(ellip, 'build_table',
+                        lambda *args: calls.append(args) or build_table(*args))
+    ellip.get_table(1.2)
+    assert len(calls) == 1
+    with np.load(ellip.table_file(1.2)) as saved:
+        assert str(saved['key']) == ellip.table_key(ellip.FRISCH_GRID)
+    monkeypatch.setattr(ellip, '_TABLES', {})
+    ellip.get_table(1.2)
+    assert len(calls) == 1
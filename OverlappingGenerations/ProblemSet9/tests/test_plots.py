@@ -0,0 +1,52 @@
+import os
+import sys
+import subprocess
+import demographics
+import elliptical_u_est
+import plots
+
+
+def test_lazy_matplotlib():
+    """
+    Test that importing the numerical modules does not import
+    matplotlib.
+    """
+    code = ('import sys, demographics, elliptical_u_est; ' +
+            'print("matplotlib" in sys.modules)')
+    cur_path = os.path.split(os.path.split(os.path.abspath(__file__))[0])[0]
+    output = subprocess.check_output([sys.executable, '-c', code],
+                                     cwd=cur_path)
+    assert output.decode().strip() == 'False'
+
+
+def test_batch_render(tmpdir, monkeypatch):
+    """
+    Test that batch mode collects the plot specs without rendering and
+    renders them all later.
+    """
+    monkeypatch.setattr(plots, 'OUTPUT_DIR', str(tmpdir))
+    monkeypatch.setattr(plots, 'MODE', 'batch')
+    demographics.get_fert(100, 1, 100, graph=True)
+    demographics.get_mort(100, 1, 100, graph=True)
+    demographics.get_pop_objs(20, 80, 320, 1, 100, 2018, True)
+    elliptical_u_est.estimation(0.9, 1.0)
+    assert len(plots.PENDING) == 6
+    assert not os.listdir(str(tmpdir))
+    output_paths = plots.render_pending()
+    assert len(plots.PENDING) == 0
+    for output_path in output_paths:
+        assert os.path.isfile(output_path + '.png')
+
+
+def test_background_render(tmpdir, monkeypatch):
+    """
+    Test that background mode renders the figures in a worker thread.
+    """
+    monkeypatch.setattr(plots, 'OUTPUT_DIR', str(tmpdir))
+    monkeypatch.setattr(plots, 'MODE', 'background')
+    plots.wait()
+    demographics.get_imm_resid(100, 1, 100, graph=True)
+    output_paths = plots.wait()
+    assert output_paths == [os.path.join(str(tmpdir), 'Demographics',
+                                         'imm_rates_orig')]
+    assert os.path.isfile(output_paths[0] + '.png')
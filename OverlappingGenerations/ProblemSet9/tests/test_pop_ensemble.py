@@ -0,0 +1,54 @@
+import os
+import numpy as np
+import demographics
+import pop_ensemble
+
+
+def test_no_shocks(tmpdir):
+    """
+    Test that without shocks every simulated path is the deterministic
+    projection of get_pop_objs up to the period where immigration is
+    adjusted.
+    """
+    E, S, T = 10, 50, 200
+    out_file = os.path.join(str(tmpdir), 'omega_sims.npy')
+    ensemble = pop_ensemble.simulate_pop(E, S, T, 1, 100, 2025, 4,
+                                         sd=(0.0, 0.0, 0.0), seed=0,
+                                         out_file=out_file)
+    (omega_path_S, g_n_SS, omega_SS, surv_rates, mort_rates, g_n_path,
+        imm_rates, omega_S_preTP) = demographics.get_pop_objs(
+            E, S, T, 1, 100, 2025, False)
+    fixper = int(1.5 * S)
+    omega_sims = np.load(out_file, mmap_mode='r')
+    assert omega_sims.shape == (4, T + S, S)
+    assert np.allclose(omega_sims[:, :fixper + 1, :],
+                       omega_path_S[None, :fixper + 1, :], atol=1e-13)
+    assert np.allclose(ensemble['g_n_path'][:, :fixper + 1],
+                       g_n_path[None, :fixper + 1], atol=1e-13)
+
+
+def test_bands(tmpdir):
+    """
+    Test that the simulations are reproducible from the seed and that
+    the quantile bands are ordered and match the stored paths.
+    """
+    E, S, T = 10, 50, 200
+    ensembles = [pop_ensemble.simulate_pop(
+        E, S, T, 1, 100, 2020, 300, seed=1234,
+        out_file=os.path.join(str(tmpdir), 'sims' + str(i) + '.npy'))
+        for i in range(2)]
+    assert np.array_equal(ensembles[0]['omega_path_S'],
+                          ensembles[1]['omega_path_S'])
+    # without out_file the paths are in an anonymous temporary file
+    ensemble_tmp = pop_ensemble.simulate_pop(E, S, T, 1, 100, 2020, 300,
+                                             seed=1234)
+    assert ensemble_tmp['out_file'] is None
+    assert np.array_equal(ensemble_tmp['omega_path_S'],
+                          ensembles[0]['omega_path_S'])
+    ensemble = ensembles[0]
+    assert np.all(np.diff(ensemble['g_n_bands'], axis=0) >= 0)
+    assert np.all(np.diff(ensemble['omega_bands'], axis=0) >= 0)
+    assert np.allclose(ensemble['omega_bands'][:, T, :],
+                       np.quantile(ensemble['omega_path_S'][:, T, :],
+                                   ensemble['quantiles'], axis=0))
+    assert ensemble['g_n_bands'][-1, -1] > ensemble['g_n_bands'][0, -1]
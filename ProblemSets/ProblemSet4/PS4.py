@@ -12,9 +12,9 @@ import scipy.optimize as opt
 from scipy.optimize import differential_evolution
 
 # Read in data and convert price and population variables to millions
-ACH_data = pd.read_excel('radio_merger_data.xlsx',header = 0)
-ACH_data['price_mil'] = ACH_data['price']/1000000
-ACH_data['population_target_mil'] = ACH_data['population_target']/1000000
+# The spreadsheet is only parsed on the first run, later runs map the cached columns
+from precompute import load_merger_data
+ACH_data = load_merger_data('radio_merger_data.xlsx')
 ACH_data.describe()
 
 # Split data by year - this makes it easier to compute the score function by year and then
@@ -23,42 +23,38 @@ ACH_data.describe()
 temp07 = ACH_data[ACH_data['year'] == 2007]
 temp08 = ACH_data[ACH_data['year'] == 2008]
 
-# Call the differential evolution optimizer on the objective function
-# First, this is done on the objective function without price
+# The distances and interaction terms do not depend on the parameters, so they are
+# computed once here and each objective evaluation only combines them
+from precompute import precompute, pair_coefs
+markets = precompute(temp07, temp08)
 
-from Obj_func import obj_func_no_price
+# The model without price has only two parameters, so its maximum score is found exactly:
+# the score is constant on the cells of the arrangement of lines, one per pairwise inequality,
+# and sweeping along each line visits every cell
+
+from exact_ms import max_score_2d
+from Obj_func import obj_func_vec
 
 # I tried many different bounds on the parameters and these bounds provided the best results
 
 bnds = [(0, 4000), (-10, 10)]
-args = (temp07, temp08)
-obj_min = 1e+100
-
-# I run the optimization routine three times to see if the stochastic nature of differential evolution
-# leads to different results. This wasn't the case when I tried it earlier.
-
-for i in range(3):
-    max_score = differential_evolution(obj_func_no_price, bnds, args = args, tol = 1e-15)
-    print('Iteration ', i + 1, ' is complete')  # This is just a check to see how many iterations have been completed
-    if(max_score['fun'] < obj_min):
-        obj_min = max_score['fun']
-        alpha_min = max_score['x'][0]
-        beta_min = max_score['x'][1]
+ms_result = max_score_2d(*pair_coefs(markets, with_price = False), bounds = bnds)
 
 print('Estimates for the model without price')
 
-print("Minimum function value = ", obj_min)
-print("Optimum alpha = ", alpha_min)
-print("Optimum beta = ", beta_min) 
+print("Maximum score = ", ms_result['score'])
+for region in ms_result['regions']:
+    # Every point of a maximizing region is an estimate, I report the centroid and the vertices
+    print("Optimum alpha = ", region['point'][0], ", optimum beta = ", region['point'][1])
+    print("    region vertices (alpha, beta) = ", region['vertices'].tolist())
 
 # Then, estimate the second model that accounts for price
-# This segment takes a long time to run (about 40 minutes) so I do not run the optimization routine multiple times
-
-from Obj_func import obj_func_with_price
+# With the scalar objective this took about 40 minutes, scoring the population at once it takes seconds
 
 bnds = [(-1e+9,1e+9), (-1e+9,1e+9), (-1e+9,1e+9), (-1e+9,1e+9)]
-args = (temp07, temp08)
-DE_result = differential_evolution(obj_func_with_price, bnds, args = args, tol = 1e-15)
+args = pair_coefs(markets, with_price = True)
+DE_result = differential_evolution(obj_func_vec, bnds, args = args, tol = 1e-15,
+                                   vectorized = True, updating = 'deferred')
 
 print('Estimates for the model with price')
 
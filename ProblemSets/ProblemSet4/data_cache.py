@@ -0,0 +1,271 @@
+'''
+Columnar binary cache for the course datasets (.xlsx, .xls, .dta and .csv)
+
+The first read of a source file parses it with pandas and writes every
+column as its own typed .npy file to a cache folder named after the
+file's SHA-1 hash (and the reader arguments). Later reads memory-map the
+columns, so repeated runs skip parsing entirely and only touch the
+columns they use. Derived columns, given as functions of the columns, are
+computed once and stored with the others, along with a key of the
+function so that they are computed again if it changes. Missing values of string
+columns are kept in a null mask next to the column, and object columns
+mixing other types are refused rather than stored as strings.
+
+The hash of the source is recomputed only when its modification time or
+size change, so an unchanged file is not even read again.
+'''
+
+import os
+import json
+import hashlib
+import tempfile
+import types
+import numpy as np
+import pandas as pd
+
+CACHE_DIRNAME = '.data_cache'
+# part of the cache key, to be increased when the layout of the cache changes
+CACHE_VERSION = '3'
+READERS = {'.xlsx': pd.read_excel, '.xls': pd.read_excel,
+           '.dta': pd.read_stata, '.csv': pd.read_csv}
+# in-process store: (path, fingerprint, reader arguments) -> (cache
+# folder, dict of memory-mapped columns, dict of derived column keys)
+_TABLES = {}
+
+
+def file_fingerprint(path):
+    '''
+    Cheap fingerprint of a file: modification time (ns) and size
+    '''
+    stat = os.stat(path)
+
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def file_hash(path):
+    '''
+    SHA-1 hex digest of a file's contents
+    '''
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+
+    return sha.hexdigest()
+
+
+def write_json(path, obj):
+    '''
+    Atomically write obj as JSON
+    '''
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(obj, f, indent=1)
+    os.replace(tmp_file, path)
+
+
+def source_hash(path, cache_dir):
+    '''
+    SHA-1 hash of the source file, recomputed only if its fingerprint
+    changed since it was last hashed
+    '''
+    fingerprint = file_fingerprint(path)
+    hash_file = os.path.join(cache_dir, os.path.basename(path) + '.sha1.json')
+    if os.path.isfile(hash_file):
+        with open(hash_file) as f:
+            record = json.load(f)
+        if record['fingerprint'] == fingerprint:
+            return record['sha1']
+    src_hash = file_hash(path)
+    write_json(hash_file, {'fingerprint': fingerprint, 'sha1': src_hash})
+
+    return src_hash
+
+
+def code_parts(code):
+    '''
+    Bytecode, names and constants of a code object as strings, with nested
+    code objects (lambdas, comprehensions) expanded
+    '''
+    parts = [code.co_code.hex(), repr(code.co_names)]
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            parts += code_parts(const)
+        else:
+            parts.append(repr(const))
+
+    return parts
+
+
+def derived_key(func):
+    '''
+    Key of a derived column function: hash of its code, default arguments
+    and closure values, so the column is recomputed when the function
+    changes. Changes in the functions it calls are not seen; a derived
+    column computed through such helpers should get a new name when they
+    change.
+    '''
+    def value_key(value):
+        if isinstance(value, types.FunctionType):
+            return derived_key(value)
+        return repr(value)
+    parts = (code_parts(func.__code__) +
+             [value_key(value) for value in (func.__defaults__ or ())] +
+             [value_key(cell.cell_contents) for cell in (func.__closure__ or ())])
+
+    return hashlib.sha1('\n'.join(parts).encode()).hexdigest()[:16]
+
+
+def column_array(name, series):
+    '''
+    Typed NumPy array of a DataFrame column that np.save can write without
+    pickling: numbers, booleans and datetimes keep their dtype, and string
+    (or categorical string) columns are stored as fixed-width unicode with
+    a boolean mask of the missing values
+
+    Returns:
+    arr: column values, '' where a string is missing
+    null_mask: True where a string is missing, None if none are
+    '''
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    arr = series.to_numpy()
+    if arr.dtype.kind in 'biufcmM':
+        return arr, None
+    if pd.api.types.infer_dtype(series, skipna=True) not in ('string', 'empty'):
+        raise ValueError('column ' + name + ' mixes ' +
+                         pd.api.types.infer_dtype(series, skipna=True) +
+                         ' values that cannot be cached with their types; '
+                         'give it one type with the dtype or converters '
+                         'arguments of the reader')
+    null_mask = series.isna().to_numpy()
+    arr = np.where(null_mask, '', arr).astype(str)
+
+    return arr, (null_mask if null_mask.any() else None)
+
+
+def save_column(table_dir, name, arr):
+    '''
+    Atomically write one column, returning its file name
+    '''
+    col_file = 'col_' + hashlib.sha1(name.encode()).hexdigest()[:16] + '.npy'
+    fd, tmp_file = tempfile.mkstemp(dir=table_dir, suffix='.npy')
+    with os.fdopen(fd, 'wb') as f:
+        np.save(f, np.ascontiguousarray(arr), allow_pickle=False)
+    os.replace(tmp_file, os.path.join(table_dir, col_file))
+
+    return col_file
+
+
+def open_array(table_dir, col_file):
+    '''
+    Read-only memory map of a stored array
+    '''
+    path = os.path.join(table_dir, col_file)
+    try:
+        return np.load(path, mmap_mode='r', allow_pickle=False)
+    except ValueError:
+        # empty arrays cannot be memory-mapped
+        return np.load(path, allow_pickle=False)
+
+
+def open_column(table_dir, col_file, mask_file=None):
+    '''
+    A stored column: a read-only memory map, or, for a string column with
+    missing values, an object array with NaN where they are missing
+    '''
+    arr = open_array(table_dir, col_file)
+    if mask_file is None:
+        return arr
+    arr = arr.astype(object)
+    arr[open_array(table_dir, mask_file)] = np.nan
+
+    return arr
+
+
+def load_columns(path, derived=None, cache_dir=None, **read_kwargs):
+    '''
+    Columns of a dataset, from the columnar cache or, the first time, by
+    parsing the file
+
+    Args:
+    path: source file (.xlsx, .xls, .dta or .csv)
+    derived: dict name -> function of the dict of columns returning a new
+             column, computed once and stored in the cache with the
+             derived_key of the function; a column whose function has
+             changed is computed again
+    cache_dir: cache folder, CACHE_DIRNAME next to the source if None
+    read_kwargs: arguments of the pandas reader, part of the cache key
+
+    Returns:
+    columns: dict name -> read-only memory-mapped NumPy array (an object
+             array with NaN for a string column with missing values), in
+             the order of the source columns followed by the derived
+             columns
+    '''
+    derived = derived or {}
+    path = os.path.abspath(path)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(path), CACHE_DIRNAME)
+    kwargs_key = repr(sorted(read_kwargs.items()))
+    store_key = (path, tuple(file_fingerprint(path)), kwargs_key)
+    if store_key in _TABLES:
+        table_dir, columns, derived_keys = _TABLES[store_key]
+    else:
+        os.makedirs(cache_dir, exist_ok=True)
+        table_key = hashlib.sha1((CACHE_VERSION + source_hash(path, cache_dir) +
+                                  kwargs_key).encode()).hexdigest()
+        table_dir = os.path.join(
+            cache_dir, os.path.splitext(os.path.basename(path))[0] + '-' +
+            table_key[:20])
+        meta_file = os.path.join(table_dir, 'columns.json')
+        if not os.path.isfile(meta_file):
+            ext = os.path.splitext(path)[1].lower()
+            data = READERS[ext](path, **read_kwargs)
+            os.makedirs(table_dir, exist_ok=True)
+            meta = {'source': os.path.basename(path), 'read_kwargs': kwargs_key,
+                    'columns': [], 'derived': {}}
+            for name in data.columns:
+                arr, null_mask = column_array(str(name), data[name])
+                meta['columns'].append([
+                    str(name), save_column(table_dir, str(name), arr),
+                    None if null_mask is None else
+                    save_column(table_dir, str(name) + '\0null', null_mask)])
+            write_json(meta_file, meta)
+        with open(meta_file) as f:
+            meta = json.load(f)
+        columns = {name: open_column(table_dir, col_file, mask_file)
+                   for name, col_file, mask_file in meta['columns']}
+        derived_keys = meta['derived']
+        _TABLES[store_key] = (table_dir, columns, derived_keys)
+
+    # derived columns that are missing or were computed by a different
+    # function
+    keys = {name: derived_key(func) for name, func in derived.items()}
+    stale = [name for name in derived if derived_keys.get(name) != keys[name]]
+    for name in stale:
+        if name in columns and name not in derived_keys:
+            raise ValueError('derived column ' + name +
+                             ' has the name of a source column')
+    if stale:
+        meta_file = os.path.join(table_dir, 'columns.json')
+        with open(meta_file) as f:
+            meta = json.load(f)
+        for name in stale:
+            col_file = save_column(table_dir, name,
+                                   np.asarray(derived[name](columns)))
+            if name not in columns:
+                meta['columns'].append([name, col_file, None])
+            columns[name] = open_column(table_dir, col_file)
+            derived_keys[name] = keys[name]
+        meta['derived'] = derived_keys
+        write_json(meta_file, meta)
+
+    return dict(columns)
+
+
+def load_frame(path, derived=None, cache_dir=None, **read_kwargs):
+    '''
+    The cached columns of load_columns as a DataFrame
+    '''
+    return pd.DataFrame(load_columns(path, derived, cache_dir, **read_kwargs))
@@ -0,0 +1,275 @@
+'''
+Differential evolution driver with checkpoints, resume and progress
+telemetry for the maximum score estimations
+
+Drives scipy's DifferentialEvolutionSolver (the engine of
+differential_evolution) one generation at a time, with deferred updating
+so a vectorized objective such as Obj_func.obj_func_vec scores the whole
+population of trials in one call. Every few generations the population,
+fitness values, generation count and the state of the solver's random
+number generator are written atomically to a checkpoint, with the
+settings of the run, so a resumed run continues exactly where the
+interrupted one stopped and matches differential_evolution with the same
+settings. The best members of a previous run can seed a new one.
+Progress (generations per second, best and mean score) is appended to a
+JSON lines log.
+
+Usage: python de_driver.py    estimate the model with price, resuming from
+                              checkpoints/price.npz if it exists
+'''
+
+import os
+import json
+import time
+import hashlib
+import numpy as np
+from scipy.optimize._differentialevolution import DifferentialEvolutionSolver
+
+cur_path = os.path.split(os.path.abspath(__file__))[0]
+CHECKPOINT_DIR = os.path.join(cur_path, 'checkpoints')
+
+
+def rng_state(rng):
+    '''
+    JSON-serializable state of a numpy Generator or RandomState
+    '''
+    if isinstance(rng, np.random.Generator):
+        return rng.bit_generator.state
+    state = rng.get_state(legacy=False)
+    state['state']['key'] = state['state']['key'].tolist()
+
+    return state
+
+
+def set_rng_state(rng, state):
+    '''
+    Restore a state from rng_state
+    '''
+    if isinstance(rng, np.random.Generator):
+        rng.bit_generator.state = state
+    else:
+        state['state']['key'] = np.array(state['state']['key'], dtype=np.uint32)
+        rng.set_state(state)
+
+
+def args_key(func, args):
+    '''
+    Hash of the objective's name and arguments, to check that a checkpoint
+    belongs to the same problem
+    '''
+    sha = hashlib.sha1((getattr(func, '__module__', '') + '.' +
+                        getattr(func, '__qualname__', repr(func))).encode())
+    for arg in args:
+        if isinstance(arg, np.ndarray):
+            sha.update(repr((arg.shape, arg.dtype.str)).encode())
+            sha.update(np.ascontiguousarray(arg).tobytes())
+        else:
+            sha.update(repr(arg).encode())
+
+    return sha.hexdigest()
+
+
+def save_checkpoint(path, state):
+    '''
+    Atomically write the state of a run to a .npz checkpoint
+
+    Args:
+    path: checkpoint file
+    state: dict with the unit-cube 'population', 'energies', 'generation',
+           'nfev', 'bounds', 'rng_state' (from rng_state) and 'settings'
+           (dict of the settings of the run)
+    '''
+    out_dir = os.path.dirname(os.path.abspath(path))
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_file = path + '.tmp.npz'
+    np.savez(tmp_file, population=state['population'], energies=state['energies'],
+             generation=state['generation'], nfev=state['nfev'],
+             bounds=np.asarray(state['bounds'], dtype=np.float64),
+             rng_state=np.array(json.dumps(state['rng_state'])),
+             settings=np.array(json.dumps(state['settings'], sort_keys=True)))
+    os.replace(tmp_file, path)
+
+
+def load_checkpoint(path):
+    '''
+    Read the state of a run written by save_checkpoint
+    '''
+    with np.load(path) as saved:
+        state = {'population': saved['population'], 'energies': saved['energies'],
+                 'generation': int(saved['generation']), 'nfev': int(saved['nfev']),
+                 'bounds': saved['bounds'],
+                 'rng_state': json.loads(str(saved['rng_state'])),
+                 'settings': json.loads(str(saved['settings']))}
+
+    return state
+
+
+def best_members(path, n):
+    '''
+    The n best members of the run saved in a checkpoint, in parameter
+    space, to seed a new run with init_members
+
+    Returns:
+    members: (n, k) parameter vectors, best first
+    '''
+    state = load_checkpoint(path)
+    lo, hi = state['bounds'][:, 0], state['bounds'][:, 1]
+    order = np.argsort(state['energies'], kind='stable')[:n]
+
+    return lo + (hi - lo) * state['population'][order]
+
+
+def run_de(func, bounds, args=(), popsize=15, maxiter=1000, tol=0.01,
+           atol=0.0, mutation=(0.5, 1), recombination=0.7,
+           strategy='best1bin', seed=None, vectorized=True, checkpoint=None,
+           checkpoint_every=10, resume=True, init_members=None, log_file=None,
+           log_every=10):
+    '''
+    Minimize func over the bounds with differential evolution, as
+    differential_evolution with updating='deferred' and polish=False
+
+    Args:
+    func: objective, called as func(x, *args) with x of shape (k, S) if
+          vectorized, else (k,)
+    bounds: (k, 2) lower and upper bounds
+    args: other arguments of func
+    popsize: population size is popsize * k
+    maxiter: maximum total number of generations, including those of the
+             run being resumed
+    tol, atol: stop when std(energies) <= atol + tol * |mean(energies)|
+    mutation: scale of the difference vector, or (min, max) to dither it
+              each generation
+    recombination: crossover probability
+    strategy: differential_evolution strategy, e.g. 'best1bin'
+    seed: integer seed of the solver's random number generator, or None
+    vectorized: True if func scores a (k, S) population at once
+    checkpoint: checkpoint file, None for no checkpoints
+    checkpoint_every: generations between checkpoints; the final state is
+                      always saved
+    resume: continue from the checkpoint if it exists. The bounds,
+            popsize, mutation, recombination, strategy, seed and the
+            objective and its args must be those of the checkpoint
+    init_members: (m, k) parameter vectors that replace the first m
+                  members of a new initial population, e.g. from
+                  best_members of a previous run
+    log_file: JSON lines file the progress is appended to, None for no log
+    log_every: generations between log records
+
+    Returns:
+    DE_result: dict with x, fun, nit (total generations), nfev, success,
+               message, population (in parameter space) and
+               population_energies
+    '''
+    bounds = np.asarray(bounds, dtype=np.float64)
+    lo, hi = bounds[:, 0], bounds[:, 1]
+    if seed is not None and not isinstance(seed, (int, np.integer)):
+        raise ValueError('seed must be an integer or None')
+    settings = {'popsize': popsize, 'strategy': strategy,
+                'mutation': np.atleast_1d(mutation).tolist(),
+                'recombination': recombination,
+                'seed': None if seed is None else int(seed),
+                'args': args_key(func, args)}
+    solver = DifferentialEvolutionSolver(
+        func, bounds, args=args, strategy=strategy, maxiter=maxiter,
+        popsize=popsize, tol=tol, mutation=mutation,
+        recombination=recombination,
+        # scipy would share the global RandomState for seed=None
+        seed=np.random.default_rng() if seed is None else seed,
+        polish=False, atol=atol, updating='deferred', vectorized=vectorized)
+    if resume and checkpoint is not None and os.path.isfile(checkpoint):
+        state = load_checkpoint(checkpoint)
+        if not np.array_equal(state['bounds'], bounds):
+            raise ValueError('checkpoint ' + checkpoint + ' has different bounds')
+        for name, value in settings.items():
+            if state['settings'].get(name) != value:
+                raise ValueError('checkpoint ' + checkpoint + ' has ' + name +
+                                 ' = ' + repr(state['settings'].get(name)) +
+                                 ', not ' + repr(value))
+        solver.population = state['population']
+        solver.population_energies = state['energies']
+        solver._nfev = state['nfev']
+        set_rng_state(solver.random_number_generator, state['rng_state'])
+        generation = state['generation']
+    else:
+        if init_members is not None:
+            members = np.atleast_2d(np.asarray(init_members, dtype=np.float64))
+            solver.population[:members.shape[0]] = np.clip(
+                (members - lo) / (hi - lo), 0, 1)
+        # initial energies, as differential_evolution computes them
+        solver.population_energies = solver._calculate_population_energies(
+            solver.population)
+        solver._promote_lowest_energy()
+        generation = 0
+
+    start_time = time.perf_counter()
+    start_generation = generation
+
+    def write_log():
+        energies = solver.population_energies
+        elapsed = time.perf_counter() - start_time
+        record = {'generation': generation, 'nfev': solver._nfev,
+                  'elapsed': elapsed,
+                  'gens_per_sec': (generation - start_generation) / elapsed
+                  if elapsed > 0 else None,
+                  'best': float(energies.min()), 'mean': float(energies.mean()),
+                  'std': float(energies.std())}
+        with open(log_file, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def checkpoint_state():
+        save_checkpoint(checkpoint, {'population': solver.population,
+                                     'energies': solver.population_energies,
+                                     'generation': generation,
+                                     'nfev': solver._nfev, 'bounds': bounds,
+                                     'rng_state': rng_state(solver.random_number_generator),
+                                     'settings': settings})
+
+    while generation < maxiter:
+        # like differential_evolution, a new run takes at least one
+        # generation before it checks convergence
+        if generation > 0 and solver.converged():
+            break
+        next(solver)
+        generation += 1
+        if checkpoint is not None and generation % checkpoint_every == 0:
+            checkpoint_state()
+        if log_file is not None and generation % log_every == 0:
+            write_log()
+    converged = solver.converged()
+    if checkpoint is not None:
+        checkpoint_state()
+    if log_file is not None and (generation == start_generation or
+                                 generation % log_every != 0):
+        write_log()
+
+    DE_result = {'x': solver.x, 'fun': solver.population_energies[0],
+                 'nit': generation, 'nfev': solver._nfev,
+                 'success': bool(converged),
+                 'message': 'Optimization terminated successfully.' if converged
+                 else 'Maximum number of iterations has been exceeded.',
+                 'population': lo + (hi - lo) * solver.population,
+                 'population_energies': solver.population_energies.copy()}
+
+    return DE_result
+
+
+if __name__ == '__main__':
+    from precompute import load_merger_data, precompute, pair_coefs
+    from Obj_func import obj_func_vec
+
+    ACH_data = load_merger_data()
+    markets = precompute(ACH_data[ACH_data['year'] == 2007],
+                         ACH_data[ACH_data['year'] == 2008])
+    bnds = [(-1e+9,1e+9), (-1e+9,1e+9), (-1e+9,1e+9), (-1e+9,1e+9)]
+    DE_result = run_de(obj_func_vec, bnds, args=pair_coefs(markets, with_price=True),
+                       tol=1e-15, seed=2019,
+                       checkpoint=os.path.join(CHECKPOINT_DIR, 'price.npz'),
+                       log_file=os.path.join(CHECKPOINT_DIR, 'price_progress.jsonl'))
+
+    print('Estimates for the model with price')
+    print("Minimum function value = ", DE_result['fun'])
+    print("Generations = ", DE_result['nit'])
+    print("Optimum delta = ", DE_result['x'][0])
+    print("Optimum alpha = ", DE_result['x'][1])
+    print("Optimum gamma = ", DE_result['x'][2])
+    print("Optimum beta = ", DE_result['x'][3])
@@ -0,0 +1,254 @@
+'''
+Parallel multistart estimation and subsampling inference for the maximum
+score estimator
+
+Independent differential evolution restarts on the full sample and
+re-estimations on subsamples of the mergers run across a process pool.
+The pair coefficients from precompute.pair_coefs are put in shared memory
+once, and every worker maps them instead of receiving pickled data. Each
+task draws its subsample and its differential evolution seed from its own
+stream spawned from one SeedSequence, so results do not depend on the
+number of workers or the order in which tasks finish.
+
+The maximum score estimator converges at rate n^(1/3), so confidence
+intervals come from the subsampling distribution of
+b^(1/3) (Beta_b - Beta_n), scaled to the full sample size n.
+
+Usage: python estimate.py
+'''
+
+import os
+import time
+import concurrent.futures
+from multiprocessing import shared_memory
+import numpy as np
+from scipy.optimize import differential_evolution
+from Obj_func import obj_func_vec
+from exact_ms import max_score_2d
+
+# convergence rate exponent of the maximum score estimator
+RATE = 1 / 3
+# arrays in shared memory in each worker: name -> array
+_SHARED = {}
+_SHARED_MEM = []
+
+
+def share_arrays(arrays):
+    '''
+    Copy arrays into new shared memory blocks
+
+    Args:
+    arrays: dict of NumPy arrays
+
+    Returns:
+    blocks: list of the SharedMemory blocks, to be closed and unlinked by
+            the caller
+    specs: dict name -> (block name, shape, dtype) to attach the arrays
+    '''
+    blocks = []
+    specs = {}
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        block = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=block.buf)[...] = arr
+        blocks.append(block)
+        specs[name] = (block.name, arr.shape, arr.dtype.str)
+
+    return blocks, specs
+
+
+def attach_arrays(specs):
+    '''
+    Pool initializer: map the shared arrays into this worker as read-only
+    arrays in _SHARED
+    '''
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        arr = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        arr.setflags(write=False)
+        _SHARED_MEM.append(block)
+        _SHARED[name] = arr
+
+
+def estimate_once(coef, const, bounds, rng, method='de', de_kwargs=None):
+    '''
+    One maximum score estimate
+
+    Args:
+    coef, const: pair coefficients and constants from precompute.pair_coefs
+    bounds: bounds on the parameters
+    rng: NumPy Generator for differential evolution
+    method: 'de' for differential evolution or 'exact' for
+            exact_ms.max_score_2d, which needs two parameters and one
+            condition per pair
+    de_kwargs: other keyword arguments of differential_evolution
+
+    Returns:
+    x: estimated parameters
+    score: maximum score
+    '''
+    if method == 'exact':
+        ms_result = max_score_2d(coef, const, bounds)
+        # the centroid of the first maximizing region
+        return ms_result['regions'][0]['point'], ms_result['score']
+    kwargs = {'tol': 1e-15, 'vectorized': True, 'updating': 'deferred'}
+    kwargs.update(de_kwargs or {})
+    DE_result = differential_evolution(obj_func_vec, bounds, args=(coef, const),
+                                       seed=rng, **kwargs)
+
+    return DE_result['x'], -DE_result['fun']
+
+
+def run_task(task):
+    '''
+    One restart (subsample fraction None) or subsample re-estimation in a
+    worker, on the shared arrays
+
+    Args:
+    task: (seed, subsample fraction, bounds, method, de_kwargs)
+
+    Returns:
+    x: estimated parameters
+    score: maximum score
+    n_obs: number of observations used
+    '''
+    seed, frac, bounds, method, de_kwargs = task
+    rng = np.random.default_rng(seed)
+    coef, const = _SHARED['coef'], _SHARED['const']
+    market_id = _SHARED['market_id']
+    n_obs = market_id.shape[0]
+    if frac is not None:
+        # draw the same share of the mergers in each market without
+        # replacement, at least two so the market keeps a pair, and keep
+        # the pairs with both mergers drawn. Markets with a single merger
+        # have no pairs and are skipped.
+        keep_obs = np.zeros(n_obs, dtype=bool)
+        for m in np.unique(market_id):
+            obs = np.flatnonzero(market_id == m)
+            if obs.size < 2:
+                continue
+            size = min(obs.size, max(2, int(round(frac * obs.size))))
+            keep_obs[rng.choice(obs, size=size, replace=False)] = True
+        keep = keep_obs[_SHARED['obs_i']] & keep_obs[_SHARED['obs_j']]
+        coef, const = coef[:, keep], const[:, keep]
+        n_obs = np.count_nonzero(keep_obs)
+    x, score = estimate_once(coef, const, bounds, rng, method, de_kwargs)
+
+    return np.asarray(x, dtype=np.float64), score, n_obs
+
+
+def subsample_ci(x_full, x_sub, n_full, n_sub, alpha=0.05, rate=RATE):
+    '''
+    Subsampling confidence intervals, treating
+    n_sub^rate (x_sub - x_full) as a draw of n^rate (x_full - Beta)
+
+    Args:
+    x_full: (k,) full sample estimate
+    x_sub: (R, k) subsample estimates
+    n_full: full sample size
+    n_sub: (R,) subsample sizes
+    alpha: one minus the coverage
+    rate: convergence rate exponent
+
+    Returns:
+    ci: (k, 2) lower and upper bounds
+    '''
+    root = (np.asarray(n_sub, dtype=np.float64)[:, None] ** rate *
+            (x_sub - x_full[None, :]))
+    q_lo, q_hi = np.quantile(root, [alpha / 2, 1 - alpha / 2], axis=0)
+    ci = np.column_stack((x_full - q_hi / n_full ** rate,
+                          x_full - q_lo / n_full ** rate))
+
+    return ci
+
+
+def run_estimation(coef, const, obs_i, obs_j, market_id, bounds, n_starts=4,
+                   n_subsamples=0, subsample_frac=0.5, seed=None, method='de',
+                   de_kwargs=None, max_workers=None, alpha=0.05):
+    '''
+    Multistart estimation on the full sample and subsampling confidence
+    intervals, across a process pool
+
+    Args:
+    coef, const: pair coefficients and constants from precompute.pair_coefs
+    obs_i, obs_j, market_id: pair observations and market of each
+                             observation from precompute.pair_index
+    bounds: bounds on the parameters
+    n_starts: number of restarts on the full sample
+    n_subsamples: number of subsample re-estimations
+    subsample_frac: share of the mergers of each market in a subsample
+    seed: seed of the SeedSequence the task seeds are spawned from
+    method: 'de' or 'exact', see estimate_once
+    de_kwargs: other keyword arguments of differential_evolution
+    max_workers: number of worker processes, os.cpu_count() if None
+    alpha: one minus the coverage of the confidence intervals
+
+    Returns:
+    ms_est: dict with
+            x: estimate from the restart with the highest score, the
+               first such restart if there are ties
+            score: its maximum score
+            starts_x, starts_score: estimates and scores of all restarts
+            subsample_x: (n_subsamples, k) subsample estimates
+            ci: (k, 2) subsampling confidence intervals, None without
+                subsamples
+            elapsed: wall clock time in seconds
+            estimations_per_min: throughput of the pool
+    '''
+    start_time = time.perf_counter()
+    seeds = np.random.SeedSequence(seed).spawn(n_starts + n_subsamples)
+    tasks = ([(seeds[s], None, bounds, method, de_kwargs)
+              for s in range(n_starts)] +
+             [(seeds[n_starts + r], subsample_frac, bounds, method, de_kwargs)
+              for r in range(n_subsamples)])
+    blocks, specs = share_arrays({'coef': coef, 'const': const,
+                                  'obs_i': obs_i, 'obs_j': obs_j,
+                                  'market_id': market_id})
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=max_workers or os.cpu_count(),
+                initializer=attach_arrays, initargs=(specs,)) as executor:
+            results = list(executor.map(run_task, tasks))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    elapsed = time.perf_counter() - start_time
+
+    starts_x = np.array([res[0] for res in results[:n_starts]])
+    starts_score = np.array([res[1] for res in results[:n_starts]])
+    best = int(np.argmax(starts_score))
+    subsample_x = np.array([res[0] for res in results[n_starts:]]).reshape(
+        n_subsamples, starts_x.shape[1])
+    ci = None
+    if n_subsamples > 0:
+        ci = subsample_ci(starts_x[best], subsample_x, market_id.shape[0],
+                          [res[2] for res in results[n_starts:]], alpha)
+    ms_est = {'x': starts_x[best], 'score': starts_score[best],
+              'starts_x': starts_x, 'starts_score': starts_score,
+              'subsample_x': subsample_x, 'ci': ci, 'elapsed': elapsed,
+              'estimations_per_min': 60 * len(tasks) / elapsed}
+
+    return ms_est
+
+
+if __name__ == '__main__':
+    from precompute import precompute, pair_coefs, pair_index, load_merger_data
+
+    ACH_data = load_merger_data()
+    markets = precompute(ACH_data[ACH_data['year'] == 2007],
+                         ACH_data[ACH_data['year'] == 2008])
+    obs_i, obs_j, market_id = pair_index(markets)
+
+    for name, with_price, bnds in (
+            ('without price', False, [(0, 4000), (-10, 10)]),
+            ('with price', True, [(-1e+9,1e+9), (-1e+9,1e+9), (-1e+9,1e+9), (-1e+9,1e+9)])):
+        coef, const = pair_coefs(markets, with_price)
+        ms_est = run_estimation(coef, const, obs_i, obs_j, market_id, bnds,
+                                n_starts=8, n_subsamples=200, seed=2019)
+        print('Estimates for the model ' + name)
+        print("Maximum score = ", ms_est['score'])
+        print("Scores of the restarts = ", ms_est['starts_score'].tolist())
+        for k in range(len(bnds)):
+            print("Parameter ", k, " = ", ms_est['x'][k], ", 95% CI = ", ms_est['ci'][k].tolist())
+        print("Estimations per minute = ", ms_est['estimations_per_min'])
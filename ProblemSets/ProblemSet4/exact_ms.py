@@ -0,0 +1,225 @@
+'''
+Exact maximum score estimation for models with one condition per pair
+
+With one condition per pair, the maximum score objective counts the pairs p
+with const[p] + coef[p] @ Beta >= 0. Away from the lines
+const[p] + coef[p] @ Beta = 0 the score is constant, so it is a step
+function on the cells of the arrangement of these lines. For two parameters
+(the model without price), every cell inside the parameter bounds has an
+edge on one of the lines, so sweeping along each line past its
+intersections with all the others visits every cell. With P pairs this
+takes O(P^2 log P) time and finds all the maximizing cells exactly.
+'''
+
+import numpy as np
+from scipy.spatial import HalfspaceIntersection
+
+
+def unit_box(coef, const, bounds):
+    '''
+    Rescale the inequalities to parameters in the unit box, with
+    Beta = lo + (hi - lo) * u, and normalize each row of coefficients to
+    length one so that values are distances in the unit box
+
+    Returns:
+    a: (P, k) normalized coefficients on u
+    c: (P,) normalized constant terms
+    zero: (P,) True for rows with no coefficients on the parameters
+    '''
+    lo = np.array([bnd[0] for bnd in bounds], dtype=np.float64)
+    hi = np.array([bnd[1] for bnd in bounds], dtype=np.float64)
+    a = coef * (hi - lo)
+    c = const + np.dot(coef, lo)
+    norm = np.sqrt((a ** 2).sum(axis=1))
+    zero = norm == 0
+    norm[zero] = 1.0
+
+    return a / norm[:, None], c / norm, zero
+
+
+def sweep_line(p, a, c, tol):
+    '''
+    Scores of the cells along both sides of line p in the unit square
+
+    Args:
+    p: index of the line
+    a, c: normalized inequalities from unit_box, without zero rows
+    tol: distance below which two points on the line are the same
+
+    Returns:
+    t_mid: midpoints of the segments of line p between its intersections
+           with the other lines, as distances along the line from the
+           point of the line closest to the origin, empty if the line
+           misses the unit square
+    scores: (2, segments) scores of the cells on the side where p holds
+            and on the side where it does not
+    x0, d, n: point, direction and unit normal of the line
+    '''
+    n = a[p]
+    d = np.array([-n[1], n[0]])
+    x0 = -c[p] * n
+    # part of the line inside the unit square
+    t_lo, t_hi = -np.inf, np.inf
+    for k in range(2):
+        if d[k] != 0:
+            t_k = np.sort([(0 - x0[k]) / d[k], (1 - x0[k]) / d[k]])
+            t_lo, t_hi = max(t_lo, t_k[0]), min(t_hi, t_k[1])
+        elif (x0[k] < 0) | (x0[k] > 1):
+            t_hi = -np.inf
+    if t_hi - t_lo <= tol:
+        return np.empty(0), np.empty((2, 0)), x0, d, n
+
+    g0 = c + np.dot(a, x0)
+    slope = np.dot(a, d)
+    parallel = np.absolute(slope) <= 1e-12
+    parallel[p] = True
+    coincident = parallel & (np.absolute(g0) <= tol)
+    coincident[p] = False
+    # lines that coincide with p hold on one side and not the other
+    side_n = np.dot(a[coincident], n)
+    parallel_other = parallel & ~coincident
+    parallel_other[p] = False
+    base = np.count_nonzero(parallel_other & (g0 > 0))
+    base_side = np.array([1 + np.count_nonzero(side_n > 0),
+                          np.count_nonzero(side_n < 0)])
+
+    # crossing lines hold before their crossing point if their slope is
+    # negative and after it if positive
+    slope_x = slope[~parallel]
+    t_x = -g0[~parallel] / slope_x
+    base += np.count_nonzero(((t_x <= t_lo) & (slope_x > 0)) |
+                             ((t_x > t_lo) & (slope_x < 0)))
+    inside = (t_x > t_lo) & (t_x < t_hi)
+    order = np.argsort(t_x[inside], kind='stable')
+    t_events = t_x[inside][order]
+    delta = np.where(slope_x[inside][order] > 0, 1, -1)
+    # events closer than tol are one vertex of the arrangement
+    new_vertex = np.diff(t_events) > tol
+    last = np.append(new_vertex, True)[:t_events.size]
+    t_vertex = t_events[last]
+    score_after = base + np.cumsum(delta)[last]
+    t_edges = np.concatenate(([t_lo], t_vertex, [t_hi]))
+    seg_scores = np.concatenate(([base], score_after))
+    keep = np.diff(t_edges) > tol
+    t_mid = 0.5 * (t_edges[:-1] + t_edges[1:])[keep]
+    scores = seg_scores[keep][None, :] + base_side[:, None]
+    # a line along an edge of the square only has cells on its inner side
+    for k in range(2):
+        if d[k] == 0:
+            if x0[k] <= tol:
+                scores[0 if n[k] < 0 else 1] = -1
+            elif x0[k] >= 1 - tol:
+                scores[0 if n[k] > 0 else 1] = -1
+
+    return t_mid, scores, x0, d, n
+
+
+def cell_polygon(signs, a, c, point):
+    '''
+    Vertices of the cell with the given signs, intersected with the unit
+    square, in counterclockwise order
+
+    Args:
+    signs: (P,) +1 where the inequality holds in the cell and -1 where
+           it does not
+    a, c: normalized inequalities from unit_box
+    point: a point in the interior of the cell
+
+    Returns:
+    vertices: (m, 2) vertices of the polygon
+    '''
+    # HalfspaceIntersection takes halfspaces as A @ x + b <= 0
+    halfspaces = np.vstack([
+        np.column_stack((-signs[:, None] * a, -signs * c)),
+        [[-1.0, 0.0, 0.0], [0.0, -1.0, 0.0], [1.0, 0.0, -1.0],
+         [0.0, 1.0, -1.0]]])
+    vertices = HalfspaceIntersection(halfspaces, point).intersections
+    center = vertices.mean(axis=0)
+    angle = np.arctan2(vertices[:, 1] - center[1], vertices[:, 0] - center[0])
+
+    return vertices[np.argsort(angle)]
+
+
+def max_score_2d(coef, const, bounds, tol=1e-9):
+    '''
+    Exact maximum score estimator for two parameters, for the inequalities
+    of the model without price from precompute.pair_coefs
+
+    Args:
+    coef: (1, P, 2) or (P, 2) coefficients on the parameters
+    const: (1, P) or (P,) constant terms
+    bounds: ((lo, hi), (lo, hi)) bounds on the parameters
+    tol: distance in the rescaled unit square below which points are the
+         same, so cells thinner than this are ignored
+
+    Returns:
+    ms_result: dict with
+               score: maximum score over the open cells within the bounds
+               regions: list of the maximizing cells, each a dict with the
+                        polygon 'vertices' of the cell within the bounds
+                        and its centroid 'point', ordered by point
+    '''
+    coef = np.asarray(coef, dtype=np.float64)
+    const = np.asarray(const, dtype=np.float64)
+    if coef.ndim == 3:
+        if coef.shape[0] != 1:
+            raise ValueError('max_score_2d needs one condition per pair')
+        coef, const = coef[0], const[0]
+    if coef.shape[1] != 2:
+        raise ValueError('max_score_2d needs exactly two parameters')
+    lo = np.array([bnd[0] for bnd in bounds], dtype=np.float64)
+    hi = np.array([bnd[1] for bnd in bounds], dtype=np.float64)
+    a_all, c_all, zero = unit_box(coef, const, bounds)
+    # pairs whose condition does not depend on the parameters
+    score_const = np.count_nonzero(zero & (const >= 0))
+    a, c = a_all[~zero], c_all[~zero]
+
+    # sweep every line, keeping the segments of the best cells seen so far
+    best = -1
+    witnesses = []
+    for p in range(a.shape[0]):
+        t_mid, scores, x0, d, n = sweep_line(p, a, c, tol)
+        if t_mid.size == 0:
+            continue
+        line_best = scores.max()
+        if line_best < best:
+            continue
+        if line_best > best:
+            best = line_best
+            witnesses = []
+        for side, seg in zip(*np.nonzero(scores == best)):
+            witnesses.append((x0 + t_mid[seg] * d, n if side == 0 else -n))
+    if best < 0:
+        # no line crosses the bounds, which are then a single cell
+        witnesses = [(np.full(2, 0.5), np.zeros(2))]
+        best = np.count_nonzero(c + np.dot(a, np.full(2, 0.5)) > 0)
+
+    # step off each maximizing edge into its cell and identify the cell by
+    # the signs of all the inequalities there
+    regions = {}
+    for x_mid, normal in witnesses:
+        # half the step to the nearest other line or edge of the square
+        g = c + np.dot(a, x_mid)
+        rate = np.dot(a, normal)
+        cross = np.absolute(g) > tol
+        steps = -g[cross] / np.where(rate[cross] == 0, 1.0, rate[cross])
+        steps = steps[(rate[cross] != 0) & (steps > 0)]
+        box_steps = np.concatenate(
+            (-x_mid[normal < 0] / normal[normal < 0],
+             (1 - x_mid[normal > 0]) / normal[normal > 0]))
+        step = 0.5 * np.concatenate((steps, box_steps, [1.0])).min()
+        point = x_mid + step * normal
+        signs = np.where(c + np.dot(a, point) > 0, 1.0, -1.0)
+        key = np.packbits(signs > 0).tobytes()
+        if key not in regions:
+            regions[key] = (signs, point)
+
+    region_list = []
+    for signs, point in regions.values():
+        vertices = lo + (hi - lo) * cell_polygon(signs, a, c, point)
+        region_list.append({'point': vertices.mean(axis=0),
+                            'vertices': vertices})
+    region_list.sort(key=lambda region: tuple(region['point']))
+    ms_result = {'score': int(best) + score_const, 'regions': region_list}
+
+    return ms_result
@@ -0,0 +1,233 @@
+'''
+Precompute the parameter-free parts of the maximum score objective
+
+None of the buyer-target distances or interaction terms depend on the
+parameters being estimated, so they are computed once per market here.
+Each evaluation of the objective functions in Obj_func.py is then a
+linear combination of these arrays.
+'''
+
+import os
+import numpy as np
+import data_cache
+
+cur_path = os.path.split(os.path.abspath(__file__))[0]
+MERGER_FILE = os.path.join(cur_path, 'radio_merger_data.xlsx')
+# price and population variables in millions
+MERGER_DERIVED = {
+    'price_mil': lambda columns: columns['price'] / 1000000,
+    'population_target_mil': lambda columns: columns['population_target'] / 1000000}
+
+# WGS-84 ellipsoid, as used by geopy's vincenty distance
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = (1 - WGS84_F) * WGS84_A
+METERS_PER_MILE = 1609.344
+
+
+def load_merger_data(path=MERGER_FILE):
+    '''
+    Read the radio merger data through the columnar cache of data_cache,
+    with the price_mil and population_target_mil columns added
+
+    Returns:
+    ACH_data: DataFrame of all mergers
+    '''
+    return data_cache.load_frame(path, derived=MERGER_DERIVED)
+
+
+def vincenty_miles(lat1, long1, lat2, long2, tol=1e-12, max_iter=200):
+    '''
+    Vectorized Vincenty inverse formula for the distance between points
+    on the WGS-84 ellipsoid. The arguments broadcast against each other,
+    so an (n, 1) column of buyer locations and a length n row of target
+    locations give the (n, n) distance matrix.
+
+    Args:
+    lat1, long1: latitude and longitude of the first points in degrees
+    lat2, long2: latitude and longitude of the second points in degrees
+    tol: convergence tolerance on the longitude on the auxiliary sphere
+    max_iter: maximum number of iterations
+
+    Returns:
+    dist: distances in miles
+    '''
+    a, b, f = WGS84_A, WGS84_B, WGS84_F
+    lat1, long1, lat2, long2 = np.broadcast_arrays(
+        *[np.radians(np.asarray(x, dtype=np.float64))
+          for x in (lat1, long1, lat2, long2)])
+    L = long2 - long1
+    U1 = np.arctan((1 - f) * np.tan(lat1))
+    U2 = np.arctan((1 - f) * np.tan(lat2))
+    sin_U1, cos_U1 = np.sin(U1), np.cos(U1)
+    sin_U2, cos_U2 = np.sin(U2), np.cos(U2)
+
+    lam = L
+    for _ in range(max_iter):
+        sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+        sin_sigma = np.sqrt((cos_U2 * sin_lam) ** 2 +
+                            (cos_U1 * sin_U2 - sin_U1 * cos_U2 * cos_lam) ** 2)
+        cos_sigma = sin_U1 * sin_U2 + cos_U1 * cos_U2 * cos_lam
+        sigma = np.arctan2(sin_sigma, cos_sigma)
+        # coincident points have sin_sigma = 0 and distance 0
+        coincident = sin_sigma == 0
+        sin_alpha = np.where(coincident, 0.0, cos_U1 * cos_U2 * sin_lam /
+                             np.where(coincident, 1.0, sin_sigma))
+        cos_sq_alpha = 1 - sin_alpha ** 2
+        # points on the equator have cos_sq_alpha = 0
+        equatorial = cos_sq_alpha == 0
+        cos_2sigma_m = np.where(equatorial, 0.0, cos_sigma - 2 * sin_U1 *
+                                sin_U2 / np.where(equatorial, 1.0,
+                                                  cos_sq_alpha))
+        C = f / 16 * cos_sq_alpha * (4 + f * (4 - 3 * cos_sq_alpha))
+        lam_prev = lam
+        lam = L + (1 - C) * f * sin_alpha * (
+            sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma *
+                                     (-1 + 2 * cos_2sigma_m ** 2)))
+        if np.all(np.absolute(lam - lam_prev) <= tol):
+            break
+    else:
+        raise ValueError('Vincenty formula failed to converge')
+
+    u_sq = cos_sq_alpha * (a ** 2 - b ** 2) / b ** 2
+    A = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+    B = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+    delta_sigma = B * sin_sigma * (
+        cos_2sigma_m + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2) -
+            B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) *
+            (-3 + 4 * cos_2sigma_m ** 2)))
+    dist = b * A * (sigma - delta_sigma) / METERS_PER_MILE
+
+    return dist
+
+
+def market_arrays(market_data):
+    '''
+    Distance and interaction matrices for one market (year)
+
+    Args:
+    market_data: DataFrame of the mergers in the market, with the
+                 price_mil and population_target_mil columns added
+
+    Returns:
+    market: dict of NumPy arrays where entry (i, j) of each matrix
+            refers to buyer i and target j
+            dist: (n, n) buyer-target distances in miles
+            stations_pop: (n, n) num_stations_buyer * population_target_mil
+            corp_pop: (n, n) corp_owner_buyer * population_target_mil
+            hhi: (n, n) hhi_target of the target
+            price_diff: (n, n) price_mil[i] - price_mil[j]
+            pair_i, pair_j: indices of all pairs i < j
+    '''
+    buyer_lat = market_data['buyer_lat'].to_numpy(dtype=np.float64)
+    buyer_long = market_data['buyer_long'].to_numpy(dtype=np.float64)
+    target_lat = market_data['target_lat'].to_numpy(dtype=np.float64)
+    target_long = market_data['target_long'].to_numpy(dtype=np.float64)
+    num_stations = market_data['num_stations_buyer'].to_numpy(
+        dtype=np.float64)
+    corp_owner = market_data['corp_owner_buyer'].to_numpy(dtype=np.float64)
+    pop_target = market_data['population_target_mil'].to_numpy(
+        dtype=np.float64)
+    hhi_target = market_data['hhi_target'].to_numpy(dtype=np.float64)
+    price = market_data['price_mil'].to_numpy(dtype=np.float64)
+    n = price.shape[0]
+
+    pair_i, pair_j = np.triu_indices(n, k=1)
+    market = {
+        'dist': vincenty_miles(buyer_lat[:, None], buyer_long[:, None],
+                               target_lat[None, :], target_long[None, :]),
+        'stations_pop': np.outer(num_stations, pop_target),
+        'corp_pop': np.outer(corp_owner, pop_target),
+        'hhi': np.tile(hhi_target, (n, 1)),
+        'price_diff': price[:, None] - price[None, :],
+        'pair_i': pair_i, 'pair_j': pair_j}
+
+    return market
+
+
+def precompute(*comp_data):
+    '''
+    Precompute the arrays of each market
+
+    Args:
+    comp_data: DataFrames of the markets, e.g. (temp07, temp08)
+
+    Returns:
+    markets: tuple of dicts from market_arrays, in the same order, to
+             pass as args to the objective functions in Obj_func.py
+    '''
+    return tuple(market_arrays(market_data) for market_data in comp_data)
+
+
+def pair_coefs(markets, with_price=False):
+    '''
+    Linear inequality form of the maximum score objective. Every pairwise
+    inequality of every market becomes one row, so the score of a
+    parameter vector is the number of pairs whose conditions are all
+    satisfied:
+        sum over pairs of all(const + coef @ Beta >= 0)
+
+    Without price, the single condition per pair is
+        f[i,i] + f[j,j] - f[i,j] - f[j,i] >= 0
+    with Beta = (alpha, beta). With price, the two conditions per pair are
+        f[i,i] - f[i,j] >= price_diff[i,j] and f[j,j] - f[j,i] >= price_diff[j,i]
+    with Beta = (delta, alpha, gamma, beta).
+
+    Args:
+    markets: tuple of dicts from market_arrays
+    with_price: True for the model with price
+
+    Returns:
+    coef: (conditions, pairs, k) coefficients on the parameters
+    const: (conditions, pairs) constant terms
+    '''
+    coef_list = []
+    const_list = []
+    for market in markets:
+        i, j = market['pair_i'], market['pair_j']
+        if with_price:
+            feats = ('stations_pop', 'corp_pop', 'hhi', 'dist')
+            # row (i, j) and row (j, i) of the two conditions
+            coef = np.stack(
+                [np.stack([market[feat][a,a] - market[feat][a,b]
+                           for feat in feats], axis=-1)
+                 for a, b in ((i, j), (j, i))])
+            const = -np.stack([market['price_diff'][i,j],
+                               market['price_diff'][j,i]])
+        else:
+            def pair_diff(x):
+                return x[i,i] + x[j,j] - x[i,j] - x[j,i]
+            coef = np.stack([pair_diff(market['corp_pop']),
+                             pair_diff(market['dist'])], axis=-1)[None]
+            const = pair_diff(market['stations_pop'])[None]
+        coef_list.append(coef)
+        const_list.append(const)
+
+    return np.concatenate(coef_list, axis=1), np.concatenate(const_list, axis=1)
+
+
+def pair_index(markets):
+    '''
+    Observations of the pairs in the order of the rows of pair_coefs, with
+    the observations of all markets numbered consecutively
+
+    Args:
+    markets: tuple of dicts from market_arrays
+
+    Returns:
+    obs_i, obs_j: (pairs,) observations i < j of each pair
+    market_id: (observations,) index of the market of each observation
+    '''
+    obs_i = []
+    obs_j = []
+    market_id = []
+    offset = 0
+    for m, market in enumerate(markets):
+        obs_i.append(market['pair_i'] + offset)
+        obs_j.append(market['pair_j'] + offset)
+        n = market['price_diff'].shape[0]
+        market_id.append(np.full(n, m))
+        offset += n
+
+    return np.concatenate(obs_i), np.concatenate(obs_j), np.concatenate(market_id)
@@ -0,0 +1,145 @@
+'''
+Maximum score objective for any number of markets, streamed over blocks of
+pairs
+
+precompute.py keeps the n x n matrices of every market in memory, which
+does not scale to large markets. Here each market only keeps its
+observations as vectors. The pairs i < j of a market are numbered
+0, ..., n (n - 1) / 2 - 1 and taken in blocks of at most block_size. For
+each block the pair coefficients are computed from the vectors, including
+the buyer-target distances, scored and discarded. Memory is then bounded by
+the block size, whatever the number of mergers per market.
+'''
+
+import numpy as np
+from precompute import vincenty_miles
+from Obj_func import obj_func_vec
+
+BLOCK_SIZE = 65536
+
+
+def market_vectors(data, market_col='year'):
+    '''
+    Observation vectors of each market
+
+    Args:
+    data: DataFrame of all mergers, with the price_mil and
+          population_target_mil columns added
+    market_col: column identifying the market of each merger
+
+    Returns:
+    markets: list of (market key, dict of (n,) arrays) ordered by key, with
+             own_dist the distance between each buyer and its own target
+    '''
+    cols = ('buyer_lat', 'buyer_long', 'target_lat', 'target_long',
+            'num_stations_buyer', 'corp_owner_buyer', 'population_target_mil',
+            'hhi_target', 'price_mil')
+    markets = []
+    for key, market_data in data.groupby(market_col, sort=True):
+        vec = {col: market_data[col].to_numpy(dtype=np.float64) for col in cols}
+        vec['own_dist'] = vincenty_miles(vec['buyer_lat'], vec['buyer_long'],
+                                         vec['target_lat'], vec['target_long'])
+        markets.append((key, vec))
+
+    return markets
+
+
+def pair_from_index(k, n):
+    '''
+    Pairs i < j of n observations from their positions k in the order of
+    np.triu_indices(n, 1)
+
+    Args:
+    k: (b,) integer pair positions, 0 <= k < n (n - 1) / 2
+    n: number of observations
+
+    Returns:
+    pair_i, pair_j: (b,) observations of each pair
+    '''
+    k = np.asarray(k, dtype=np.int64)
+    # row i starts at position i n - i (i + 1) / 2; solve for the last
+    # row start before k and correct for rounding
+    i = np.floor(((2 * n - 1) - np.sqrt((2 * n - 1) ** 2 - 8.0 * k)) / 2).astype(np.int64)
+    i = np.clip(i, 0, max(n - 2, 0))
+    row_start = i * n - i * (i + 1) // 2
+    i = np.where(row_start > k, i - 1, i)
+    row_start = i * n - i * (i + 1) // 2
+    next_start = (i + 1) * n - (i + 1) * (i + 2) // 2
+    i = np.where(next_start <= k, i + 1, i)
+    row_start = i * n - i * (i + 1) // 2
+    pair_j = k - row_start + i + 1
+
+    return i, pair_j
+
+
+def block_coefs(vec, pair_i, pair_j, with_price=False):
+    '''
+    Pair coefficients of a block of pairs of one market, in the form of
+    precompute.pair_coefs
+
+    Args:
+    vec: observation vectors of the market from market_vectors
+    pair_i, pair_j: (b,) observations of the pairs
+    with_price: True for the model with price
+
+    Returns:
+    coef: (conditions, b, k) coefficients on the parameters
+    const: (conditions, b) constant terms
+    '''
+    i, j = pair_i, pair_j
+    dist_ij = vincenty_miles(vec['buyer_lat'][i], vec['buyer_long'][i],
+                             vec['target_lat'][j], vec['target_long'][j])
+    dist_ji = vincenty_miles(vec['buyer_lat'][j], vec['buyer_long'][j],
+                             vec['target_lat'][i], vec['target_long'][i])
+    stations = vec['num_stations_buyer']
+    corp = vec['corp_owner_buyer']
+    pop = vec['population_target_mil']
+    if with_price:
+        hhi = vec['hhi_target']
+        price = vec['price_mil']
+        # f[a,a] - f[a,b] for (a, b) = (i, j) and (j, i)
+        coef = np.stack([
+            np.stack([stations[a] * (pop[a] - pop[b]), corp[a] * (pop[a] - pop[b]),
+                      hhi[a] - hhi[b], vec['own_dist'][a] - dist_ab], axis=-1)
+            for a, b, dist_ab in ((i, j, dist_ij), (j, i, dist_ji))])
+        const = -np.stack([price[i] - price[j], price[j] - price[i]])
+    else:
+        # f[i,i] + f[j,j] - f[i,j] - f[j,i]
+        pop_diff = pop[i] - pop[j]
+        coef = np.stack([(corp[i] - corp[j]) * pop_diff,
+                         vec['own_dist'][i] + vec['own_dist'][j] - dist_ij - dist_ji],
+                        axis=-1)[None]
+        const = ((stations[i] - stations[j]) * pop_diff)[None]
+
+    return coef, const
+
+
+def obj_func_stream(Beta, markets, with_price=False, block_size=BLOCK_SIZE):
+    '''
+    Compute the objective function for the maximum score estimator over all
+    markets, streaming the pairs of each market in blocks. Like
+    Obj_func.obj_func_vec it scores one parameter vector or a (k, S)
+    population, so it can be used with differential_evolution's
+    vectorized=True.
+
+    Args:
+    Beta: A length k parameter vector or a (k, S) array of S parameter vectors
+    markets: list of (market key, observation vectors) from market_vectors
+    with_price: True for the model with price, Beta = (delta, alpha, gamma, beta),
+                otherwise Beta = (alpha, beta)
+    block_size: maximum number of pairs held in memory at once
+
+    Returns:
+    ms_obj_fun: Negative of the value of the objective function for the maximum score estimator,
+                a scalar or a length S array
+    '''
+    ms_obj_func = 0
+    for key, vec in markets:
+        n = vec['price_mil'].shape[0]
+        n_pairs = n * (n - 1) // 2
+        for k0 in range(0, n_pairs, block_size):
+            pair_i, pair_j = pair_from_index(np.arange(k0, min(k0 + block_size, n_pairs)), n)
+            coef, const = block_coefs(vec, pair_i, pair_j, with_price)
+            ms_obj_func = ms_obj_func + obj_func_vec(Beta, coef, const)
+
+    return ms_obj_func
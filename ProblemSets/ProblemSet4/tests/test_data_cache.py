@@ -0,0 +1,109 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import data_cache
+import precompute
+
+DERIVED_CALLS = []
+
+
+def price_mil(columns):
+    DERIVED_CALLS.append('price_mil')
+    return columns['price'] / 1000000
+
+
+def test_load_columns(tmpdir, monkeypatch):
+    """
+    Test that a source is parsed once, its columns and derived columns
+    are memory-mapped from the cache afterwards and the cache follows
+    changes to the file's contents.
+    """
+    monkeypatch.setattr(data_cache, '_TABLES', {})
+    src = str(tmpdir.join('data.csv'))
+    pd.DataFrame({'year': [2007, 2008, 2008], 'price': [1.5e6, 2e6, 3e6],
+                  'name': ['a', 'bb', 'c']}).to_csv(src, index=False)
+    DERIVED_CALLS.clear()
+    derived = {'price_mil': price_mil}
+    columns = data_cache.load_columns(src, derived)
+    assert list(columns) == ['year', 'price', 'name', 'price_mil']
+    assert columns['year'].dtype == np.int64
+    assert columns['name'].tolist() == ['a', 'bb', 'c']
+    assert np.array_equal(columns['price_mil'], [1.5, 2.0, 3.0])
+
+    # a new process: nothing is parsed or derived again
+    monkeypatch.setattr(data_cache, '_TABLES', {})
+    monkeypatch.setattr(data_cache, 'READERS', {})
+
+    columns = data_cache.load_columns(src, derived)
+    assert DERIVED_CALLS == ['price_mil']
+    assert isinstance(columns['price'], np.memmap)
+    assert isinstance(columns['price_mil'], np.memmap)
+    assert not columns['price'].flags.writeable
+    assert np.array_equal(columns['price_mil'], [1.5, 2.0, 3.0])
+
+    # a changed derived function is computed again, in this and later
+    # processes
+    derived_k = {'price_mil': lambda columns: columns['price'] / 1000}
+    assert np.array_equal(data_cache.load_columns(src, derived_k)['price_mil'],
+                          [1500.0, 2000.0, 3000.0])
+    monkeypatch.setattr(data_cache, '_TABLES', {})
+    assert np.array_equal(data_cache.load_columns(src, derived_k)['price_mil'],
+                          [1500.0, 2000.0, 3000.0])
+    assert np.array_equal(data_cache.load_columns(src, derived)['price_mil'],
+                          [1.5, 2.0, 3.0])
+    with pytest.raises(ValueError):
+        data_cache.load_columns(src, {'price': lambda columns: columns['year']})
+
+    # touching the file keeps the cache, changing it does not
+    os.utime(src, ns=(1, 1))
+    monkeypatch.setattr(data_cache, '_TABLES', {})
+    assert data_cache.load_frame(src).shape == (3, 4)
+    monkeypatch.setattr(data_cache, 'READERS', {'.csv': pd.read_csv})
+    with open(src, 'a') as f:
+        f.write('2009,4000000.0,d\n')
+    frame = data_cache.load_frame(src, derived)
+    assert frame['price_mil'].tolist() == [1.5, 2.0, 3.0, 4.0]
+
+
+def test_missing_strings(tmpdir):
+    """
+    Test that missing strings come back as NaN, as from a fresh parse, and
+    that object columns mixing types are not cached.
+    """
+    src = str(tmpdir.join('data.csv'))
+    pd.DataFrame({'name': ['x', None, 'z'], 'full': ['a', 'b', 'c'],
+                  'none': [None, None, None]}).to_csv(src, index=False)
+    for _ in range(2):
+        frame = data_cache.load_frame(src, cache_dir=str(tmpdir.join('cache')))
+        pd.testing.assert_frame_equal(frame, pd.read_csv(src), check_dtype=False)
+    assert isinstance(data_cache.load_columns(src)['full'], np.memmap)
+
+    with pytest.raises(ValueError):
+        data_cache.column_array('mixed', pd.Series(['a', 1, 2.5]))
+
+
+def test_load_merger_data(tmpdir, monkeypatch):
+    """
+    Test the cached radio merger data against reading the spreadsheet.
+    """
+    monkeypatch.setattr(data_cache, '_TABLES', {})
+    monkeypatch.setattr(data_cache, 'CACHE_DIRNAME', str(tmpdir))
+    ACH_data = pd.read_excel('radio_merger_data.xlsx', header=0)
+    ACH_data['price_mil'] = ACH_data['price'] / 1000000
+    ACH_data['population_target_mil'] = ACH_data['population_target'] / 1000000
+    for _ in range(2):
+        pd.testing.assert_frame_equal(precompute.load_merger_data(), ACH_data)
+
+
+def test_load_stata(tmpdir):
+    """
+    Test the cache on the Stata data of the Optimization notebooks.
+    """
+    src = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                       '..', '..', 'Optimization', 'CovsData_labinc_CAL.dta')
+    if not os.path.isfile(src):
+        pytest.skip('Stata data not found')
+    frame = data_cache.load_frame(src, cache_dir=str(tmpdir))
+    pd.testing.assert_frame_equal(frame, pd.read_stata(src),
+                                  check_categorical=False, check_dtype=False)
@@ -0,0 +1,74 @@
+import json
+import numpy as np
+import pytest
+from scipy.optimize import differential_evolution
+import de_driver
+
+
+def sphere(x, center):
+    """
+    Vectorized test objective: squared distance to center.
+    """
+    return ((x - center[:, None] if np.ndim(x) == 2 else x - center) ** 2).sum(axis=0)
+
+
+def test_resume(tmpdir):
+    """
+    Test that a run interrupted and resumed from its checkpoint matches
+    an uninterrupted run and differential_evolution, that a checkpoint of
+    other settings is refused, and that progress is logged.
+    """
+    bounds = [(-5, 5), (-5, 5), (0, 10)]
+    center = np.array([1.0, -2.0, 3.0])
+    kwargs = {'args': (center,), 'seed': 3, 'tol': 0, 'popsize': 8}
+    full = de_driver.run_de(sphere, bounds, maxiter=40, **kwargs)
+    checkpoint = str(tmpdir.join('run.npz'))
+    log_file = str(tmpdir.join('run.jsonl'))
+    part = de_driver.run_de(sphere, bounds, maxiter=17, checkpoint=checkpoint,
+                            checkpoint_every=5, log_file=log_file, **kwargs)
+    assert part['nit'] == 17
+    resumed = de_driver.run_de(sphere, bounds, maxiter=40,
+                               checkpoint=checkpoint, log_file=log_file,
+                               **kwargs)
+    assert resumed['nit'] == 40
+    assert resumed['nfev'] == full['nfev']
+    assert np.array_equal(resumed['population'], full['population'])
+    assert np.allclose(full['x'], center, atol=1e-3)
+    DE_result = differential_evolution(sphere, bounds, maxiter=40, polish=False,
+                                       updating='deferred', vectorized=True,
+                                       **kwargs)
+    assert np.array_equal(DE_result['x'], full['x'])
+    assert DE_result['fun'] == full['fun']
+    assert DE_result['nfev'] == full['nfev']
+    for other in ({'popsize': 9}, {'seed': 4}, {'strategy': 'rand1bin'},
+                  {'args': (center + 1,)}):
+        with pytest.raises(ValueError):
+            de_driver.run_de(sphere, bounds, maxiter=41, checkpoint=checkpoint,
+                             **dict(kwargs, **other))
+    with open(log_file) as f:
+        records = [json.loads(line) for line in f]
+    assert [rec['generation'] for rec in records] == [10, 17, 20, 30, 40]
+    assert records[-1]['best'] == resumed['fun']
+    assert all(rec['gens_per_sec'] > 0 for rec in records)
+
+
+def test_seed_from_previous(tmpdir):
+    """
+    Test that the best members of a previous run seed a new run and that
+    the scalar and vectorized objectives give the same run.
+    """
+    bounds = [(-5, 5), (-5, 5)]
+    center = np.array([0.5, 0.25])
+    checkpoint = str(tmpdir.join('first.npz'))
+    first = de_driver.run_de(sphere, bounds, args=(center,), maxiter=30,
+                             seed=1, checkpoint=checkpoint)
+    members = de_driver.best_members(checkpoint, 3)
+    assert np.allclose(members[0], first['x'])
+    second = de_driver.run_de(sphere, bounds, args=(center,), maxiter=0,
+                              seed=2, init_members=members)
+    assert second['fun'] == first['fun']
+    scalar = de_driver.run_de(sphere, bounds, args=(center,), maxiter=20,
+                              seed=4, vectorized=False)
+    vector = de_driver.run_de(sphere, bounds, args=(center,), maxiter=20,
+                              seed=4)
+    assert np.array_equal(scalar['population'], vector['population'])
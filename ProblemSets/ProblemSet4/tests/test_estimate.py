@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import estimate
+import precompute
+from Obj_func import obj_func_vec
+
+
+def test_run_estimation():
+    """
+    Test that the pooled restarts and subsamples do not depend on the
+    number of workers and that the reported scores are the objective at
+    the estimates.
+    """
+    ACH_data = pd.read_excel('radio_merger_data.xlsx', header=0)
+    ACH_data['price_mil'] = ACH_data['price'] / 1000000
+    ACH_data['population_target_mil'] = ACH_data['population_target'] / 1000000
+    markets = precompute.precompute(ACH_data[ACH_data['year'] == 2007],
+                                    ACH_data[ACH_data['year'] == 2008])
+    obs_i, obs_j, market_id = precompute.pair_index(markets)
+    coef, const = precompute.pair_coefs(markets, with_price=False)
+    bnds = [(0, 4000), (-10, 10)]
+    runs = [estimate.run_estimation(
+        coef, const, obs_i, obs_j, market_id, bnds, n_starts=2,
+        n_subsamples=3, seed=5, de_kwargs={'maxiter': 20},
+        max_workers=max_workers) for max_workers in (1, 2)]
+    for key in ('starts_x', 'starts_score', 'subsample_x', 'ci'):
+        assert np.array_equal(runs[0][key], runs[1][key])
+    ms_est = runs[0]
+    assert ms_est['ci'].shape == (2, 2)
+    assert ms_est['score'] == ms_est['starts_score'].max()
+    assert ms_est['score'] == -obj_func_vec(ms_est['x'], coef, const)
+    assert ms_est['estimations_per_min'] > 0
+    exact = estimate.run_estimation(coef, const, obs_i, obs_j, market_id,
+                                    bnds, n_starts=1, n_subsamples=2,
+                                    seed=5, method='exact', max_workers=1)
+    assert exact['score'] == 2280
+
+
+def test_run_task_small_markets(monkeypatch):
+    """
+    Test that subsampling skips markets with a single merger and never
+    draws more mergers than a market has.
+    """
+    rng = np.random.default_rng(0)
+    # market 0 has mergers 0, 1 and 2, market 1 only merger 3
+    monkeypatch.setattr(estimate, '_SHARED', {
+        'coef': rng.normal(size=(1, 3, 2)), 'const': rng.normal(size=(1, 3)),
+        'obs_i': np.array([0, 0, 1]), 'obs_j': np.array([1, 2, 2]),
+        'market_id': np.array([0, 0, 0, 1])})
+    for frac, n_drawn in ((0.5, 2), (1.0, 3), (2.0, 3)):
+        x, score, n_obs = estimate.run_task((1, frac, [(-1, 1), (-1, 1)],
+                                             'exact', None))
+        assert n_obs == n_drawn
+
+
+def test_subsample_ci():
+    """
+    Test the coverage of subsampling intervals for the median of a
+    uniform sample, which converges at rate n^(1/2).
+    """
+    rng = np.random.default_rng(3)
+    n, b, covered = 400, 60, 0
+    for _ in range(200):
+        data = rng.uniform(size=n)
+        x_sub = np.array([[np.median(rng.choice(data, b, replace=False))]
+                          for _ in range(100)])
+        ci = estimate.subsample_ci(np.array([np.median(data)]), x_sub, n,
+                                   np.full(100, b), rate=0.5)
+        covered += (ci[0, 0] <= 0.5) & (0.5 <= ci[0, 1])
+    assert 0.88 <= covered / 200 <= 0.99
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from scipy.optimize import differential_evolution
+import exact_ms
+import precompute
+from Obj_func import obj_func_vec
+
+
+def in_polygon(point, vertices):
+    """
+    True if point is inside the convex polygon with counterclockwise
+    vertices.
+    """
+    edges = np.roll(vertices, -1, axis=0) - vertices
+    rel = point - vertices
+    return np.all(edges[:, 0] * rel[:, 1] - edges[:, 1] * rel[:, 0] >= 0)
+
+
+def test_max_score_2d_random():
+    """
+    Test the exact solver against a dense search around every vertex of
+    small random arrangements.
+    """
+    rng = np.random.default_rng(11)
+    bounds = ((-2.0, 3.0), (0.0, 1.0))
+    for _ in range(5):
+        coef = rng.standard_normal((25, 2)) * np.array([1.0, 5.0])
+        const = rng.standard_normal(25)
+        # parallel and coincident lines, in the same and opposite
+        # directions
+        coef[:5, 0] = 0.0
+        coef[5], const[5] = 2 * coef[6], 2 * const[6]
+        coef[7], const[7] = -coef[8], -const[8]
+        ms_result = exact_ms.max_score_2d(coef, const, bounds)
+        # candidate points near all line intersections and a grid
+        vertices = [np.linalg.solve(coef[[p, q]], -const[[p, q]])
+                    for p in range(25) for q in range(p + 1, 25)
+                    if abs(np.linalg.det(coef[[p, q]])) > 1e-12]
+        angles = np.linspace(0, 2 * np.pi, 24, endpoint=False)
+        offsets = 1e-6 * np.column_stack((np.cos(angles), np.sin(angles)))
+        grid = np.stack(np.meshgrid(np.linspace(-2, 3, 101),
+                                    np.linspace(0, 1, 101)), -1)
+        points = np.vstack([(np.array(vertices)[:, None, :] +
+                             offsets[None]).reshape(-1, 2),
+                            grid.reshape(-1, 2)])
+        points = points[(points[:, 0] > -2) & (points[:, 0] < 3) &
+                        (points[:, 1] > 0) & (points[:, 1] < 1)]
+        scores = -obj_func_vec(points.T, coef[None], const[None])
+        assert ms_result['score'] == scores.max()
+        for region in ms_result['regions']:
+            assert -obj_func_vec(region['point'], coef[None],
+                                 const[None]) == ms_result['score']
+        for point in points[scores == scores.max()]:
+            assert any(in_polygon(point, region['vertices'])
+                       for region in ms_result['regions'])
+
+
+def test_max_score_2d_data():
+    """
+    Test that the exact solver on the radio merger data is deterministic
+    and at least as good as differential evolution.
+    """
+    ACH_data = pd.read_excel('radio_merger_data.xlsx', header=0)
+    ACH_data['price_mil'] = ACH_data['price'] / 1000000
+    ACH_data['population_target_mil'] = ACH_data['population_target'] / 1000000
+    markets = precompute.precompute(ACH_data[ACH_data['year'] == 2007],
+                                    ACH_data[ACH_data['year'] == 2008])
+    coef, const = precompute.pair_coefs(markets, with_price=False)
+    bnds = [(0, 4000), (-10, 10)]
+    ms_result = exact_ms.max_score_2d(coef, const, bnds)
+    DE_result = differential_evolution(obj_func_vec, bnds, args=(coef, const),
+                                       seed=2019, vectorized=True,
+                                       updating='deferred')
+    assert ms_result['score'] >= -obj_func_vec(DE_result['x'], coef, const)
+    for region in ms_result['regions']:
+        assert -obj_func_vec(region['point'], coef, const) == ms_result['score']
+    ms_again = exact_ms.max_score_2d(coef, const, bnds)
+    assert len(ms_again['regions']) == len(ms_result['regions'])
+    for region, region_again in zip(ms_result['regions'],
+                                    ms_again['regions']):
+        assert np.array_equal(region['vertices'], region_again['vertices'])
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import pytest
+import precompute
+from scipy.optimize import differential_evolution
+from Obj_func import obj_func_no_price, obj_func_with_price, obj_func_vec
+
+
+@pytest.fixture(scope='module')
+def comp_data():
+    ACH_data = pd.read_excel('radio_merger_data.xlsx', header=0)
+    ACH_data['price_mil'] = ACH_data['price'] / 1000000
+    ACH_data['population_target_mil'] = ACH_data['population_target'] / 1000000
+    return (ACH_data[ACH_data['year'] == 2007],
+            ACH_data[ACH_data['year'] == 2008])
+
+
+@pytest.fixture(scope='module')
+def ref_dists(comp_data):
+    """
+    Buyer-target distances of each market from scalar calls.
+    """
+    dists = []
+    for market_data in comp_data:
+        row = market_data.reset_index(drop=True)
+        n = row.shape[0]
+        dist = np.zeros((n, n))
+        for i in range(n):
+            for j in range(n):
+                dist[i, j] = precompute.vincenty_miles(
+                    row.loc[i, 'buyer_lat'], row.loc[i, 'buyer_long'],
+                    row.loc[j, 'target_lat'], row.loc[j, 'target_long'])
+        dists.append(dist)
+    return dists
+
+
+def test_vincenty_miles():
+    """
+    Test the vectorized Vincenty distances against geopy's geodesic
+    distances.
+    """
+    distance = pytest.importorskip('geopy.distance')
+    rng = np.random.default_rng(4)
+    lat1, lat2 = rng.uniform(25, 49, (2, 50))
+    long1, long2 = rng.uniform(-124, -67, (2, 50))
+    dist = precompute.vincenty_miles(lat1, long1, lat2, long2)
+    dist_geopy = [distance.geodesic((lat1[k], long1[k]),
+                                    (lat2[k], long2[k])).miles
+                  for k in range(50)]
+    assert np.allclose(dist, dist_geopy, rtol=1e-9, atol=1e-9)
+    assert precompute.vincenty_miles(40.0, -90.0, 40.0, -90.0) == 0.0
+
+
+def ref_score(Beta, market_data, ref_dist, with_price):
+    """
+    Maximum score of one market from scalar loops over the DataFrame.
+    """
+    n = market_data.shape[0]
+    row = market_data.reset_index(drop=True)
+    f = np.zeros((n, n))
+    for i in range(n):
+        for j in range(n):
+            dist = ref_dist[i, j]
+            if with_price:
+                delta, alpha, gamma, beta = Beta
+                f[i, j] = (delta * row.loc[i, 'num_stations_buyer'] *
+                           row.loc[j, 'population_target_mil'] +
+                           alpha * row.loc[i, 'corp_owner_buyer'] *
+                           row.loc[j, 'population_target_mil'] +
+                           gamma * row.loc[j, 'hhi_target'] + beta * dist)
+            else:
+                alpha, beta = Beta
+                f[i, j] = (row.loc[i, 'num_stations_buyer'] *
+                           row.loc[j, 'population_target_mil'] +
+                           alpha * row.loc[i, 'corp_owner_buyer'] *
+                           row.loc[j, 'population_target_mil'] + beta * dist)
+    score = 0
+    price = row['price_mil'].to_numpy()
+    for i in range(n - 1):
+        for j in range(i + 1, n):
+            if with_price:
+                score += ((f[i, i] - f[i, j] >= price[i] - price[j]) &
+                          (f[j, j] - f[j, i] >= price[j] - price[i]))
+            else:
+                score += f[i, i] + f[j, j] >= f[i, j] + f[j, i]
+    return score
+
+
+def test_objectives(comp_data, ref_dists):
+    """
+    Test the objectives on precomputed arrays against scalar loops,
+    with distances between each buyer and target in both years.
+    """
+    markets = precompute.precompute(*comp_data)
+    dist_08 = markets[1]['dist']
+    assert np.unique(dist_08).size > dist_08.shape[0]
+    for market, ref_dist in zip(markets, ref_dists):
+        assert np.allclose(market['dist'], ref_dist, rtol=1e-10, atol=0)
+    for Beta in ((1.5, -0.02), (0.0, 0.0), (300.0, 0.4)):
+        assert obj_func_no_price(Beta, *markets) == -sum(
+            ref_score(Beta, market_data, ref_dist, False)
+            for market_data, ref_dist in zip(comp_data, ref_dists))
+    for Beta in ((1.0, 1.5, -1e-4, -0.02), (2.0, -3.0, 1e-5, 0.01)):
+        assert obj_func_with_price(Beta, *markets) == -sum(
+            ref_score(Beta, market_data, ref_dist, True)
+            for market_data, ref_dist in zip(comp_data, ref_dists))
+
+
+def test_obj_func_vec(comp_data):
+    """
+    Test that scoring a population with the pair coefficients matches
+    the objectives evaluated one parameter vector at a time, and that it
+    runs in differential_evolution's vectorized mode.
+    """
+    markets = precompute.precompute(*comp_data)
+    rng = np.random.default_rng(7)
+    for with_price, obj_func, scale in (
+            (False, obj_func_no_price, np.array([300.0, 0.5])),
+            (True, obj_func_with_price, np.array([1.0, 1.0, 1e-4, 0.02]))):
+        coef, const = precompute.pair_coefs(markets, with_price)
+        Beta_mat = scale[:, None] * rng.standard_normal((scale.size, 40))
+        scores = obj_func_vec(Beta_mat, coef, const)
+        assert scores.shape == (40,)
+        assert np.array_equal(scores, [obj_func(Beta_mat[:, s], *markets)
+                                       for s in range(40)])
+        assert obj_func_vec(Beta_mat[:, 0], coef, const) == scores[0]
+    coef, const = precompute.pair_coefs(markets, False)
+    result = differential_evolution(obj_func_vec, [(0, 4000), (-10, 10)],
+                                    args=(coef, const), vectorized=True,
+                                    updating='deferred', seed=1, maxiter=50)
+    assert result.fun == obj_func_no_price(result.x, *markets)
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import precompute
+import stream_ms
+from Obj_func import obj_func_vec
+
+
+def test_pair_from_index():
+    """
+    Test the pair positions against np.triu_indices.
+    """
+    for n in (2, 3, 7, 50, 1001):
+        pair_i, pair_j = np.triu_indices(n, k=1)
+        k = np.arange(pair_i.size)
+        assert np.array_equal(stream_ms.pair_from_index(k, n),
+                              (pair_i, pair_j))
+    n = 3000000
+    k = np.array([0, n - 2, n - 1, n * (n - 1) // 2 - 1])
+    pair_i, pair_j = stream_ms.pair_from_index(k, n)
+    assert pair_i.tolist() == [0, 0, 1, n - 2]
+    assert pair_j.tolist() == [1, n - 1, 2, n - 1]
+
+
+def test_obj_func_stream():
+    """
+    Test the streamed objective with small blocks and three markets
+    against the precomputed pair coefficients.
+    """
+    ACH_data = pd.read_excel('radio_merger_data.xlsx', header=0)
+    ACH_data['price_mil'] = ACH_data['price'] / 1000000
+    ACH_data['population_target_mil'] = ACH_data['population_target'] / 1000000
+    # three markets of different sizes
+    ACH_data['market'] = ACH_data['year'] + (ACH_data['buyer_id'] % 3 == 0)
+    markets = stream_ms.market_vectors(ACH_data, 'market')
+    assert [key for key, vec in markets] == [2007, 2008, 2009]
+    pre = precompute.precompute(*[ACH_data[ACH_data['market'] == key]
+                                  for key, vec in markets])
+    rng = np.random.default_rng(2)
+    for with_price, scale in ((False, np.array([300.0, 0.5])),
+                              (True, np.array([1.0, 1.0, 1e-4, 0.02]))):
+        coef, const = precompute.pair_coefs(pre, with_price)
+        Beta_mat = scale[:, None] * rng.standard_normal((scale.size, 30))
+        scores = stream_ms.obj_func_stream(Beta_mat, markets, with_price,
+                                           block_size=97)
+        assert np.array_equal(scores, obj_func_vec(Beta_mat, coef, const))
+        assert stream_ms.obj_func_stream(Beta_mat[:, 0], markets,
+                                         with_price) == scores[0]
@@ -0,0 +1,291 @@
+'''
+Concurrent, cached scraper for the Wikipedia league tables of Problem Set 6
+
+The season pages are fetched by a bounded thread pool, with a minimum
+interval between requests and retries with exponential backoff (or the
+server's Retry-After) on network errors, 429 and 5xx responses. Responses
+are kept in an on-disk HTTP cache: a cached page is revalidated with
+If-None-Match (ETag) and If-Modified-Since and only downloaded again if the
+server says it changed. A page with neither is downloaded again once it is
+older than MAX_AGE.
+Only the wikitable elements of each page are parsed.
+
+The leagues are given by LEAGUES, so the Bundesliga and the Premier League
+(or any other league with the same table layout) go through the same
+league/season loop.
+'''
+
+import os
+import json
+import time
+import hashlib
+import threading
+import http.client
+import email.utils
+import concurrent.futures
+import urllib.error
+import urllib.request
+import pandas as pd
+from bs4 import BeautifulSoup, SoupStrainer
+
+cur_path = os.path.split(os.path.abspath(__file__))[0]
+CACHE_DIR = os.path.join(cur_path, 'http_cache')
+BASE_URL = 'https://en.wikipedia.org/wiki/'
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+SEASONS = range(2010, 2019)
+# page: season page suffix, teams: number of teams, games: games per team
+# in a season, table: position of the league table among the wikitables,
+# table_by_season: exceptions for seasons whose pages are laid out
+# differently
+LEAGUES = [
+    {'name': 'Bundesliga', 'page': 'Bundesliga', 'teams': 18, 'games': 34,
+     'table': 3, 'table_by_season': {2017: 4, 2018: 4}},
+    {'name': 'Premier League', 'page': 'Premier_League', 'teams': 20,
+     'games': 38, 'table': 3, 'table_by_season': {}},
+]
+COLUMNS = ['Team', 'P', 'W', 'D', 'L', 'GF', 'GA', 'GD', 'Pts']
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# seconds a cached page without ETag or Last-Modified is used before it is
+# downloaded again
+MAX_AGE = 24 * 3600
+
+
+class RateLimiter:
+    '''
+    Spaces out calls to wait() by at least min_interval seconds across
+    threads
+    '''
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def cache_files(url, cache_dir):
+    '''
+    Body and metadata files of a URL in the cache
+    '''
+    key = hashlib.sha1(url.encode()).hexdigest()
+
+    return (os.path.join(cache_dir, key + '.html'),
+            os.path.join(cache_dir, key + '.json'))
+
+
+def write_atomic(path, data):
+    '''
+    Atomically write bytes to a file
+    '''
+    tmp_file = path + '.tmp.' + str(threading.get_ident())
+    with open(tmp_file, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_file, path)
+
+
+def retry_after(err):
+    '''
+    Seconds to wait given by the Retry-After header of an HTTP error, as
+    seconds or an HTTP date, None if there is none
+    '''
+    value = err.headers.get('Retry-After') if err.headers else None
+    if value is None:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def fetch(url, cache_dir=CACHE_DIR, retries=3, backoff=1.0, limiter=None,
+          timeout=30, max_age=MAX_AGE):
+    '''
+    Fetch a page through the on-disk HTTP cache
+
+    Args:
+    url: page URL
+    cache_dir: cache folder, None for no cache
+    retries: number of retries after a failed request
+    backoff: seconds before the first retry, doubled for each further one,
+             unless a 429 or 503 response gives a Retry-After
+    limiter: RateLimiter shared by the requests, None for no rate limit
+    timeout: seconds before a request times out
+    max_age: seconds a cached page without ETag or Last-Modified is used
+             before it is downloaded again
+
+    Returns:
+    body: page contents as bytes
+    status: 'fetched', 'revalidated' (304 from the server) or 'cached'
+    '''
+    headers = dict(HEADERS)
+    body_file = meta_file = None
+    meta = {}
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        body_file, meta_file = cache_files(url, cache_dir)
+        if os.path.isfile(body_file) and os.path.isfile(meta_file):
+            with open(meta_file) as f:
+                meta = json.load(f)
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+            if 'If-None-Match' not in headers and 'If-Modified-Since' not in headers:
+                # nothing to revalidate with: the cached copy is used until
+                # it is max_age old, then the page is downloaded again
+                if time.time() - meta.get('fetched_at', 0) < max_age:
+                    with open(body_file, 'rb') as f:
+                        return f.read(), 'cached'
+                meta = {}
+
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.wait()
+        wait = backoff * 2 ** attempt
+        try:
+            req = urllib.request.Request(url, headers=headers)
+            with urllib.request.urlopen(req, timeout=timeout) as page:
+                body = page.read()
+                etag = page.headers.get('ETag')
+                last_modified = page.headers.get('Last-Modified')
+            break
+        except urllib.error.HTTPError as err:
+            if err.code == 304 and meta:
+                with open(body_file, 'rb') as f:
+                    return f.read(), 'revalidated'
+            if err.code not in RETRY_STATUS or attempt == retries:
+                raise
+            if err.code in (429, 503) and retry_after(err) is not None:
+                wait = retry_after(err)
+        except (OSError, http.client.HTTPException):
+            # URLError, timeouts, dropped connections and truncated bodies
+            if attempt == retries:
+                raise
+        time.sleep(wait)
+
+    if cache_dir is not None:
+        write_atomic(body_file, body)
+        write_atomic(meta_file, json.dumps({'url': url, 'etag': etag,
+                                            'last_modified': last_modified,
+                                            'fetched_at': time.time()})
+                     .encode())
+
+    return body, 'fetched'
+
+
+def fetch_all(urls, max_workers=4, min_interval=0.2, **fetch_kwargs):
+    '''
+    Fetch pages concurrently with a bounded thread pool
+
+    Args:
+    urls: page URLs
+    max_workers: number of threads
+    min_interval: minimum seconds between the starts of two requests
+    fetch_kwargs: other arguments of fetch
+
+    Returns:
+    pages: dict url -> (body, status) from fetch
+    '''
+    limiter = RateLimiter(min_interval)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {url: executor.submit(fetch, url, limiter=limiter, **fetch_kwargs)
+                   for url in urls}
+
+    return {url: future.result() for url, future in futures.items()}
+
+
+def season_url(league, year, base_url=BASE_URL):
+    '''
+    URL of a league's page for the season starting in year, e.g.
+    .../2010-11_Bundesliga
+    '''
+    return base_url + season_name(year) + '_' + league['page']
+
+
+def season_name(year):
+    '''
+    Season label, e.g. 2010-11 for the season starting in 2010
+    '''
+    return str(year) + '-' + str(year + 1)[-2:]
+
+
+def parse_table(page, table_index):
+    '''
+    League table of a season page
+
+    Args:
+    page: page contents
+    table_index: position of the league table among the wikitables
+
+    Returns:
+    rows: list of the rows of the table with 9 or 10 cells, each a list of
+          the COLUMNS values as strings
+    '''
+    soup = BeautifulSoup(page, 'lxml',
+                         parse_only=SoupStrainer('table', class_='wikitable'))
+    table = soup.find_all('table', class_='wikitable')[table_index]
+    # footnote markers such as [a] would be read as part of the values
+    for sup in table.find_all('sup'):
+        sup.decompose()
+    rows = []
+    for row in table.find_all('tr'):
+        cells = row.find_all('td')
+        if len(cells) in (9, 10):
+            # the team is the first link of its cell, without notes
+            # such as (C) or (R)
+            team = cells[0].find('a') or cells[0]
+            rows.append([team.get_text(strip=True)] +
+                        [cell.get_text(strip=True) for cell in cells[1:9]])
+
+    return rows
+
+
+def league_tables(leagues=LEAGUES, seasons=SEASONS, base_url=BASE_URL,
+                  max_workers=4, **fetch_kwargs):
+    '''
+    League tables of all leagues and seasons
+
+    Args:
+    leagues: list of league configurations, as in LEAGUES
+    seasons: first years of the seasons
+    base_url: URL the season pages are under
+    max_workers: number of threads fetching pages
+    fetch_kwargs: other arguments of fetch_all and fetch
+
+    Returns:
+    tables: dict league name -> DataFrame with the columns Pos, COLUMNS,
+            Year and Avg.Pts (points per game)
+    '''
+    jobs = [(league, year, season_url(league, year, base_url))
+            for league in leagues for year in seasons]
+    pages = fetch_all([url for league, year, url in jobs],
+                      max_workers=max_workers, **fetch_kwargs)
+
+    tables = {}
+    for league in leagues:
+        frames = []
+        for league_job, year, url in jobs:
+            if league_job is not league:
+                continue
+            table_index = league['table_by_season'].get(year, league['table'])
+            season_df = pd.DataFrame(parse_table(pages[url][0], table_index),
+                                     columns=COLUMNS)
+            season_df.insert(0, 'Pos', season_df.index % league['teams'] + 1)
+            season_df['Year'] = season_name(year)
+            frames.append(season_df)
+        league_df = pd.concat(frames, ignore_index=True)
+        league_df['Pts'] = league_df['Pts'].str.replace(',', '').astype(float)
+        league_df['Avg.Pts'] = league_df['Pts'] / league['games']
+        tables[league['name']] = league_df
+
+    return tables
@@ -0,0 +1,162 @@
+import hashlib
+import threading
+import http.server
+import pytest
+import scraper
+
+
+def season_page(year, n_teams, table_index):
+    '''
+    Saved season page with table_index filler wikitables before the league
+    table, and a footnote on each points value
+    '''
+    filler = ('<table class="wikitable"><tr><th>x</th></tr>'
+              '<tr><td>1</td></tr></table>') * table_index
+    rows = ''.join(
+        '<tr><th>{0}</th><td><a href="/t{0}">Team {0}</a> (C)</td><td>34</td>'
+        '<td>20</td><td>5</td><td>9</td><td>60</td><td>40</td><td>+20</td>'
+        '<td>{1}<sup class="reference">[a]</sup></td><td>note</td></tr>'
+        .format(pos, 100 - pos + year % 10)
+        for pos in range(1, n_teams + 1))
+    return ('<html><body>' + filler + '<table class="wikitable">'
+            '<tr><th>Pos</th></tr>' + rows + '</table></body></html>').encode()
+
+
+@pytest.fixture
+def server():
+    '''
+    Local stand-in for Wikipedia serving the pages in server.pages, with
+    ETags (except for the paths in server.no_validators) and 304
+    responses. The first requests of a path in server.flaky fail with its
+    list of failures: 'drop' closes the connection without a response,
+    (code, retry_after) sends an error with an optional Retry-After
+    '''
+    pages, flaky, no_validators, requests = {}, {}, set(), []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append((self.path, self.headers.get('If-None-Match')))
+            if flaky.get(self.path):
+                failure = flaky[self.path].pop(0)
+                if failure == 'drop':
+                    self.close_connection = True
+                    return
+                code, retry_after = failure
+                self.send_response(code)
+                if retry_after is not None:
+                    self.send_header('Retry-After', retry_after)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if self.path not in pages:
+                self.send_error(404)
+                return
+            body = pages[self.path]
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            if self.path not in no_validators:
+                self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.base_url = 'http://127.0.0.1:{}/wiki/'.format(httpd.server_port)
+    httpd.pages, httpd.flaky, httpd.requests = pages, flaky, requests
+    httpd.no_validators = no_validators
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_fetch_cache(server, tmpdir):
+    """
+    Test that pages are downloaded once, revalidated from the cache with
+    their ETag afterwards and downloaded again when they change, and that
+    a failed request is retried.
+    """
+    cache_dir = str(tmpdir.join('cache'))
+    urls = [server.base_url + 'p' + str(k) for k in range(6)]
+    for k in range(6):
+        server.pages['/wiki/p' + str(k)] = b'page ' + str(k).encode()
+    server.flaky['/wiki/p3'] = [(503, None)]
+    pages = scraper.fetch_all(urls, max_workers=3, min_interval=0,
+                              cache_dir=cache_dir, backoff=0.01)
+    assert [pages[url] for url in urls] == [(b'page ' + str(k).encode(), 'fetched')
+                                            for k in range(6)]
+    assert len(server.requests) == 7
+
+    server.pages['/wiki/p0'] = b'new page'
+    pages = scraper.fetch_all(urls, max_workers=3, min_interval=0,
+                              cache_dir=cache_dir)
+    assert pages[urls[0]] == (b'new page', 'fetched')
+    assert [pages[url] for url in urls[1:]] == [(b'page ' + str(k).encode(), 'revalidated')
+                                                for k in range(1, 6)]
+    assert all(etag is not None for path, etag in server.requests[7:])
+
+    del server.pages['/wiki/p1']
+    with pytest.raises(scraper.urllib.error.HTTPError):
+        scraper.fetch(server.base_url + 'p1', cache_dir=None, retries=0)
+
+
+def test_fetch_retry(server, monkeypatch, tmpdir):
+    """
+    Test that dropped connections are retried, that Retry-After is
+    honored on 429 and 503, and that a cached page without validators is
+    downloaded again once it is older than max_age.
+    """
+    sleeps = []
+    monkeypatch.setattr(scraper.time, 'sleep', sleeps.append)
+    server.pages['/wiki/p'] = b'page'
+    server.flaky['/wiki/p'] = ['drop', (429, '7'), (503, None)]
+    assert scraper.fetch(server.base_url + 'p', cache_dir=None,
+                         backoff=0.5) == (b'page', 'fetched')
+    assert sleeps == [0.5, 7.0, 2.0]
+    server.flaky['/wiki/p'] = ['drop']
+    with pytest.raises(OSError):
+        scraper.fetch(server.base_url + 'p', cache_dir=None, retries=0)
+
+    cache_dir = str(tmpdir)
+    server.no_validators.add('/wiki/p')
+    assert scraper.fetch(server.base_url + 'p', cache_dir)[1] == 'fetched'
+    assert scraper.fetch(server.base_url + 'p', cache_dir)[1] == 'cached'
+    server.pages['/wiki/p'] = b'new page'
+    assert scraper.fetch(server.base_url + 'p', cache_dir,
+                         max_age=0) == (b'new page', 'fetched')
+
+
+def test_league_tables(server, tmpdir):
+    """
+    Test that the league/season loop reads the right table of each saved
+    season page, including the seasons laid out differently.
+    """
+    leagues = [{'name': 'A', 'page': 'A_League', 'teams': 4, 'games': 6,
+                'table': 1, 'table_by_season': {2011: 2}},
+               {'name': 'B', 'page': 'B_League', 'teams': 3, 'games': 4,
+                'table': 0, 'table_by_season': {}}]
+    for league in leagues:
+        for year in (2010, 2011):
+            path = '/wiki/' + scraper.season_name(year) + '_' + league['page']
+            server.pages[path] = season_page(
+                year, league['teams'],
+                league['table_by_season'].get(year, league['table']))
+    tables = scraper.league_tables(leagues, (2010, 2011), server.base_url,
+                                   min_interval=0, cache_dir=str(tmpdir))
+
+    assert list(tables['A'].columns) == ['Pos'] + scraper.COLUMNS + ['Year', 'Avg.Pts']
+    assert tables['A']['Pos'].tolist() == [1, 2, 3, 4] * 2
+    assert tables['A']['Team'].tolist() == ['Team 1', 'Team 2', 'Team 3', 'Team 4'] * 2
+    assert tables['A']['Year'].tolist() == ['2010-11'] * 4 + ['2011-12'] * 4
+    assert tables['B']['Pts'].tolist() == [99, 98, 97, 100, 99, 98]
+    assert tables['B']['Avg.Pts'].tolist() == pytest.approx(
+        [99 / 4, 98 / 4, 97 / 4, 100 / 4, 99 / 4, 98 / 4])
+    assert len(server.requests) == 4